@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark: requisições/s no /mcp pelo caminho rápido ASGI vs roteamento FastAPI.
+
+Chama o app ASGI diretamente (sem rede nem cliente HTTP), alternando
+``settings.mcp_fast_path`` para comparar os dois caminhos.
+
+Uso: python benchmarks/bench_asgi.py [--requests 5000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.server import app
+
+PAYLOADS = {
+    "tools/list": {"jsonrpc": "2.0", "id": 1, "method": "tools/list"},
+    "tools/call": {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                   "params": {"name": "ping", "arguments": {}}},
+}
+
+
+async def _request(body: bytes) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/mcp",
+        "raw_path": b"/mcp",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            # Como no uvicorn: só sinaliza desconexão se o cliente cair
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _measure(body: bytes, requests: int) -> float:
+    for _ in range(100):
+        await _request(body)
+    start = time.perf_counter()
+    for _ in range(requests):
+        assert await _request(body) == 200
+    return requests / (time.perf_counter() - start)
+
+
+async def run(requests: int) -> None:
+    # O rate limit padrão (100 req/min por IP) barraria o benchmark com 429
+    settings.rate_limit_enabled = False
+    for name, payload in PAYLOADS.items():
+        body = json.dumps(payload).encode()
+        settings.mcp_fast_path = False
+        slow = await _measure(body, requests)
+        settings.mcp_fast_path = True
+        fast = await _measure(body, requests)
+        print(f"{name:<11} FastAPI: {slow:9.0f} req/s | ASGI: {fast:9.0f} req/s "
+              f"| {fast / slow:4.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Benchmark: overhead por chamada com requisições individuais vs batch JSON-RPC.
+
+Executa o app FastAPI em processo (via httpx.ASGITransport), medindo o custo
+de middleware, roteamento e parsing por chamada.
+
+Uso: python benchmarks/bench_batch.py [--calls 200] [--batch-size 20]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.server import app
+
+
+def _call(request_id: int) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": "ping", "arguments": {}},
+    }
+
+
+async def run(calls: int, batch_size: int) -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # O rate limit padrão (100 req/min por IP) barraria o benchmark com 429
+    settings.rate_limit_enabled = False
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Aquecimento
+        await client.post("/mcp", json=_call(0))
+
+        start = time.perf_counter()
+        for i in range(calls):
+            response = await client.post("/mcp", json=_call(i))
+            response.raise_for_status()
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(0, calls, batch_size):
+            batch = [_call(i) for i in range(offset, min(offset + batch_size, calls))]
+            response = await client.post("/mcp", json=batch)
+            response.raise_for_status()
+        batched = time.perf_counter() - start
+
+    print(f"Chamadas: {calls} | tamanho do batch: {batch_size}")
+    print(f"  individual: {single * 1e6 / calls:8.1f} µs/chamada")
+    print(f"  batch:      {batched * 1e6 / calls:8.1f} µs/chamada")
+    print(f"  economia:   {(single - batched) * 1e6 / calls:8.1f} µs/chamada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
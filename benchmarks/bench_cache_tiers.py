@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark: latência de leitura por camada do cache (memória, disco, Redis).
+
+Grava N entradas em cada camada e mede ``get`` de chaves aleatórias:
+
+- memória: ``MemoryStore`` puro;
+- disco: ``DiskStore`` (SQLite/WAL) com o cache de páginas já aquecido;
+- redis: ``GET`` + decodificação do envelope, só se ``--redis-url`` responder.
+
+Uso: python benchmarks/bench_cache_tiers.py [--entries 20000] [--reads 50000]
+     [--value-size 200] [--redis-url redis://localhost:6379/0]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from enhanced_mcp_server.cache import envelope
+from enhanced_mcp_server.cache.disk import DiskStore
+from enhanced_mcp_server.cache.memory import MemoryStore, estimate_size
+
+
+def _measure(label: str, get, keys) -> None:
+    samples = []
+    for key in keys:
+        start = time.perf_counter_ns()
+        get(key)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<8} {statistics.mean(samples) / 1000:>10.1f} "
+          f"{samples[len(samples) // 2] / 1000:>10.1f} {p99 / 1000:>10.1f}")
+
+
+def run(entries: int, reads: int, value_size: int, redis_url: str = None) -> None:
+    now = time.time()
+    keys = [f"mcp:bench:1:{i:032x}" for i in range(entries)]
+    entry = {"value": "x" * value_size, "created_at": now, "expires_at": now + 3600}
+    sample = [random.choice(keys) for _ in range(reads)]
+
+    print(f"{'camada':<8} {'média µs':>10} {'p50 µs':>10} {'p99 µs':>10}")
+
+    memory = MemoryStore(max_entries=0)
+    for key in keys:
+        memory.set(key, entry, estimate_size(key, entry["value"]))
+    _measure("memória", memory.get, sample)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        disk = DiskStore(os.path.join(tmp, "bench.db"))
+        for key in keys:
+            disk.put(key, entry)
+        disk.flush()
+        for key in sample[:1000]:  # aquece o cache de páginas do SQLite
+            disk.get(key)
+        _measure("disco", disk.get, sample)
+        disk.close()
+
+    if not redis_url:
+        print("redis    (omitido: use --redis-url)")
+        return
+    import redis
+
+    client = redis.Redis.from_url(redis_url)
+    try:
+        client.ping()
+    except redis.exceptions.RedisError as e:
+        print(f"redis    (indisponível: {e})")
+        return
+    data = envelope.encode(entry)
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.setex(key, 3600, data)
+    pipe.execute()
+    _measure("redis", lambda key: envelope.decode(client.get(key)), sample)
+    client.delete(*keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--reads", type=int, default=50000)
+    parser.add_argument("--value-size", type=int, default=200)
+    parser.add_argument("--redis-url", default=os.environ.get("REDIS_URL"))
+    args = parser.parse_args()
+    run(args.entries, args.reads, args.value_size, args.redis_url)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,107 +1,332 @@
 """Sistema de cache inteligente com Redis fallback."""
 
-import json
+import asyncio
+import atexit
+import inspect
+import itertools
+import math
+import random
 import time
-from typing import Any, Optional, Callable, Dict
+import uuid
+from typing import Any, Optional, Callable, Dict, Iterator, List, Sequence, Tuple
 import redis
+import redis.asyncio as aioredis
+from contextlib import contextmanager
 from functools import wraps
 import threading
 from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.cache import envelope, snapshot
+from enhanced_mcp_server.cache.breaker import STATE_VALUES, CircuitBreaker
+from enhanced_mcp_server.cache.disk import DiskStore
+from enhanced_mcp_server.cache.keys import (
+    chunks, make_key, namespace_pattern, namespace_prefix, tag_key,
+    tag_pattern,
+)
+from enhanced_mcp_server.cache.memory import ShardedMemoryStore, estimate_size
+from enhanced_mcp_server.cache.singleflight import fill, singleflight
+from enhanced_mcp_server.cache.stats import all_function_stats, function_stats
+from enhanced_mcp_server.metrics import CACHE_EVICTIONS, CACHE_REQUESTS, REDIS_DURATION, metrics
 from enhanced_mcp_server.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Falhas que contam para o circuit breaker (redis.asyncio usa as mesmas classes)
+REDIS_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError)
+
+# Chaves por SCAN/UNLINK/SPOP em invalidações em massa
+SCAN_BATCH = 500
+
+
+class _AsyncRedis:
+    """Cliente ``redis.asyncio`` de um event loop e o estado da conexão."""
+
+    __slots__ = ("loop", "client", "available", "probing")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: aioredis.Redis):
+        self.loop = loop
+        self.client = client
+        self.available = False
+        self.probing = False
+
 
 class Cache:
     """Sistema de cache inteligente com Redis (conexão preguiçosa) e fallback para memória."""
 
     def __init__(self):
         self._redis_client: Optional[redis.Redis] = None
-        self._redis_checked = False  # Flag para verificar a conexão apenas uma vez
-        self._memory_cache: Dict[str, Dict[str, Any]] = {}
+        self._redis_checked = False  # Flag para registrar "Redis não configurado" uma vez
+        self._connect_lock = threading.Lock()
+        self.breaker = CircuitBreaker(settings.redis_breaker_threshold,
+                                      settings.redis_breaker_recovery)
+        # Thread-safe por segmento; ``_lock`` protege só o sweeper
+        self._memory_cache = ShardedMemoryStore(
+            shards=settings.cache_memory_shards,
+            max_entries=settings.cache_max_entries,
+            max_bytes=settings.cache_max_bytes,
+            policy=settings.cache_eviction_policy,
+            on_evict=self._on_evict,
+        )
         self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+        # L1 em processo na frente do Redis; invalidado por pub/sub entre workers.
+        # Leituras usam só o lock do segmento; a geração é lida sem lock e
+        # ``_l1_generation_lock`` serializa apenas os incrementos.
+        self._l1 = ShardedMemoryStore(shards=settings.cache_memory_shards,
+                                      max_entries=settings.cache_l1_max_entries, policy="lru")
+        self._l1_generation = 0
+        self._l1_generation_lock = threading.Lock()
+        self._l1_listener: Optional[threading.Thread] = None
+        self._l1_listener_lock = threading.Lock()
+        self._instance_id = uuid.uuid4().hex
+        self._async_redis: Optional[_AsyncRedis] = None
+        self._disk: Optional[DiskStore] = None
+
+    @staticmethod
+    def _on_evict(key: str, entry: Dict[str, Any]) -> None:
+        CACHE_EVICTIONS.labels("memory", "capacity").inc()
 
     def get_redis_client(self) -> Optional[redis.Redis]:
         """
         Retorna o cliente Redis, inicializando a conexão na primeira chamada.
         Isso é chamado de "lazy connection".
+
+        Retorna None (cache em memória) enquanto o circuit breaker estiver
+        aberto; passado ``REDIS_BREAKER_RECOVERY``, uma chamada de teste tenta
+        de novo, inclusive reconectar se o Redis estava fora no boot.
         """
-        with self._lock:
+        if not self.breaker.allow():
+            return None
+        client = self._redis_client
+        if client is not None:
+            return client
+        if not settings.redis_url:
             if not self._redis_checked:
                 self._redis_checked = True
-                if settings.redis_url:
-                    try:
-                        client = redis.from_url(settings.redis_url, socket_connect_timeout=2)
-                        client.ping()
-                        self._redis_client = client
-                        logger.info("Redis cache connected successfully.")
-                    except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
-                        logger.warning(f"Failed to connect to Redis: {e}. Using memory cache.")
-                        self._redis_client = None
-                else:
-                    logger.info("Redis not configured. Using memory cache.")
+                logger.info("Redis not configured. Using memory cache.")
+            return None
+
+        with self._connect_lock:
+            if self._redis_client is None:
+                try:
+                    client = redis.from_url(
+                        settings.redis_url,
+                        socket_connect_timeout=settings.redis_socket_timeout,
+                        socket_timeout=settings.redis_socket_timeout,
+                    )
+                    client.ping()
+                except REDIS_ERRORS as e:
+                    self._record_redis_failure(e)
+                    return None
+                self._redis_client = client
+                self.breaker.record_success()
+                logger.info("Redis cache connected successfully.")
+                if settings.cache_l1_enabled:
+                    self._start_l1_listener()
         return self._redis_client
 
+    @contextmanager
+    def _redis_op(self, command: str) -> Iterator[None]:
+        """Mede um comando Redis e informa o resultado ao circuit breaker."""
+        start = time.perf_counter()
+        try:
+            yield
+        except REDIS_ERRORS as e:
+            self._record_redis_failure(e)
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            REDIS_DURATION.labels(command).observe(time.perf_counter() - start)
+
+    def _record_redis_failure(self, error: Exception) -> None:
+        if self.breaker.record_failure():
+            logger.warning(
+                f"Redis circuit opened after {self.breaker.failures} failures: {error}. "
+                f"Using memory cache for {self.breaker.recovery_timeout}s."
+            )
+        else:
+            logger.warning(f"Redis error: {error}")
+
     def _init_redis(self) -> None:
         """Método legado - agora usa get_redis_client()."""
         self.get_redis_client()
 
-    def _get_cache_key(self, func_name: str, args: tuple, kwargs: dict) -> str:
-        """Gera chave de cache baseada na função e argumentos."""
-        key_parts = [func_name]
-        key_parts.extend(str(arg) for arg in args)
-        key_parts.extend(f"{k}:{v}" for k, v in sorted(kwargs.items()))
-        return ":".join(key_parts)
+    def _get_cache_key(self, func_name: str, args: tuple, kwargs: dict, version: str = "1") -> str:
+        """Gera chave de cache baseada na função e argumentos (ver ``cache.keys``)."""
+        return make_key(func_name, args, kwargs, version)
+
+    async def get_async_redis_client(self) -> Optional[aioredis.Redis]:
+        """Retorna o cliente ``redis.asyncio`` do event loop atual.
+
+        O cliente usa um pool compartilhado e limitado (``REDIS_MAX_CONNECTIONS``);
+        quando todas as conexões estão em uso, a operação espera até
+        ``REDIS_POOL_TIMEOUT`` segundos por uma livre. Conexões assíncronas
+        pertencem a um único event loop, então um novo cliente é criado se o
+        loop mudar.
+        """
+        if not settings.redis_url or not self.breaker.allow():
+            return None
+        loop = asyncio.get_running_loop()
+        state = self._async_redis
+        if state is None or state.loop is not loop:
+            pool = aioredis.BlockingConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=settings.redis_max_connections,
+                timeout=settings.redis_pool_timeout,
+                socket_connect_timeout=settings.redis_socket_timeout,
+                socket_timeout=settings.redis_socket_timeout,
+            )
+            self._async_redis = state = _AsyncRedis(loop, aioredis.Redis(connection_pool=pool))
+        if not state.available and not state.probing:
+            # Primeiro uso ou reconexão liberada pelo circuit breaker
+            state.probing = True
+            try:
+                await state.client.ping()
+            except REDIS_ERRORS as e:
+                self._record_redis_failure(e)
+                return None
+            finally:
+                state.probing = False
+            state.available = True
+            self.breaker.record_success()
+            logger.info("Async Redis cache connected successfully.")
+            if settings.cache_l1_enabled:
+                self._start_l1_listener()
+        return state.client
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões assíncronas."""
+        state, self._async_redis = self._async_redis, None
+        if state is not None:
+            await state.client.aclose()
 
     def get(self, key: str) -> Optional[Any]:
         """Recupera valor do cache."""
+        entry = self.get_entry(key)
+        return entry["value"] if entry is not None else None
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Versão assíncrona de ``get``; não bloqueia o event loop."""
+        entry = await self.aget_entry(key)
+        return entry["value"] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Recupera a entrada completa (value, expires_at, created_at...).
+
+        Entradas gravadas com ``stale_ttl`` continuam disponíveis após
+        ``fresh_until`` até ``expires_at``; cabe ao chamador decidir se um
+        valor vencido ainda serve.
+        """
         try:
             redis_client = self.get_redis_client()
             if redis_client:
-                data = redis_client.get(key)
-                if data:
-                    cached_data = json.loads(data)
-                    if time.time() < cached_data["expires_at"]:
-                        logger.debug(f"Cache hit for key: {key}")
-                        return cached_data["value"]
-                    else:
-                        redis_client.delete(key)
+                use_l1 = settings.cache_l1_enabled
+                generation = 0
+                if use_l1:
+                    entry, generation = self._l1_lookup(key)
+                    if entry is not None:
+                        return entry
+                with self._redis_op("get"):
+                    data = redis_client.get(key)
+                entry = self._from_redis(key, data, use_l1, generation)
+                if entry is not None:
+                    return entry
             else:
-                with self._lock:
-                    if key in self._memory_cache:
-                        cached_data = self._memory_cache[key]
-                        if time.time() < cached_data["expires_at"]:
-                            logger.debug(f"Memory cache hit for key: {key}")
-                            return cached_data["value"]
-                        else:
-                            del self._memory_cache[key]
+                entry = self._memory_get(key)
+                return entry if entry is not None else self._disk_get(key)
         except Exception as e:
             logger.error(f"Cache get error: {e}")
 
         logger.debug(f"Cache miss for key: {key}")
         return None
 
-    def set(self, key: str, value: Any, ttl: int = None) -> None:
-        """Armazena valor no cache."""
+    async def aget_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Versão assíncrona de ``get_entry``."""
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                use_l1 = settings.cache_l1_enabled
+                generation = 0
+                if use_l1:
+                    entry, generation = self._l1_lookup(key)
+                    if entry is not None:
+                        return entry
+                with self._redis_op("get"):
+                    data = await redis_client.get(key)
+                entry = self._from_redis(key, data, use_l1, generation)
+                if entry is not None:
+                    return entry
+            else:
+                entry = self._memory_get(key)
+                if entry is None and self.get_disk() is not None:
+                    entry = await asyncio.to_thread(self._disk_get, key)
+                return entry
+        except Exception as e:
+            logger.error(f"Cache get error: {e}")
+
+        logger.debug(f"Cache miss for key: {key}")
+        return None
+
+    def set(self, key: str, value: Any, ttl: int = None, stale_ttl: float = 0,
+            delta: float = 0, tags: Sequence[str] = ()) -> None:
+        """Armazena valor no cache.
+
+        ``stale_ttl`` mantém a entrada por mais esse tempo após vencer, para
+        servir valores antigos enquanto ela é recalculada; ``delta`` é o custo
+        do cálculo em segundos, usado na renovação antecipada; ``tags``
+        permitem invalidar grupos de chaves com ``invalidate_tags``.
+        """
         if ttl is None:
             ttl = settings.cache_ttl
-
-        expires_at = time.time() + ttl
-        cached_data = {
-            "value": value,
-            "expires_at": expires_at,
-            "created_at": time.time()
-        }
+        cached_data = self._make_entry(value, ttl, stale_ttl, delta, tags)
+        retention = self._retention(ttl, stale_ttl)
 
         try:
             redis_client = self.get_redis_client()
             if redis_client:
-                redis_client.setex(key, ttl, json.dumps(cached_data))
+                with self._redis_op("setex"):
+                    if tags:
+                        pipe = redis_client.pipeline(transaction=False)
+                        pipe.setex(key, retention, envelope.encode(cached_data))
+                        self._index_tags(pipe, key, tags, retention)
+                        pipe.execute()
+                    else:
+                        redis_client.setex(key, retention, envelope.encode(cached_data))
+                logger.debug(f"Stored in Redis cache: {key}")
+                if settings.cache_l1_enabled:
+                    self._invalidate_l1(key)
+                    self._publish_invalidation(redis_client, key)
+            else:
+                self._memory_set(key, cached_data)
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+
+    async def aset(self, key: str, value: Any, ttl: int = None, stale_ttl: float = 0,
+                   delta: float = 0, tags: Sequence[str] = ()) -> None:
+        """Versão assíncrona de ``set``."""
+        if ttl is None:
+            ttl = settings.cache_ttl
+        cached_data = self._make_entry(value, ttl, stale_ttl, delta, tags)
+        retention = self._retention(ttl, stale_ttl)
+
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                with self._redis_op("setex"):
+                    if tags:
+                        pipe = redis_client.pipeline(transaction=False)
+                        pipe.setex(key, retention, envelope.encode(cached_data))
+                        self._index_tags(pipe, key, tags, retention)
+                        await pipe.execute()
+                    else:
+                        await redis_client.setex(key, retention, envelope.encode(cached_data))
                 logger.debug(f"Stored in Redis cache: {key}")
+                if settings.cache_l1_enabled:
+                    self._invalidate_l1(key)
+                    await self._apublish_invalidation(redis_client, key)
             else:
-                with self._lock:
-                    self._memory_cache[key] = cached_data
-                    logger.debug(f"Stored in memory cache: {key}")
+                self._memory_set(key, cached_data)
         except Exception as e:
             logger.error(f"Cache set error: {e}")
 
@@ -110,72 +335,1037 @@ class Cache:
         try:
             redis_client = self.get_redis_client()
             if redis_client:
-                redis_client.delete(key)
+                with self._redis_op("delete"):
+                    redis_client.delete(key)
+                if settings.cache_l1_enabled:
+                    self._invalidate_l1(key)
+                    self._publish_invalidation(redis_client, key)
+            else:
+                # Disco antes da memória: uma leitura concorrente não promove a linha antiga
+                disk = self.get_disk()
+                if disk is not None:
+                    disk.delete(key)
+                self._memory_cache.pop(key)
+            logger.debug(f"Deleted from cache: {key}")
+        except Exception as e:
+            logger.error(f"Cache delete error: {e}")
+
+    async def adelete(self, key: str) -> None:
+        """Versão assíncrona de ``delete``."""
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                with self._redis_op("delete"):
+                    await redis_client.delete(key)
+                if settings.cache_l1_enabled:
+                    self._invalidate_l1(key)
+                    await self._apublish_invalidation(redis_client, key)
             else:
-                with self._lock:
-                    self._memory_cache.pop(key, None)
+                # Disco antes da memória: uma leitura concorrente não promove a linha antiga
+                disk = self.get_disk()
+                if disk is not None:
+                    disk.delete(key)
+                self._memory_cache.pop(key)
             logger.debug(f"Deleted from cache: {key}")
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
 
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Recupera várias chaves de uma vez; retorna só as encontradas.
+
+        No Redis usa um único MGET (após consultar o L1); na memória, uma
+        única aquisição do lock.
+        """
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        if not keys:
+            return found
+        try:
+            redis_client = self.get_redis_client()
+            if redis_client:
+                missing, generation = self._l1_lookup_many(keys, found)
+                if missing:
+                    with self._redis_op("mget"):
+                        values = redis_client.mget(missing)
+                    self._from_redis_many(missing, values, generation, found)
+            else:
+                self._memory_get_many(keys, found)
+                if len(found) < len(keys):
+                    self._disk_get_many(keys, found)
+        except Exception as e:
+            logger.error(f"Cache get_many error: {e}")
+        return found
+
+    async def aget_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_many``."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        if not keys:
+            return found
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                missing, generation = self._l1_lookup_many(keys, found)
+                if missing:
+                    with self._redis_op("mget"):
+                        values = await redis_client.mget(missing)
+                    self._from_redis_many(missing, values, generation, found)
+            else:
+                self._memory_get_many(keys, found)
+                if len(found) < len(keys) and self.get_disk() is not None:
+                    await asyncio.to_thread(self._disk_get_many, keys, found)
+        except Exception as e:
+            logger.error(f"Cache get_many error: {e}")
+        return found
+
+    def set_many(self, mapping: Dict[str, Any], ttl: int = None,
+                 tags: Sequence[str] = ()) -> None:
+        """Armazena vários valores com um único pipeline de SETEX."""
+        if not mapping:
+            return
+        if ttl is None:
+            ttl = settings.cache_ttl
+        entries = {key: self._make_entry(value, ttl, tags=tags) for key, value in mapping.items()}
+        retention = self._retention(ttl, 0)
+        try:
+            redis_client = self.get_redis_client()
+            if redis_client:
+                with self._redis_op("setex_many"):
+                    pipe = redis_client.pipeline(transaction=False)
+                    self._queue_set_many(pipe, entries, retention, tags)
+                    pipe.execute()
+            else:
+                self._memory_set_many(entries)
+        except Exception as e:
+            logger.error(f"Cache set_many error: {e}")
+
+    async def aset_many(self, mapping: Dict[str, Any], ttl: int = None,
+                        tags: Sequence[str] = ()) -> None:
+        """Versão assíncrona de ``set_many``."""
+        if not mapping:
+            return
+        if ttl is None:
+            ttl = settings.cache_ttl
+        entries = {key: self._make_entry(value, ttl, tags=tags) for key, value in mapping.items()}
+        retention = self._retention(ttl, 0)
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                with self._redis_op("setex_many"):
+                    pipe = redis_client.pipeline(transaction=False)
+                    self._queue_set_many(pipe, entries, retention, tags)
+                    await pipe.execute()
+            else:
+                self._memory_set_many(entries)
+        except Exception as e:
+            logger.error(f"Cache set_many error: {e}")
+
+    def delete_many(self, keys: Sequence[str]) -> int:
+        """Remove várias chaves (UNLINK num único pipeline); retorna quantas existiam."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+        try:
+            redis_client = self.get_redis_client()
+            if redis_client:
+                with self._redis_op("unlink"):
+                    pipe = redis_client.pipeline(transaction=False)
+                    self._queue_delete_many(pipe, keys)
+                    removed = pipe.execute()[0]
+            else:
+                removed = self._memory_delete_many(keys)
+            logger.debug(f"Deleted {removed} keys from cache")
+            return removed
+        except Exception as e:
+            logger.error(f"Cache delete_many error: {e}")
+            return 0
+
+    async def adelete_many(self, keys: Sequence[str]) -> int:
+        """Versão assíncrona de ``delete_many``."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                with self._redis_op("unlink"):
+                    pipe = redis_client.pipeline(transaction=False)
+                    self._queue_delete_many(pipe, keys)
+                    removed = (await pipe.execute())[0]
+            else:
+                removed = self._memory_delete_many(keys)
+            logger.debug(f"Deleted {removed} keys from cache")
+            return removed
+        except Exception as e:
+            logger.error(f"Cache delete_many error: {e}")
+            return 0
+
+    def _l1_lookup_many(self, keys: List[str], found: Dict[str, Any]) -> Tuple[List[str], int]:
+        """Resolve o que der pelo L1; retorna (chaves restantes, geração)."""
+        if not settings.cache_l1_enabled:
+            return keys, 0
+        missing = []
+        now = time.time()
+        generation = self._l1_generation
+        entries = self._l1.get_many(keys)
+        for key in keys:
+            entry = entries.get(key)
+            if entry is not None and now < entry["l1_expires_at"]:
+                found[key] = entry["value"]
+            else:
+                missing.append(key)
+        CACHE_REQUESTS.labels("l1", "hit").inc(len(keys) - len(missing))
+        CACHE_REQUESTS.labels("l1", "miss").inc(len(missing))
+        return missing, generation
+
+    def _from_redis_many(self, keys: List[str], values: List[Optional[bytes]], generation: int,
+                         found: Dict[str, Any]) -> None:
+        use_l1 = settings.cache_l1_enabled
+        hits = 0
+        for key, data in zip(keys, values):
+            if data:
+                cached_data = envelope.decode(data)
+                found[key] = cached_data["value"]
+                hits += 1
+                if use_l1:
+                    self._fill_l1(key, cached_data, generation)
+        CACHE_REQUESTS.labels("redis", "hit").inc(hits)
+        CACHE_REQUESTS.labels("redis", "miss").inc(len(keys) - hits)
+
+    def _queue_set_many(self, pipe, entries: Dict[str, Dict[str, Any]], retention: int,
+                        tags: Sequence[str]) -> None:
+        for key, cached_data in entries.items():
+            pipe.setex(key, retention, envelope.encode(cached_data))
+            self._index_tags(pipe, key, tags, retention)
+        self._queue_invalidations(pipe, list(entries))
+
+    def _queue_delete_many(self, pipe, keys: List[str]) -> None:
+        pipe.unlink(*keys)
+        self._queue_invalidations(pipe, keys)
+
+    def _queue_invalidations(self, pipe, keys: List[str]) -> None:
+        """Invalida o L1 local e publica as chaves no mesmo pipeline."""
+        if not settings.cache_l1_enabled:
+            return
+        self._bump_l1_generation()
+        self._l1.pop_many(keys)
+        for key in keys:
+            pipe.publish(settings.cache_invalidation_channel, f"{self._instance_id}:{key}")
+
+    def _memory_get_many(self, keys: List[str], found: Dict[str, Any]) -> None:
+        now = time.time()
+        expired = 0
+        for key, cached_data in self._memory_cache.get_many(keys).items():
+            if now < cached_data["expires_at"]:
+                found[key] = cached_data["value"]
+            elif self._memory_cache.discard(key, cached_data):
+                expired += 1
+        CACHE_REQUESTS.labels("memory", "hit").inc(len(found))
+        CACHE_REQUESTS.labels("memory", "miss").inc(len(keys) - len(found))
+        if expired:
+            CACHE_EVICTIONS.labels("memory", "expired").inc(expired)
+
+    def _memory_set_many(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        self._memory_cache.set_many(
+            (key, data, estimate_size(key, data["value"]), data["expires_at"])
+            for key, data in entries.items())
+        disk = self.get_disk()
+        if disk is not None:
+            for key, cached_data in entries.items():
+                disk.put(key, cached_data)
+        if self._sweeper is None:
+            self.start_sweeper()
+
+    def _memory_delete_many(self, keys: List[str]) -> int:
+        disk = self.get_disk()
+        if disk is not None:
+            for key in keys:
+                disk.delete(key)
+        return self._memory_cache.pop_many(keys)
+
+    @staticmethod
+    def _make_entry(value: Any, ttl: float, stale_ttl: float = 0, delta: float = 0,
+                    tags: Sequence[str] = ()) -> Dict[str, Any]:
+        now = time.time()
+        entry = {"value": value, "expires_at": now + ttl + stale_ttl, "created_at": now}
+        if stale_ttl:
+            entry["fresh_until"] = now + ttl
+        if delta:
+            entry["delta"] = delta
+        if tags:
+            entry["tags"] = list(tags)
+        return entry
+
+    @staticmethod
+    def _index_tags(pipe, key: str, tags: Sequence[str], retention: int) -> None:
+        """Registra ``key`` nos conjuntos das tags (no mesmo pipeline do SETEX).
+
+        O conjunto vive pelo menos ``CACHE_TTL`` após a última escrita marcada;
+        membros já expirados são apenas removidos em vão na invalidação.
+        """
+        for tag in tags:
+            pipe.sadd(tag_key(tag), key)
+            pipe.expire(tag_key(tag), max(retention, settings.cache_ttl))
+
+    @staticmethod
+    def _retention(ttl: float, stale_ttl: float) -> int:
+        """TTL do Redis em segundos inteiros (mínimo 1)."""
+        return max(1, math.ceil(ttl + stale_ttl))
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        cached_data = self._memory_cache.get(key)
+        if cached_data is not None:
+            if time.time() < cached_data["expires_at"]:
+                logger.debug(f"Memory cache hit for key: {key}")
+                CACHE_REQUESTS.labels("memory", "hit").inc()
+                return cached_data
+            # Só remove se nenhuma thread regravou a chave nesse meio-tempo
+            if self._memory_cache.discard(key, cached_data):
+                CACHE_EVICTIONS.labels("memory", "expired").inc()
+        CACHE_REQUESTS.labels("memory", "miss").inc()
+        logger.debug(f"Cache miss for key: {key}")
+        return None
+
+    def _memory_set(self, key: str, cached_data: Dict[str, Any], persist: bool = True) -> None:
+        size = estimate_size(key, cached_data["value"])
+        self._memory_cache.set(key, cached_data, size, cached_data["expires_at"])
+        logger.debug(f"Stored in memory cache: {key}")
+        if persist:
+            disk = self.get_disk()
+            if disk is not None:
+                disk.put(key, cached_data)
+        if self._sweeper is None:
+            self.start_sweeper()
+
+    def get_disk(self) -> Optional[DiskStore]:
+        """Camada em disco, aberta na primeira chamada se ``CACHE_DISK_PATH`` estiver definido."""
+        path = settings.cache_disk_path
+        if not path:
+            return None
+        disk = self._disk
+        if disk is not None and disk.path == path:
+            return disk
+        with self._connect_lock:
+            if self._disk is None or self._disk.path != path:
+                if self._disk is not None:
+                    self._disk.close()
+                self._disk = DiskStore(
+                    path,
+                    max_bytes=settings.cache_disk_max_bytes,
+                    flush_interval=settings.cache_disk_flush_interval,
+                    compact_interval=settings.cache_disk_compact_interval,
+                )
+                logger.info(f"Disk cache opened at {path}")
+            return self._disk
+
+    def close_disk(self) -> None:
+        """Grava as escritas pendentes e fecha a camada em disco."""
+        with self._connect_lock:
+            disk, self._disk = self._disk, None
+        if disk is not None:
+            disk.close()
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Consulta o disco após um miss na memória; acertos voltam para a memória."""
+        disk = self.get_disk()
+        if disk is None:
+            return None
+        generation = disk.generation
+        entry = disk.get(key)
+        if entry is None:
+            CACHE_REQUESTS.labels("disk", "miss").inc()
+            return None
+        CACHE_REQUESTS.labels("disk", "hit").inc()
+        self._promote(disk, generation, {key: entry})
+        return entry
+
+    def _disk_get_many(self, keys: List[str], found: Dict[str, Any]) -> None:
+        disk = self.get_disk()
+        if disk is None:
+            return
+        missing = [key for key in keys if key not in found]
+        generation = disk.generation
+        entries = disk.get_many(missing)
+        CACHE_REQUESTS.labels("disk", "hit").inc(len(entries))
+        CACHE_REQUESTS.labels("disk", "miss").inc(len(missing) - len(entries))
+        self._promote(disk, generation, entries)
+        for key, entry in entries.items():
+            found[key] = entry["value"]
+
+    def _promote(self, disk: DiskStore, generation: int,
+                 entries: Dict[str, Dict[str, Any]]) -> None:
+        """Copia linhas lidas do disco para a memória.
+
+        Invalidações marcam o disco antes de limpar a memória; se alguma
+        ocorreu desde a leitura, a cópia é desfeita para não ressuscitar
+        uma chave apagada.
+        """
+        for key, entry in entries.items():
+            self._memory_set(key, entry, persist=False)
+        if disk.generation != generation:
+            for key, entry in entries.items():
+                self._memory_cache.discard(key, entry)
+
+    def _l1_lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Consulta o L1; retorna (entrada ou None, geração de invalidação)."""
+        generation = self._l1_generation
+        entry = self._l1.get(key)
+        if entry is not None and time.time() >= entry["l1_expires_at"]:
+            self._l1.discard(key, entry)
+            entry = None
+        if entry is not None:
+            CACHE_REQUESTS.labels("l1", "hit").inc()
+            return entry, generation
+        CACHE_REQUESTS.labels("l1", "miss").inc()
+        return None, generation
+
+    def _from_redis(self, key: str, data: Optional[bytes], use_l1: bool,
+                    generation: int) -> Optional[Dict[str, Any]]:
+        """Decodifica uma leitura do Redis (a validade vem do TTL do próprio Redis)."""
+        if data:
+            cached_data = envelope.decode(data)
+            logger.debug(f"Cache hit for key: {key}")
+            CACHE_REQUESTS.labels("redis", "hit").inc()
+            if use_l1:
+                self._fill_l1(key, cached_data, generation)
+            return cached_data
+        CACHE_REQUESTS.labels("redis", "miss").inc()
+        return None
+
+    def _fill_l1(self, key: str, cached_data: Dict[str, Any], generation: int) -> None:
+        """Copia uma leitura do Redis para o L1.
+
+        Se alguma invalidação chegou desde o início da leitura, o valor lido
+        pode estar desatualizado e não é guardado. A entrada é gravada antes
+        de conferir a geração: como as invalidações incrementam a geração
+        antes de remover a chave, uma invalidação concorrente ou remove a
+        entrada ou é vista aqui, e a entrada é descartada.
+        """
+        if generation != self._l1_generation:
+            return
+        entry = dict(cached_data)
+        entry["l1_expires_at"] = min(cached_data["expires_at"], time.time() + settings.cache_l1_ttl)
+        self._l1.set(key, entry, estimate_size(key, cached_data["value"]))
+        if generation != self._l1_generation:
+            self._l1.discard(key, entry)
+
+    def _bump_l1_generation(self) -> None:
+        with self._l1_generation_lock:
+            self._l1_generation += 1
+
+    def _invalidate_l1(self, key: str) -> None:
+        """Remove uma chave do L1 (ou tudo, se a chave for vazia)."""
+        self._bump_l1_generation()
+        if key:
+            self._l1.pop(key)
+        else:
+            self._l1.clear()
+
+    def _publish_invalidation(self, redis_client: redis.Redis, key: str) -> None:
+        try:
+            redis_client.publish(settings.cache_invalidation_channel,
+                                 f"{self._instance_id}:{key}")
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
+
+    async def _apublish_invalidation(self, redis_client: aioredis.Redis, key: str) -> None:
+        try:
+            await redis_client.publish(settings.cache_invalidation_channel,
+                                       f"{self._instance_id}:{key}")
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
+
+    def _on_invalidation(self, data: Any) -> None:
+        """Processa uma mensagem do canal de invalidação."""
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", "replace")
+        if not isinstance(data, str):
+            return
+        origin, _, key = data.partition(":")
+        if origin != self._instance_id:
+            self._invalidate_l1(key)
+
+    def _start_l1_listener(self) -> None:
+        with self._l1_listener_lock:
+            if self._l1_listener is not None:
+                return
+            self._l1_listener = threading.Thread(
+                target=self._listen_invalidations, name="cache-l1-invalidation", daemon=True)
+            self._l1_listener.start()
+
+    def _listen_invalidations(self) -> None:
+        backoff = 1.0
+        client = redis.from_url(settings.redis_url, socket_connect_timeout=2)
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(settings.cache_invalidation_channel)
+                # Mensagens perdidas enquanto desconectado: descarta o L1 inteiro
+                self._invalidate_l1("")
+                backoff = 1.0
+                for message in pubsub.listen():
+                    self._on_invalidation(message.get("data"))
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error: {e}")
+            self._invalidate_l1("")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Remove entradas expiradas da memória em fatias curtas.
+
+        Cada segmento fica bloqueado só durante a própria fatia, então
+        ``get``/``set`` concorrentes esperam no máximo ``cache_sweep_batch``
+        remoções, e apenas nas chaves daquele segmento.
+        """
+        batch = max(1, settings.cache_sweep_batch)
+        total = 0
+        while True:
+            removed = self._memory_cache.expire(now or time.time(), batch)
+            total += removed
+            if removed < batch:
+                break
+        if total:
+            CACHE_EVICTIONS.labels("memory", "expired").inc(total)
+            logger.debug(f"Expired {total} memory cache entries")
+        return total
+
+    def start_sweeper(self) -> None:
+        """Inicia a thread de varredura de expiração (idempotente)."""
+        with self._lock:
+            if self._sweeper is not None or settings.cache_sweep_interval <= 0:
+                return
+            self._sweeper_stop.clear()
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, name="cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Interrompe a thread de varredura."""
+        sweeper = self._sweeper
+        if sweeper is not None:
+            self._sweeper_stop.set()
+            sweeper.join()
+            self._sweeper = None
+
+    def _sweep_loop(self) -> None:
+        while not self._sweeper_stop.wait(settings.cache_sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Cache sweep error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumo do estado do cache e das funções decoradas."""
+        memory = self._memory_cache.stats()
+        l1 = self._l1.stats() if settings.cache_l1_enabled else None
+        redis_active = bool(settings.redis_url) and self.breaker.state != "open"
+        return {
+            "enabled": settings.cache_enabled,
+            "cache_type": "redis" if redis_active else "memory",
+            "redis_configured": bool(settings.redis_url),
+            "redis_breaker": self.breaker.stats(),
+            "memory": memory,
+            "l1": l1,
+            "disk": self._disk.stats() if self._disk is not None else None,
+            "bytes_saved": {tier: envelope.bytes_saved(tier) for tier in envelope.TIERS},
+            "functions": all_function_stats(),
+        }
+
     def clear(self) -> None:
-        """Limpa todo o cache."""
+        """Limpa todo o cache.
+
+        No Redis remove apenas as chaves sob ``CACHE_KEY_PREFIX`` e os
+        conjuntos de tags (SCAN + UNLINK), sem afetar outros dados do mesmo
+        banco. Chaves no formato antigo, sem prefixo, não são reconhecíveis
+        com segurança e ficam até expirar pelo próprio TTL.
+        """
         try:
             redis_client = self.get_redis_client()
             if redis_client:
-                redis_client.flushdb()
+                with self._redis_op("scan_unlink"):
+                    self._unlink_matching(redis_client, namespace_pattern())
+                    self._unlink_matching(redis_client, tag_pattern())
+                if settings.cache_l1_enabled:
+                    self._invalidate_l1("")
+                    self._publish_invalidation(redis_client, "")
             else:
-                with self._lock:
-                    self._memory_cache.clear()
+                disk = self.get_disk()
+                if disk is not None:
+                    disk.clear()
+                self._memory_cache.clear()
             logger.info("Cache cleared")
         except Exception as e:
             logger.error(f"Cache clear error: {e}")
 
+    def invalidate_namespace(self, namespace: str) -> int:
+        """Remove todas as chaves de um namespace; retorna quantas removeu."""
+        try:
+            redis_client = self.get_redis_client()
+            if redis_client:
+                with self._redis_op("scan_unlink"):
+                    removed = self._unlink_matching(redis_client, namespace_pattern(namespace))
+                self._after_bulk_invalidation(redis_client)
+            else:
+                prefix = namespace_prefix(namespace)
+                disk = self.get_disk()
+                if disk is not None:
+                    disk.delete_prefix(prefix)
+                removed = self._memory_remove_where(lambda key, entry: key.startswith(prefix))
+            logger.info(f"Invalidated {removed} keys in namespace {namespace}")
+            return removed
+        except Exception as e:
+            logger.error(f"Cache invalidate error: {e}")
+            return 0
+
+    async def ainvalidate_namespace(self, namespace: str) -> int:
+        """Versão assíncrona de ``invalidate_namespace``."""
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                removed = 0
+                batch = []
+                with self._redis_op("scan_unlink"):
+                    async for key in redis_client.scan_iter(match=namespace_pattern(namespace),
+                                                            count=SCAN_BATCH):
+                        batch.append(key)
+                        if len(batch) >= SCAN_BATCH:
+                            removed += await redis_client.unlink(*batch)
+                            batch = []
+                    if batch:
+                        removed += await redis_client.unlink(*batch)
+                await self._aafter_bulk_invalidation(redis_client)
+            else:
+                prefix = namespace_prefix(namespace)
+                disk = self.get_disk()
+                if disk is not None:
+                    disk.delete_prefix(prefix)
+                removed = self._memory_remove_where(lambda key, entry: key.startswith(prefix))
+            logger.info(f"Invalidated {removed} keys in namespace {namespace}")
+            return removed
+        except Exception as e:
+            logger.error(f"Cache invalidate error: {e}")
+            return 0
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Remove todas as chaves marcadas com alguma das tags."""
+        try:
+            redis_client = self.get_redis_client()
+            if redis_client:
+                removed = 0
+                with self._redis_op("spop_unlink"):
+                    for tag in tags:
+                        # SPOP em lotes: chaves marcadas durante a remoção não se perdem
+                        while True:
+                            keys = redis_client.spop(tag_key(tag), SCAN_BATCH)
+                            if not keys:
+                                break
+                            removed += redis_client.unlink(*keys)
+                self._after_bulk_invalidation(redis_client)
+            else:
+                wanted = set(tags)
+                disk = self.get_disk()
+                if disk is not None:
+                    disk.delete_tags(wanted)
+                removed = self._memory_remove_where(
+                    lambda key, entry: not wanted.isdisjoint(entry.get("tags", ())))
+            logger.info(f"Invalidated {removed} keys tagged {list(tags)}")
+            return removed
+        except Exception as e:
+            logger.error(f"Cache invalidate error: {e}")
+            return 0
+
+    async def ainvalidate_tags(self, *tags: str) -> int:
+        """Versão assíncrona de ``invalidate_tags``."""
+        try:
+            redis_client = await self.get_async_redis_client()
+            if redis_client:
+                removed = 0
+                with self._redis_op("spop_unlink"):
+                    for tag in tags:
+                        while True:
+                            keys = await redis_client.spop(tag_key(tag), SCAN_BATCH)
+                            if not keys:
+                                break
+                            removed += await redis_client.unlink(*keys)
+                await self._aafter_bulk_invalidation(redis_client)
+            else:
+                wanted = set(tags)
+                disk = self.get_disk()
+                if disk is not None:
+                    disk.delete_tags(wanted)
+                removed = self._memory_remove_where(
+                    lambda key, entry: not wanted.isdisjoint(entry.get("tags", ())))
+            logger.info(f"Invalidated {removed} keys tagged {list(tags)}")
+            return removed
+        except Exception as e:
+            logger.error(f"Cache invalidate error: {e}")
+            return 0
+
+    @staticmethod
+    def _unlink_matching(redis_client: redis.Redis, pattern: str) -> int:
+        removed = 0
+        for batch in chunks(redis_client.scan_iter(match=pattern, count=SCAN_BATCH), SCAN_BATCH):
+            removed += redis_client.unlink(*batch)
+        return removed
+
+    def _after_bulk_invalidation(self, redis_client: redis.Redis) -> None:
+        # Invalidações em massa descartam o L1 inteiro em todos os workers
+        if settings.cache_l1_enabled:
+            self._invalidate_l1("")
+            self._publish_invalidation(redis_client, "")
+
+    async def _aafter_bulk_invalidation(self, redis_client: aioredis.Redis) -> None:
+        if settings.cache_l1_enabled:
+            self._invalidate_l1("")
+            await self._apublish_invalidation(redis_client, "")
+
+    def _memory_remove_where(self, predicate: Callable[[str, Dict[str, Any]], bool]) -> int:
+        """Remove da memória as entradas que satisfazem ``predicate``."""
+        matches = [key for key, entry in self._memory_cache.items() if predicate(key, entry)]
+        return sum(self._memory_cache.pop_many(batch) for batch in chunks(matches, SCAN_BATCH))
+
+    def export_snapshot(self, path: str, limit: int = 0) -> int:
+        """Grava o conteúdo do cache em ``path``; retorna quantas entradas gravou.
+
+        Da memória, as entradas saem da mais para a menos usada, então
+        importar só as primeiras N traz o conjunto quente. Do Redis, a ordem é
+        a do SCAN e as tags não vão junto. ``limit`` (0 = todas) corta a
+        exportação.
+        """
+        try:
+            redis_client = self.get_redis_client()
+            records = (self._redis_records(redis_client) if redis_client
+                       else self._memory_records())
+            if limit:
+                records = itertools.islice(records, limit)
+            count = snapshot.write(path, records)
+            logger.info(f"Exported {count} cache entries to {path}")
+            return count
+        except Exception as e:
+            logger.error(f"Cache snapshot export error: {e}")
+            return 0
+
+    def import_snapshot(self, path: str, limit: int = 0,
+                        stop: Optional[threading.Event] = None) -> int:
+        """Carrega um snapshot em lotes; retorna quantas entradas carregou.
+
+        Entradas vencidas são ignoradas e ``limit`` (0 = todas) para a leitura
+        após N entradas. No Redis, chaves já existentes não são sobrescritas.
+        ``stop`` interrompe a carga antes do próximo lote.
+        """
+        loaded = 0
+        try:
+            redis_client = self.get_redis_client()
+            if not redis_client and self._memory_cache.max_entries:
+                # Além do limite, as entradas frias do fim despejariam as quentes
+                limit = min(limit or self._memory_cache.max_entries,
+                            self._memory_cache.max_entries)
+            for batch in chunks(snapshot.read(path), SCAN_BATCH):
+                if stop is not None and stop.is_set():
+                    logger.info(f"Cache snapshot import stopped after {loaded} entries")
+                    return loaded
+                if limit:
+                    batch = batch[:limit - loaded]
+                if redis_client:
+                    loaded += self._import_redis(redis_client, batch)
+                else:
+                    loaded += self._import_memory(batch)
+                if limit and loaded >= limit:
+                    break
+            logger.info(f"Imported {loaded} cache entries from {path}")
+        except FileNotFoundError:
+            logger.info(f"No cache snapshot at {path}")
+        except Exception as e:
+            logger.error(f"Cache snapshot import error: {e}")
+        return loaded
+
+    async def warm_up(self) -> int:
+        """Carrega ``CACHE_SNAPSHOT_PATH`` sem bloquear o event loop.
+
+        Cancelar a espera não interrompe a thread sozinho: a carga é avisada
+        para parar e o cancelamento só se propaga quando ela termina, então
+        nada mais é escrito no cache depois (ex.: durante o snapshot do
+        shutdown).
+        """
+        if not settings.cache_snapshot_path:
+            return 0
+        stop = threading.Event()
+        loading = asyncio.ensure_future(asyncio.to_thread(
+            self.import_snapshot, settings.cache_snapshot_path, settings.cache_warmup_limit, stop))
+        try:
+            return await asyncio.shield(loading)
+        except asyncio.CancelledError:
+            stop.set()
+            await loading
+            raise
+
+    def _memory_records(self) -> Iterator[Tuple[str, Sequence[str], bytes]]:
+        keys = self._memory_cache.hot_keys()
+        now = time.time()
+        for batch in chunks(keys, SCAN_BATCH):
+            entries = [(key, self._memory_cache.peek(key)) for key in batch]
+            for key, entry in entries:
+                if entry is None or entry["expires_at"] <= now:
+                    continue
+                try:
+                    data = envelope.encode(entry, tier="snapshot")
+                except Exception as e:
+                    logger.debug(f"Skipping unserializable cache entry {key}: {e}")
+                    continue
+                yield key, entry.get("tags", ()), data
+
+    def _redis_records(self, redis_client: redis.Redis
+                       ) -> Iterator[Tuple[bytes, Sequence[str], bytes]]:
+        for batch in chunks(redis_client.scan_iter(match=namespace_pattern(), count=SCAN_BATCH),
+                            SCAN_BATCH):
+            with self._redis_op("mget"):
+                values = redis_client.mget(batch)
+            for key, data in zip(batch, values):
+                # Chaves que expiraram entre o SCAN e o MGET voltam como None
+                if data is not None:
+                    yield key, (), data
+
+    def _import_memory(self, records: List[snapshot.Record]) -> int:
+        now = time.time()
+        entries = {}
+        for key, tags, data in records:
+            entry = envelope.decode(data)
+            if entry["expires_at"] > now:
+                if tags:
+                    entry["tags"] = tags
+                entries[key] = entry
+        self._memory_set_many(entries)
+        return len(entries)
+
+    def _import_redis(self, redis_client: redis.Redis, records: List[snapshot.Record]) -> int:
+        now = time.time()
+        loaded = 0
+        with self._redis_op("set_many"):
+            pipe = redis_client.pipeline(transaction=False)
+            for key, tags, data in records:
+                remaining = envelope.decode(data)["expires_at"] - now
+                if remaining <= 0:
+                    continue
+                pipe.set(key, data, px=max(1, int(remaining * 1000)), nx=True)
+                self._index_tags(pipe, key, tags, math.ceil(remaining))
+                loaded += 1
+            pipe.execute()
+        return loaded
+
 
 # Instância global do cache
 cache = Cache()
+# Escritas em disco ainda na fila são gravadas na saída do processo
+atexit.register(cache.close_disk)
+
+metrics.callback("cache_memory_entries", "Entradas na camada em memória.", (),
+                 lambda: [((), len(cache._memory_cache))])
+metrics.callback("cache_memory_bytes", "Tamanho estimado da camada em memória.", (),
+                 lambda: [((), cache._memory_cache.bytes)])
+metrics.callback("cache_redis_breaker_state",
+                 "Estado do circuit breaker do Redis (0 fechado, 1 half-open, 2 aberto).", (),
+                 lambda: [((), STATE_VALUES[cache.breaker.state])])
+metrics.callback("cache_redis_breaker_trips_total", "Aberturas do circuit breaker do Redis.", (),
+                 lambda: [((), cache.breaker.trips)], kind="counter")
 
 
-def cached(ttl: int = None):
-    """Decorador para cache de funções (suporta sync e async)."""
+def needs_refresh(entry: Dict[str, Any], early_refresh: float = 0,
+                  now: Optional[float] = None) -> bool:
+    """Indica se uma entrada deve ser recalculada em segundo plano.
+
+    Entradas vencidas (servidas dentro de ``stale_ttl``) sempre precisam. Com
+    ``early_refresh`` (o beta do XFetch) > 0, uma entrada ainda fresca é
+    renovada antes da hora com probabilidade que cresce perto do vencimento e
+    com o custo (``delta``) do último cálculo.
+    """
+    now = time.time() if now is None else now
+    fresh_until = entry.get("fresh_until", entry["expires_at"])
+    if now >= fresh_until:
+        return True
+    delta = entry.get("delta", 0)
+    if early_refresh <= 0 or delta <= 0:
+        return False
+    return now - delta * early_refresh * math.log(1.0 - random.random()) >= fresh_until
+
+
+# Renovações em segundo plano em andamento, por chave
+_refreshing: Dict[str, Any] = {}
+_refreshing_lock = threading.Lock()
+
+
+def _spawn_refresh(key: str, factory: Callable[[], Any]) -> None:
+    """Agenda uma renovação assíncrona, no máximo uma por chave."""
+    if key in _refreshing:
+        return
+    task = asyncio.get_running_loop().create_task(factory())
+    _refreshing[key] = task
+
+    def done(task: asyncio.Task) -> None:
+        _refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh failed for {key}: {task.exception()}")
+
+    task.add_done_callback(done)
+
+
+def _spawn_sync_refresh(key: str, compute: Callable[[], Any]) -> None:
+    """Agenda uma renovação numa thread, no máximo uma por chave."""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing[key] = True
+
+    def run() -> None:
+        try:
+            compute()
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {e}")
+        finally:
+            _refreshing.pop(key, None)
+
+    threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+
+
+def cached(ttl: int = None, stale_ttl: float = 0, early_refresh: float = 0,
+           namespace: Optional[str] = None, version: str = "1", tags: Sequence[str] = (),
+           key: Optional[Callable[..., Any]] = None, ignore: Sequence[str] = (),
+           typed: bool = False):
+    """Decorador de memoização (suporta sync e async).
+
+    Funciona com Redis ou só com a camada em memória; ``CACHE_ENABLED=false``
+    desliga o cache de todas as funções decoradas.
+
+    Args:
+        ttl: Validade das entradas em segundos (padrão: ``CACHE_TTL``).
+        stale_ttl: Janela após o vencimento em que o valor antigo ainda é
+            servido enquanto uma renovação roda em segundo plano.
+        early_refresh: Beta do XFetch; > 0 renova entradas quentes antes
+            de vencerem (1.0 é o valor usual).
+        namespace: Namespace das chaves (padrão: ``módulo.nome`` da função);
+            ``cache.invalidate_namespace`` remove todas de uma vez.
+        version: Versão do código; trocar descarta as entradas antigas.
+        tags: Tags gravadas com cada entrada, para ``cache.invalidate_tags``.
+        key: Função opcional que recebe os mesmos argumentos e retorna o valor
+            a ser usado na chave (substitui os argumentos).
+        ignore: Nomes de parâmetros que não entram na chave (clientes, loggers).
+        typed: Inclui o tipo de cada argumento na chave (``1`` != ``1.0``).
+    """
     def decorator(func: Callable) -> Callable:
-        import asyncio
-        
         is_async = asyncio.iscoroutinefunction(func)
-        
+        func_namespace = namespace or f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+        ignored = frozenset(ignore)
+        stats = function_stats(func_namespace)
+
+        def key_for(args: tuple, kwargs: dict) -> Optional[str]:
+            """Chave da chamada; None se os argumentos não puderem ser hasheados."""
+            try:
+                if key is not None:
+                    return cache._get_cache_key(func_namespace, (key(*args, **kwargs),), {}, version)
+                # Argumentos normalizados por nome: f("x") e f(text="x") têm a mesma chave
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                params = {name: value for name, value in bound.arguments.items()
+                          if name not in ignored}
+                if typed:
+                    params = {name: [type(value).__qualname__, value]
+                              for name, value in params.items()}
+                return cache._get_cache_key(func_namespace, (), params, version)
+            except TypeError as e:
+                stats.uncacheable += 1
+                logger.warning(f"Not caching {func_namespace}: {e}")
+                return None
+
+        def record_hit(entry: Dict[str, Any]) -> None:
+            if time.time() >= entry.get("fresh_until", entry["expires_at"]):
+                stats.stale_hits += 1
+            else:
+                stats.hits += 1
+
         if is_async:
+            async def compute_async(args: tuple, kwargs: dict) -> Any:
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    stats.errors += 1
+                    raise
+                finally:
+                    stats.record_compute(time.perf_counter() - start)
+
             @wraps(func)
             async def async_wrapper(*args, **kwargs):
-                if not settings.redis_url and not cache._memory_cache:
-                    # Se não há cache configurado, executa diretamente
+                if not settings.cache_enabled:
+                    return await func(*args, **kwargs)
+
+                cache_key = key_for(args, kwargs)
+                if cache_key is None:
                     return await func(*args, **kwargs)
+                entry = await cache.aget_entry(cache_key)
 
-                cache_key = cache._get_cache_key(func.__name__, args, kwargs)
-                cached_result = cache.get(cache_key)
+                if entry is not None:
+                    record_hit(entry)
+                    if needs_refresh(entry, early_refresh):
+                        seen_at = entry["created_at"]
+                        _spawn_refresh(cache_key, lambda: fill(
+                            cache, cache_key, lambda: compute_async(args, kwargs), ttl,
+                            stale_ttl, tags, refresh=True, seen_at=seen_at))
+                    return entry["value"]
 
-                if cached_result is not None:
-                    return cached_result
+                stats.misses += 1
+                if not settings.cache_singleflight:
+                    start = time.perf_counter()
+                    result = await compute_async(args, kwargs)
+                    await cache.aset(cache_key, result, ttl, stale_ttl,
+                                     time.perf_counter() - start, tags)
+                    return result
 
-                result = await func(*args, **kwargs)
-                cache.set(cache_key, result, ttl)
-                return result
+                # Misses concorrentes da mesma chave esperam uma única execução
+                return await singleflight.do(
+                    cache_key,
+                    lambda: fill(cache, cache_key, lambda: compute_async(args, kwargs), ttl,
+                                 stale_ttl, tags),
+                )
+            async_wrapper.cache_namespace = func_namespace
+            async_wrapper.cache_stats = stats
             return async_wrapper
         else:
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
-                if not settings.redis_url and not cache._memory_cache:
-                    # Se não há cache configurado, executa diretamente
+                if not settings.cache_enabled:
                     return func(*args, **kwargs)
 
-                cache_key = cache._get_cache_key(func.__name__, args, kwargs)
-                cached_result = cache.get(cache_key)
+                cache_key = key_for(args, kwargs)
+                if cache_key is None:
+                    return func(*args, **kwargs)
+
+                def compute():
+                    start = time.perf_counter()
+                    try:
+                        result = func(*args, **kwargs)
+                    except Exception:
+                        stats.errors += 1
+                        raise
+                    finally:
+                        elapsed = time.perf_counter() - start
+                        stats.record_compute(elapsed)
+                    cache.set(cache_key, result, ttl, stale_ttl, elapsed, tags)
+                    return result
 
-                if cached_result is not None:
-                    return cached_result
+                entry = cache.get_entry(cache_key)
+                if entry is not None:
+                    record_hit(entry)
+                    if needs_refresh(entry, early_refresh):
+                        _spawn_sync_refresh(cache_key, compute)
+                    return entry["value"]
 
-                result = func(*args, **kwargs)
-                cache.set(cache_key, result, ttl)
-                return result
+                stats.misses += 1
+                if not settings.cache_singleflight:
+                    return compute()
+                return singleflight.do_sync(cache_key, compute)
+            sync_wrapper.cache_namespace = func_namespace
+            sync_wrapper.cache_stats = stats
             return sync_wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
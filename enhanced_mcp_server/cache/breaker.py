@@ -0,0 +1,94 @@
+"""Circuit breaker para o Redis.
+
+Estados:
+
+- ``closed``: operações liberadas; falhas consecutivas são contadas.
+- ``open``: após ``failure_threshold`` falhas, o Redis é ignorado por
+  ``recovery_timeout`` segundos e o cache usa a memória sem esperar timeouts.
+- ``half_open``: passado esse tempo, uma única operação de teste é liberada;
+  sucesso fecha o circuito, falha o reabre.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Circuit breaker thread-safe com sonda única no estado half-open."""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indica se uma operação pode ir ao Redis agora."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN:
+                if now - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_started = now
+                return True
+            if self.state == HALF_OPEN:
+                # Sonda que nunca reportou resultado: libera outra
+                if now - self._probe_started >= self.recovery_timeout:
+                    self._probe_started = now
+                    return True
+                return False
+            return True
+
+    def record_success(self) -> None:
+        if self.state == CLOSED and self.failures == 0:
+            return
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> bool:
+        """Registra uma falha; retorna True se o circuito acabou de abrir."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                    self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probe_started = None
+                self.trips += 1
+                return True
+            return False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probe_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == OPEN and self.opened_at is not None:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": retry_in,
+        }
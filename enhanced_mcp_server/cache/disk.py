@@ -0,0 +1,336 @@
+"""Camada de cache em disco (SQLite em modo WAL) para reinícios "mornos".
+
+Fica abaixo da camada em memória quando não há Redis: misses na memória
+consultam o disco e os acertos são promovidos de volta para a memória.
+
+- Escritas são assíncronas (write-behind): ``put``/``delete`` só enfileiram;
+  uma thread grava em lotes, numa única transação por lote.
+- Leituras usam uma conexão por thread; o WAL permite ler enquanto a thread
+  de escrita grava.
+- Deleções e limpezas ainda na fila valem imediatamente para as leituras:
+  ficam registradas como pendentes até serem gravadas, e ``generation`` muda
+  a cada uma, para que quem leu uma linha antiga possa descartá-la.
+- A validade é aplicada na leitura (``expires_at``) e numa compactação
+  periódica que remove entradas vencidas e, acima de ``max_bytes``, as que
+  venceriam primeiro, liberando o espaço com ``incremental_vacuum``.
+"""
+
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from enhanced_mcp_server.cache import envelope
+from enhanced_mcp_server.metrics import CACHE_EVICTIONS
+from enhanced_mcp_server.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    tags TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+"""
+
+# Operações da fila de escrita
+_PUT, _DELETE, _DELETE_PREFIX, _DELETE_TAGS, _CLEAR, _FLUSH = range(6)
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Na coluna ``tags`` cada tag fica entre vírgulas (",a,,b,"); vírgulas e "%"
+# dentro da tag são escapados como %2C/%25 para não quebrar a separação
+_TAG_ESCAPES = re.compile(r"%(25|2C)")
+
+
+def _tag_escape(tag: str) -> str:
+    return tag.replace("%", "%25").replace(",", "%2C")
+
+
+def _tag_unescape(tag: str) -> str:
+    return _TAG_ESCAPES.sub(lambda m: "%" if m.group(1) == "25" else ",", tag)
+
+
+def _tags_column(tags: Iterable[str]) -> str:
+    return "".join(f",{_tag_escape(tag)}," for tag in tags)
+
+
+def _row_entry(value: bytes, tags: str) -> Dict[str, Any]:
+    # As tags não fazem parte do envelope; voltam da coluna própria
+    entry = envelope.decode(value)
+    if tags:
+        entry["tags"] = [_tag_unescape(tag) for tag in tags[1:-1].split(",,")]
+    return entry
+
+
+class DiskStore:
+    """Armazenamento persistente com escrita em segundo plano."""
+
+    def __init__(self, path: str, max_bytes: int = 0, flush_interval: float = 0.5,
+                 compact_interval: float = 60.0, queue_size: int = 10000, batch_size: int = 500):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.batch_size = batch_size
+        self.dropped_writes = 0
+        self._queue: "queue.Queue[Tuple[int, Any]]" = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._closed = False
+        # Invalidações enfileiradas e ainda não gravadas
+        self.generation = 0
+        self._pending_lock = threading.Lock()
+        self._tombstones: Dict[str, int] = {}
+        self._pending_bulk: List[Tuple[int, Any]] = []
+
+        with self._connect() as conn:
+            # auto_vacuum só vale se definido antes da primeira tabela
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.executescript(_SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name="cache-disk-writer",
+                                        daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # Leituras (síncronas, na thread do chamador)
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        generation = self.generation
+        row = self._reader().execute(
+            "SELECT value, tags FROM entries WHERE key = ? AND expires_at > ?",
+            (key, time.time() if now is None else now),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = _row_entry(*row)
+        return None if self._invalidated(key, entry, generation) else entry
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        generation = self.generation
+        now = time.time()
+        conn = self._reader()
+        # Limite de parâmetros do SQLite: consulta em lotes
+        for start in range(0, len(keys), 500):
+            batch = list(keys[start:start + 500])
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, value, tags FROM entries WHERE key IN ({placeholders}) "
+                "AND expires_at > ?",
+                (*batch, now),
+            ).fetchall()
+            for key, value, tags in rows:
+                entry = _row_entry(value, tags)
+                if not self._invalidated(key, entry, generation):
+                    found[key] = entry
+        return found
+
+    def _invalidated(self, key: str, entry: Dict[str, Any], generation: int) -> bool:
+        """Indica se a linha lida pode ter sido apagada por uma invalidação.
+
+        Uma invalidação pendente que a atinge, ou qualquer invalidação feita
+        desde ``generation`` (talvez já gravada após a leitura), descarta a linha.
+        """
+        with self._pending_lock:
+            if self.generation != generation or key in self._tombstones:
+                return True
+            tags = set(entry.get("tags", ()))
+            for op, payload in self._pending_bulk:
+                if (op == _CLEAR or (op == _DELETE_PREFIX and key.startswith(payload))
+                        or (op == _DELETE_TAGS and not tags.isdisjoint(payload))):
+                    return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._reader().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "pending_writes": self._queue.qsize(),
+            "dropped_writes": self.dropped_writes,
+        }
+
+    # Escritas (enfileiradas)
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        self._enqueue(_PUT, (key, entry))
+
+    def delete(self, key: str) -> None:
+        with self._pending_lock:
+            self.generation += 1
+            self._tombstones[key] = self._tombstones.get(key, 0) + 1
+        self._enqueue(_DELETE, key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        self._enqueue_bulk(_DELETE_PREFIX, prefix)
+
+    def delete_tags(self, tags: Iterable[str]) -> None:
+        self._enqueue_bulk(_DELETE_TAGS, set(tags))
+
+    def clear(self) -> None:
+        self._enqueue_bulk(_CLEAR, None)
+
+    def _enqueue_bulk(self, op: int, payload: Any) -> None:
+        # A tupla registrada é a própria carga da fila: removida por identidade
+        record = (op, payload)
+        with self._pending_lock:
+            self.generation += 1
+            self._pending_bulk.append(record)
+        self._enqueue(op, record)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila de escrita esvaziar (inclui o que já foi enfileirado)."""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush(timeout=10.0)
+        self._closed = True
+        self._queue.put((_FLUSH, None))
+        self._writer.join(timeout=10.0)
+
+    def _enqueue(self, op: int, payload: Any) -> None:
+        try:
+            self._queue.put_nowait((op, payload))
+        except queue.Full:
+            # É um cache: perder uma escrita é melhor que bloquear o chamador.
+            # Deleções e limpezas não podem ser perdidas.
+            if op == _PUT:
+                self.dropped_writes += 1
+            else:
+                self._queue.put((op, payload))
+
+    # Thread de escrita
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        last_compact = time.monotonic()
+        while not self._closed:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._apply(conn, batch)
+                except Exception as e:
+                    logger.error(f"Disk cache write error: {e}")
+                self._settle(batch)
+                for op, payload in batch:
+                    if op == _FLUSH and payload is not None:
+                        payload.set()
+            if time.monotonic() - last_compact >= self.compact_interval:
+                last_compact = time.monotonic()
+                try:
+                    self.compact(conn)
+                except Exception as e:
+                    logger.error(f"Disk cache compaction error: {e}")
+        conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, batch: List[Tuple[int, Any]]) -> None:
+        conn.execute("BEGIN")
+        try:
+            for op, payload in batch:
+                if op == _PUT:
+                    key, entry = payload
+                    data = envelope.encode(entry, tier="disk")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, value, expires_at, size, tags) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, data, entry["expires_at"], len(key) + len(data),
+                         _tags_column(entry.get("tags", ()))),
+                    )
+                elif op == _DELETE:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (payload,))
+                elif op == _DELETE_PREFIX:
+                    conn.execute("DELETE FROM entries WHERE key LIKE ? ESCAPE '\\'",
+                                 (_like_escape(payload[1]) + "%",))
+                elif op == _DELETE_TAGS:
+                    for tag in payload[1]:
+                        conn.execute("DELETE FROM entries WHERE tags LIKE ? ESCAPE '\\'",
+                                     (f"%,{_like_escape(_tag_escape(tag))},%",))
+                elif op == _CLEAR:
+                    conn.execute("DELETE FROM entries")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _settle(self, batch: List[Tuple[int, Any]]) -> None:
+        """Retira das pendências as invalidações do lote já gravado."""
+        with self._pending_lock:
+            for op, payload in batch:
+                if op == _DELETE:
+                    count = self._tombstones.get(payload, 0) - 1
+                    if count > 0:
+                        self._tombstones[payload] = count
+                    else:
+                        self._tombstones.pop(payload, None)
+                elif op in (_DELETE_PREFIX, _DELETE_TAGS, _CLEAR):
+                    self._pending_bulk = [record for record in self._pending_bulk
+                                          if record is not payload]
+
+    def compact(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Remove vencidas e aplica o limite de tamanho; retorna quantas removeu."""
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            expired = conn.execute("DELETE FROM entries WHERE expires_at <= ?",
+                                   (time.time(),)).rowcount
+            evicted = 0
+            if self.max_bytes:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total > self.max_bytes:
+                    # Libera até 90% do limite, começando pelas que venceriam primeiro
+                    excess = total - int(self.max_bytes * 0.9)
+                    victims = []
+                    for key, size in conn.execute(
+                            "SELECT key, size FROM entries ORDER BY expires_at"):
+                        victims.append((key,))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+                    evicted = len(victims)
+            if expired or evicted:
+                conn.execute("PRAGMA incremental_vacuum")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                CACHE_EVICTIONS.labels("disk", "expired").inc(expired)
+                CACHE_EVICTIONS.labels("disk", "capacity").inc(evicted)
+            return expired + evicted
+        finally:
+            if own:
+                conn.close()
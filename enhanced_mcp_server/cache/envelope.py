@@ -0,0 +1,114 @@
+"""Formato binário das entradas gravadas no Redis.
+
+Layout: cabeçalho fixo ``struct`` (magic, flags, created_at, fresh_until,
+expires_at, delta) seguido do valor serializado pelo codec JSON, comprimido
+quando passa de ``CACHE_COMPRESS_THRESHOLD`` bytes. Usa zstd quando o pacote
+``zstandard`` está instalado e zlib caso contrário; a compressão só é mantida
+se de fato reduzir o tamanho.
+
+A validade é garantida pelo TTL do próprio Redis (SETEX); os tempos do
+cabeçalho servem apenas para stale-while-revalidate, renovação antecipada e
+para limitar cópias no L1. Entradas no formato antigo (envelope JSON) ainda
+são lidas.
+
+O mesmo formato é usado pelo tier em disco e pelos snapshots; o parâmetro
+``tier`` de ``encode`` separa os bytes de cada destino na métrica
+``cache_encoded_bytes_total``.
+"""
+
+import struct
+import zlib
+from typing import Any, Dict
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.metrics import CACHE_ENCODED_BYTES
+from enhanced_mcp_server.utils import codec
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende do ambiente
+    zstandard = None
+
+MAGIC = 0xC7
+FLAG_ZLIB = 0x01
+FLAG_ZSTD = 0x02
+
+_HEADER = struct.Struct("<BBdddf")
+
+TIERS = ("redis", "disk", "snapshot")
+
+# Contadores (raw, stored) por destino
+_encoded_bytes = {tier: (CACHE_ENCODED_BYTES.labels(tier, "raw"),
+                         CACHE_ENCODED_BYTES.labels(tier, "stored"))
+                  for tier in TIERS}
+
+
+def _compressor() -> str:
+    choice = settings.cache_compression
+    if choice == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if choice == "zstd" and zstandard is None:
+        return "zlib"
+    return choice
+
+
+def _compress(payload: bytes):
+    method = _compressor()
+    if method == "zstd":
+        return zstandard.ZstdCompressor(level=settings.cache_compress_level).compress(payload), FLAG_ZSTD
+    if method == "zlib":
+        return zlib.compress(payload, settings.cache_compress_level), FLAG_ZLIB
+    return payload, 0
+
+
+def encode(entry: Dict[str, Any], tier: str = "redis") -> bytes:
+    """Serializa uma entrada do cache no formato binário para o destino ``tier``."""
+    payload = codec.dumps(entry["value"])
+    raw_size = len(payload)
+    flags = 0
+    threshold = settings.cache_compress_threshold
+    if threshold and raw_size >= threshold:
+        compressed, method_flag = _compress(payload)
+        if method_flag and len(compressed) < raw_size:
+            payload, flags = compressed, method_flag
+
+    header = _HEADER.pack(
+        MAGIC, flags,
+        entry["created_at"],
+        entry.get("fresh_until", entry["expires_at"]),
+        entry["expires_at"],
+        entry.get("delta", 0.0),
+    )
+    raw_bytes, stored_bytes = _encoded_bytes[tier]
+    raw_bytes.inc(raw_size)
+    stored_bytes.inc(len(payload))
+    return header + payload
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """Reconstrói a entrada (mesmo formato de ``Cache._make_entry``)."""
+    if not data or data[0] != MAGIC:
+        return codec.loads(data)
+
+    _, flags, created_at, fresh_until, expires_at, delta = _HEADER.unpack_from(data)
+    payload = memoryview(data)[_HEADER.size:]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise ValueError("Entrada comprimida com zstd, mas zstandard não está instalado")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+
+    entry = {"value": codec.loads(bytes(payload)), "created_at": created_at,
+             "expires_at": expires_at}
+    if fresh_until < expires_at:
+        entry["fresh_until"] = fresh_until
+    if delta:
+        entry["delta"] = delta
+    return entry
+
+
+def bytes_saved(tier: str = "redis") -> int:
+    """Bytes economizados pela compressão em ``tier`` desde o início do processo."""
+    raw_bytes, stored_bytes = _encoded_bytes[tier]
+    return int(raw_bytes.value - stored_bytes.value)
@@ -0,0 +1,94 @@
+"""Chaves de cache compactas e estáveis.
+
+Formato: ``<prefixo>:<namespace>:<versão>:<digest>``; conjuntos de tags
+ficam em ``<prefixo>#tag:<tag>``. Os argumentos são
+serializados de forma canônica (JSON com chaves ordenadas) e resumidos com
+BLAKE2b de 128 bits, então o tamanho da chave não depende do tamanho do
+texto e o valor não muda entre processos. Objetos sem representação estável
+(repr padrão com endereço de memória) são recusados com ``TypeError``.
+"""
+
+import dataclasses
+import hashlib
+import json
+from typing import Any, Iterable
+
+from enhanced_mcp_server.config import settings
+
+_GLOB_SPECIAL = str.maketrans({c: f"\\{c}" for c in "*?[]\\"})
+
+
+def _canonical_default(value: Any) -> Any:
+    """Converte tipos não-JSON numa forma estável."""
+    cache_key = getattr(value, "__cache_key__", None)
+    if callable(cache_key):
+        return cache_key()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {"__dataclass__": type(value).__qualname__, **dataclasses.asdict(value)}
+    model_dump = getattr(value, "model_dump", None)
+    if callable(model_dump):
+        return {"__model__": type(value).__qualname__, **model_dump(mode="json")}
+    if isinstance(value, (set, frozenset)):
+        return sorted(canonical(item) for item in value)
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": bytes(value).hex()}
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError(
+        f"Argumento sem chave de cache estável: {type(value).__qualname__} "
+        "(defina __cache_key__)"
+    )
+
+
+def canonical(value: Any) -> str:
+    """Serialização canônica usada no digest."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                      default=_canonical_default)
+
+
+def namespace_prefix(namespace: str) -> str:
+    return f"{settings.cache_key_prefix}:{namespace}:"
+
+
+def make_key(namespace: str, args: tuple = (), kwargs: dict = None, version: str = "1") -> str:
+    """Gera a chave de cache para uma chamada."""
+    payload = canonical([list(args), kwargs or {}])
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{namespace_prefix(namespace)}{version}:{digest}"
+
+
+def tag_key(tag: str) -> str:
+    """Chave do conjunto (Redis) com as chaves marcadas com ``tag``.
+
+    Usa ``#`` em vez de ``:`` depois do prefixo, então fica fora do espaço
+    ``<prefixo>:<namespace>:`` e nenhum namespace colide com ela.
+    """
+    return f"{settings.cache_key_prefix}#tag:{tag}"
+
+
+def glob_escape(value: str) -> str:
+    """Escapa caracteres especiais de padrões MATCH do Redis."""
+    return value.translate(_GLOB_SPECIAL)
+
+
+def namespace_pattern(namespace: str = None) -> str:
+    """Padrão SCAN de um namespace, ou de todo o prefixo do cache."""
+    if namespace is None:
+        return f"{glob_escape(settings.cache_key_prefix)}:*"
+    return f"{glob_escape(namespace_prefix(namespace))}*"
+
+
+def tag_pattern() -> str:
+    """Padrão SCAN de todos os conjuntos de tags."""
+    return f"{glob_escape(settings.cache_key_prefix)}#tag:*"
+
+
+def chunks(items: Iterable[Any], size: int) -> Iterable[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
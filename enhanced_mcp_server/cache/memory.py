@@ -0,0 +1,398 @@
+"""Camada de cache em memória com limite de entradas e de bytes.
+
+Duas políticas de despejo, ambas O(1) por operação:
+
+- ``lru``: uma única lista LRU.
+- ``slru``: LRU segmentada (probation + protected). Entradas novas entram em
+  probation e só sobem para protected quando lidas de novo, então uma
+  varredura de chaves únicas não expulsa o conjunto quente.
+
+Entradas com prazo de validade ficam indexadas numa roda de tempo (um
+conjunto de chaves por intervalo de ``expiry_resolution`` segundos), então
+``expire`` remove as vencidas em fatias limitadas sem varrer o cache inteiro.
+
+``MemoryStore`` não é thread-safe. ``ShardedMemoryStore`` divide as chaves
+em N segmentos, cada um com seu lock, para que threads acessando chaves
+diferentes não disputem um único lock global.
+"""
+
+import heapq
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from enhanced_mcp_server.utils import codec
+
+POLICIES = ("lru", "slru")
+
+# Custo aproximado por entrada além da chave e do valor (nós do OrderedDict,
+# tupla interna e o dict com value/expires_at/created_at)
+ENTRY_OVERHEAD = 200
+
+
+def estimate_size(key: str, value: Any) -> int:
+    """Estimativa barata do tamanho de uma entrada em bytes."""
+    try:
+        payload = len(codec.dumps(value))
+    except Exception:
+        payload = sys.getsizeof(value)
+    return len(key) + payload + ENTRY_OVERHEAD
+
+
+class MemoryStore:
+    """Armazenamento limitado por número de entradas e por bytes.
+
+    Limites iguais a 0 desativam a respectiva restrição.
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, policy: str = "slru",
+                 protected_ratio: float = 0.8, expiry_resolution: float = 1.0,
+                 on_evict: Optional[Callable[[str, Any], None]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de despejo inválida: {policy}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        # Cotas do segmento protegido, nas mesmas unidades dos limites ativos
+        # (entradas e/ou bytes); com só ``max_bytes``, a cota é em bytes
+        slru = policy == "slru"
+        self._protected_cap = int(max_entries * protected_ratio) if slru else 0
+        self._protected_bytes_cap = int(max_bytes * protected_ratio) if slru else 0
+        self._protected_bytes = 0
+        # Itens: (valor, tamanho, tick de expiração ou None)
+        self._probation: "OrderedDict[str, Tuple[Any, int, Optional[int]]]" = OrderedDict()
+        self._protected: "OrderedDict[str, Tuple[Any, int, Optional[int]]]" = OrderedDict()
+        self._on_evict = on_evict
+        self._resolution = expiry_resolution
+        self._buckets: Dict[int, Set[str]] = {}
+        self._ticks: List[int] = []
+        self.bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._probation) + len(self._protected)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._probation or key in self._protected
+
+    def get(self, key: str) -> Optional[Any]:
+        """Retorna o valor e registra o acesso, ou None."""
+        item = self._protected.get(key)
+        if item is not None:
+            self._protected.move_to_end(key)
+            return item[0]
+        item = self._probation.get(key)
+        if item is None:
+            return None
+        if self.policy == "lru":
+            self._probation.move_to_end(key)
+        else:
+            # Segundo acesso: promove para o segmento protegido
+            del self._probation[key]
+            self._protected[key] = item
+            self._protected_bytes += item[1]
+            self._demote()
+        return item[0]
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Retorna o valor sem alterar a ordem de despejo."""
+        item = self._protected.get(key) or self._probation.get(key)
+        return item[0] if item is not None else None
+
+    def set(self, key: str, value: Any, size: Optional[int] = None,
+            expires_at: Optional[float] = None) -> bool:
+        """Armazena o valor; retorna False se ele não cabe no limite de bytes."""
+        if size is None:
+            size = estimate_size(key, value)
+        if self.max_bytes and size > self.max_bytes:
+            self.pop(key)
+            return False
+
+        tick = self._schedule(key, expires_at)
+        old = self._protected.get(key)
+        if old is not None:
+            self._protected[key] = (value, size, tick)
+            self._protected.move_to_end(key)
+            self._protected_bytes += size - old[1]
+        else:
+            old = self._probation.pop(key, None)
+            self._probation[key] = (value, size, tick)
+        if old is not None:
+            self.bytes -= old[1]
+            if old[2] != tick:
+                self._unschedule(key, old[2])
+        self.bytes += size
+        self._demote()
+        self._evict()
+        return True
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        item = self._probation.pop(key, None)
+        if item is None:
+            item = self._protected.pop(key, None)
+            if item is None:
+                return default
+            self._protected_bytes -= item[1]
+        self.bytes -= item[1]
+        self._unschedule(key, item[2])
+        return item[0]
+
+    def clear(self) -> None:
+        self._probation.clear()
+        self._protected.clear()
+        self._buckets.clear()
+        self._ticks.clear()
+        self.bytes = 0
+        self._protected_bytes = 0
+
+    def expire(self, now: float, limit: int) -> int:
+        """Remove até ``limit`` entradas vencidas; retorna quantas removeu.
+
+        Só percorre intervalos já encerrados da roda de tempo, então o custo
+        é proporcional ao número de entradas removidas.
+        """
+        current = int(now // self._resolution)
+        removed = 0
+        while self._ticks and self._ticks[0] < current and removed < limit:
+            tick = self._ticks[0]
+            bucket = self._buckets.get(tick)
+            while bucket and removed < limit:
+                key = bucket.pop()
+                item = self._probation.pop(key, None)
+                if item is None:
+                    item = self._protected.pop(key)
+                    self._protected_bytes -= item[1]
+                self.bytes -= item[1]
+                removed += 1
+            if not bucket:
+                heapq.heappop(self._ticks)
+                self._buckets.pop(tick, None)
+        return removed
+
+    def items(self):
+        """Itera (chave, valor) do mais antigo para o mais recente."""
+        for segment in (self._probation, self._protected):
+            for key, item in list(segment.items()):
+                yield key, item[0]
+
+    def hot_keys(self) -> List[str]:
+        """Chaves da mais para a menos usada (protected antes de probation, MRU primeiro)."""
+        return list(reversed(self._protected)) + list(reversed(self._probation))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "entries": len(self),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "protected": len(self._protected),
+            "evictions": self.evictions,
+            "expiry_buckets": len(self._buckets),
+        }
+
+    def _schedule(self, key: str, expires_at: Optional[float]) -> Optional[int]:
+        if expires_at is None:
+            return None
+        tick = int(expires_at // self._resolution)
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = set()
+            heapq.heappush(self._ticks, tick)
+        bucket.add(key)
+        return tick
+
+    def _unschedule(self, key: str, tick: Optional[int]) -> None:
+        if tick is not None:
+            bucket = self._buckets.get(tick)
+            if bucket is not None:
+                bucket.discard(key)
+
+    def _demote(self) -> None:
+        """Mantém o segmento protegido dentro da sua cota."""
+        while self._protected and (
+                (self.max_entries and len(self._protected) > self._protected_cap)
+                or (self.max_bytes and self._protected_bytes > self._protected_bytes_cap)):
+            key, item = self._protected.popitem(last=False)
+            self._protected_bytes -= item[1]
+            self._probation[key] = item
+
+    def _over_limit(self) -> bool:
+        return bool((self.max_entries and len(self) > self.max_entries)
+                    or (self.max_bytes and self.bytes > self.max_bytes))
+
+    def _evict(self) -> None:
+        while self._over_limit():
+            segment = self._probation if self._probation else self._protected
+            key, (value, size, tick) = segment.popitem(last=False)
+            if segment is self._protected:
+                self._protected_bytes -= size
+            self.bytes -= size
+            self._unschedule(key, tick)
+            self.evictions += 1
+            if self._on_evict is not None:
+                self._on_evict(key, value)
+
+
+class ShardedMemoryStore:
+    """``MemoryStore`` thread-safe particionado em segmentos com locks próprios.
+
+    Os limites são divididos entre os segmentos, então o despejo é por
+    segmento (LRU/SLRU aproximado no total).
+    """
+
+    def __init__(self, shards: int = 16, max_entries: int = 0, max_bytes: int = 0,
+                 policy: str = "slru", on_evict: Optional[Callable[[str, Any], None]] = None):
+        shards = max(1, shards)
+        if max_entries:
+            shards = min(shards, max_entries)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._shards: List[Tuple[MemoryStore, threading.Lock]] = [
+            (MemoryStore(max_entries=self._split(max_entries, shards, i),
+                         max_bytes=self._split(max_bytes, shards, i),
+                         policy=policy, on_evict=on_evict), threading.Lock())
+            for i in range(shards)
+        ]
+
+    @staticmethod
+    def _split(total: int, shards: int, index: int) -> int:
+        # Divide o limite sem perder o resto (0 continua sendo "sem limite")
+        return total // shards + (1 if index < total % shards else 0)
+
+    def _shard(self, key: str) -> Tuple[MemoryStore, threading.Lock]:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def __len__(self) -> int:
+        return sum(len(store) for store, _ in self._shards)
+
+    def __contains__(self, key: str) -> bool:
+        store, lock = self._shard(key)
+        with lock:
+            return key in store
+
+    @property
+    def bytes(self) -> int:
+        return sum(store.bytes for store, _ in self._shards)
+
+    @property
+    def evictions(self) -> int:
+        return sum(store.evictions for store, _ in self._shards)
+
+    def get(self, key: str) -> Optional[Any]:
+        store, lock = self._shard(key)
+        with lock:
+            return store.get(key)
+
+    def peek(self, key: str) -> Optional[Any]:
+        store, lock = self._shard(key)
+        with lock:
+            return store.peek(key)
+
+    def set(self, key: str, value: Any, size: Optional[int] = None,
+            expires_at: Optional[float] = None) -> bool:
+        store, lock = self._shard(key)
+        with lock:
+            return store.set(key, value, size, expires_at)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        store, lock = self._shard(key)
+        with lock:
+            return store.pop(key, default)
+
+    def _group(self, keys: Iterable[str]) -> Dict[int, List[str]]:
+        groups: Dict[int, List[str]] = {}
+        count = len(self._shards)
+        for key in keys:
+            groups.setdefault(hash(key) % count, []).append(key)
+        return groups
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Lê várias chaves adquirindo o lock de cada segmento uma única vez."""
+        found: Dict[str, Any] = {}
+        for index, group in self._group(keys).items():
+            store, lock = self._shards[index]
+            with lock:
+                for key in group:
+                    value = store.get(key)
+                    if value is not None:
+                        found[key] = value
+        return found
+
+    def set_many(self, items: Iterable[Tuple[str, Any, Optional[int], Optional[float]]]) -> None:
+        """Grava tuplas (chave, valor, tamanho, expires_at) agrupadas por segmento."""
+        by_key = {item[0]: item for item in items}
+        for index, group in self._group(by_key).items():
+            store, lock = self._shards[index]
+            with lock:
+                for key in group:
+                    store.set(*by_key[key])
+
+    def pop_many(self, keys: Iterable[str]) -> int:
+        """Remove várias chaves; retorna quantas existiam."""
+        removed = 0
+        for index, group in self._group(keys).items():
+            store, lock = self._shards[index]
+            with lock:
+                for key in group:
+                    if store.pop(key) is not None:
+                        removed += 1
+        return removed
+
+    def discard(self, key: str, value: Any) -> bool:
+        """Remove ``key`` só se ainda guardar ``value`` (não apaga uma escrita mais nova)."""
+        store, lock = self._shard(key)
+        with lock:
+            if store.peek(key) is not value:
+                return False
+            store.pop(key)
+            return True
+
+    def clear(self) -> None:
+        for store, lock in self._shards:
+            with lock:
+                store.clear()
+
+    def expire(self, now: float, limit: int) -> int:
+        """Remove até ``limit`` entradas vencidas, um segmento por vez."""
+        removed = 0
+        for store, lock in self._shards:
+            if removed >= limit:
+                break
+            with lock:
+                removed += store.expire(now, limit - removed)
+        return removed
+
+    def items(self):
+        """Itera (chave, valor) segmento a segmento."""
+        for store, lock in self._shards:
+            with lock:
+                items = list(store.items())
+            yield from items
+
+    def hot_keys(self) -> List[str]:
+        """Chaves protected de todos os segmentos, depois as de probation (MRU primeiro)."""
+        protected: List[str] = []
+        probation: List[str] = []
+        for store, lock in self._shards:
+            with lock:
+                protected.extend(reversed(store._protected))
+                probation.extend(reversed(store._probation))
+        return protected + probation
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {"entries": 0, "bytes": 0, "protected": 0, "evictions": 0, "expiry_buckets": 0}
+        for store, lock in self._shards:
+            with lock:
+                shard = store.stats()
+            for name in totals:
+                totals[name] += shard[name]
+        return {
+            "policy": self.policy,
+            "shards": len(self._shards),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **totals,
+        }
@@ -0,0 +1,184 @@
+"""Coalescência de misses concorrentes ("single-flight").
+
+Quando várias chamadas pedem a mesma chave ausente, só a primeira executa a
+função; as demais esperam o resultado dela. No mesmo processo isso usa
+futures. Entre workers, um lock no Redis (``SET NX PX`` com lease curto)
+elege quem recalcula, e os demais consultam o cache até o valor aparecer,
+o lock sumir ou ``CACHE_LOCK_TIMEOUT`` estourar — nesse caso calculam por
+conta própria.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+import redis.asyncio as aioredis
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Remove o lock apenas se ainda pertencer a quem o criou
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _LeaderGone(Exception):
+    """A chamada líder foi cancelada; quem esperava deve tentar de novo."""
+
+
+def _settle(future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    if future.done():
+        return
+    if error is None:
+        future.set_result(result)
+    else:
+        future.set_exception(error)
+        # Evita o aviso de exceção nunca lida quando não há ninguém esperando
+        future.exception()
+
+
+class SingleFlight:
+    """Agrupa chamadas concorrentes pela mesma chave numa única execução."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._sync_calls: Dict[str, concurrent.futures.Future] = {}
+        self._sync_lock = threading.Lock()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa ``fn`` uma vez por chave entre as corrotinas concorrentes."""
+        loop = asyncio.get_running_loop()
+        while True:
+            future = self._calls.get(key)
+            if future is None or future.get_loop() is not loop:
+                break
+            try:
+                return await asyncio.shield(future)
+            except _LeaderGone:
+                continue
+
+        future = loop.create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            _settle(future, error=_LeaderGone())
+            raise
+        except BaseException as e:
+            _settle(future, error=e)
+            raise
+        else:
+            _settle(future, result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do_sync(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Equivalente de ``do`` para funções síncronas chamadas de várias threads."""
+        with self._sync_lock:
+            future = self._sync_calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._sync_calls[key] = concurrent.futures.Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            _settle(future, error=e)
+            raise
+        else:
+            _settle(future, result)
+            return result
+        finally:
+            with self._sync_lock:
+                self._sync_calls.pop(key, None)
+
+
+async def acquire_lock(client: aioredis.Redis, key: str, lease: float) -> Optional[str]:
+    """Tenta obter o lock distribuído; retorna o token ou None se ocupado."""
+    token = uuid.uuid4().hex
+    acquired = await client.set(f"lock:{key}", token, nx=True, px=max(1, int(lease * 1000)))
+    return token if acquired else None
+
+
+async def release_lock(client: aioredis.Redis, key: str, token: str) -> None:
+    try:
+        await client.eval(RELEASE_LOCK_LUA, 1, f"lock:{key}", token)
+    except Exception as e:
+        logger.warning(f"Cache lock release error: {e}")
+
+
+async def wait_for_value(cache, client: aioredis.Redis, key: str) -> Optional[Any]:
+    """Espera outro worker preencher a chave.
+
+    Retorna None se o lock for liberado sem valor ou se o tempo acabar.
+    """
+    deadline = time.monotonic() + settings.cache_lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.cache_lock_poll_interval)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+        try:
+            if not await client.exists(f"lock:{key}"):
+                return None
+        except Exception as e:
+            logger.warning(f"Cache lock error for {key}: {e}")
+            return None
+    logger.warning(f"Timed out waiting for cache fill: {key}")
+    return None
+
+
+async def fill(cache, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[int],
+               stale_ttl: float = 0, tags: Sequence[str] = (), refresh: bool = False,
+               seen_at: float = 0.0) -> Any:
+    """Calcula e grava ``key`` sob o lock distribuído (quando há Redis).
+
+    Com ``refresh=True`` (renovação em segundo plano de uma entrada criada em
+    ``seen_at``), não espera se outro worker já detém o lock e não recalcula
+    se a entrada já foi substituída.
+    """
+    client = await cache.get_async_redis_client()
+    token = None
+    if client is not None:
+        try:
+            token = await acquire_lock(client, key, settings.cache_lock_lease)
+        except Exception as e:
+            logger.warning(f"Cache lock error for {key}: {e}")
+        else:
+            if token is None:
+                if refresh:
+                    return None
+                value = await wait_for_value(cache, client, key)
+                if value is not None:
+                    return value
+
+    try:
+        if token is not None:
+            # Outro worker pode ter gravado entre o miss e o lock
+            entry = await cache.aget_entry(key)
+            if entry is not None and entry["created_at"] > seen_at:
+                return entry["value"]
+        start = time.perf_counter()
+        result = await compute()
+        await cache.aset(key, result, ttl, stale_ttl, time.perf_counter() - start, tags)
+        return result
+    finally:
+        if token is not None:
+            await release_lock(client, key, token)
+
+
+# Instância global usada pelo decorador @cached
+singleflight = SingleFlight()
@@ -0,0 +1,73 @@
+"""Snapshot do conteúdo do cache para aquecer novas instâncias.
+
+Formato: cabeçalho ``MAGIC`` seguido de registros
+``struct "<HHI"`` (tamanho da chave, das tags e do valor) + chave + tags
+(separadas por vírgula) + valor no formato de ``cache.envelope``. Registros
+são escritos e lidos um a um, então nem a exportação nem a importação
+carregam o snapshot inteiro na memória.
+
+A escrita vai para um arquivo temporário renomeado no final: um processo
+interrompido no meio não deixa um snapshot truncado no lugar do anterior.
+"""
+
+import os
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, Union
+
+MAGIC = b"MCPSNAP\x01"
+
+_RECORD = struct.Struct("<HHI")
+
+# (chave, tags, valor codificado)
+Record = Tuple[str, List[str], bytes]
+
+
+class SnapshotError(ValueError):
+    """Arquivo que não é um snapshot válido."""
+
+
+def write(path: str, records: Iterable[Tuple[Union[str, bytes], Iterable[str], bytes]]) -> int:
+    """Grava os registros em ``path``; retorna quantos foram gravados."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            for key, tags, data in records:
+                key_bytes = key if isinstance(key, bytes) else key.encode("utf-8")
+                tag_bytes = ",".join(tags).encode("utf-8")
+                f.write(_RECORD.pack(len(key_bytes), len(tag_bytes), len(data)))
+                f.write(key_bytes)
+                f.write(tag_bytes)
+                f.write(data)
+                count += 1
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return count
+
+
+def read(path: str) -> Iterator[Record]:
+    """Itera os registros de um snapshot, na ordem em que foram gravados."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError(f"Snapshot inválido: {path}")
+        while True:
+            header = f.read(_RECORD.size)
+            if not header:
+                return
+            if len(header) < _RECORD.size:
+                raise SnapshotError(f"Snapshot truncado: {path}")
+            key_len, tags_len, data_len = _RECORD.unpack(header)
+            key = _read_exact(f, key_len, path).decode("utf-8")
+            tags = _read_exact(f, tags_len, path).decode("utf-8")
+            yield key, tags.split(",") if tags else [], _read_exact(f, data_len, path)
+
+
+def _read_exact(f: BinaryIO, size: int, path: str) -> bytes:
+    data = f.read(size)
+    if len(data) < size:
+        raise SnapshotError(f"Snapshot truncado: {path}")
+    return data
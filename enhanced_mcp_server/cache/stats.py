@@ -0,0 +1,78 @@
+"""Estatísticas por função decorada com ``@cached``.
+
+Contadores simples (inteiros e floats) atualizados sem lock; são lidos por
+``/cache/stats`` e exportados no ``/metrics`` por callback, sem custo extra
+no caminho quente.
+"""
+
+from typing import Any, Dict, Iterable, Tuple
+
+from enhanced_mcp_server.metrics import metrics
+
+
+class FunctionStats:
+    """Acertos, falhas e tempo de cálculo de uma função em cache."""
+
+    __slots__ = ("hits", "stale_hits", "misses", "errors", "uncacheable",
+                 "computations", "compute_seconds")
+
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.uncacheable = 0
+        self.computations = 0
+        self.compute_seconds = 0.0
+
+    def record_compute(self, seconds: float) -> None:
+        self.computations += 1
+        self.compute_seconds += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            "errors": self.errors,
+            "uncacheable": self.uncacheable,
+            "computations": self.computations,
+            "avg_compute_ms": (round(self.compute_seconds / self.computations * 1000, 3)
+                               if self.computations else None),
+        }
+
+
+_functions: Dict[str, FunctionStats] = {}
+
+
+def function_stats(namespace: str) -> FunctionStats:
+    """Retorna (criando se preciso) as estatísticas de um namespace."""
+    stats = _functions.get(namespace)
+    if stats is None:
+        stats = _functions.setdefault(namespace, FunctionStats())
+    return stats
+
+
+def all_function_stats() -> Dict[str, Dict[str, Any]]:
+    return {namespace: stats.as_dict() for namespace, stats in sorted(_functions.items())}
+
+
+def _collect_lookups() -> Iterable[Tuple[Tuple[str, ...], float]]:
+    for namespace, stats in list(_functions.items()):
+        yield (namespace, "hit"), stats.hits
+        yield (namespace, "stale"), stats.stale_hits
+        yield (namespace, "miss"), stats.misses
+
+
+def _collect_compute() -> Iterable[Tuple[Tuple[str, ...], float]]:
+    for namespace, stats in list(_functions.items()):
+        yield (namespace,), stats.compute_seconds
+
+
+metrics.callback("cache_function_lookups_total", "Consultas de funções @cached por resultado.",
+                 ("function", "result"), _collect_lookups, kind="counter")
+metrics.callback("cache_function_compute_seconds_total",
+                 "Tempo gasto recalculando funções @cached.", ("function",), _collect_compute,
+                 kind="counter")
@@ -1,6 +1,6 @@
 """Configuração centralizada do Enhanced MCP Server."""
 
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -13,8 +13,58 @@ class Settings(BaseSettings):
     gemini_api_key: Optional[str] = Field(default=None, alias="GEMINI_API_KEY")
 
     # Cache
+    cache_enabled: bool = Field(default=True, alias="CACHE_ENABLED")
     redis_url: Optional[str] = Field(default=None, alias="REDIS_URL")
+    # Pool do cliente redis.asyncio: conexões máximas e espera por uma livre (s)
+    redis_max_connections: int = Field(default=50, alias="REDIS_MAX_CONNECTIONS")
+    redis_pool_timeout: float = Field(default=2.0, alias="REDIS_POOL_TIMEOUT")
+    # Timeout de conexão/comando e circuit breaker (falhas seguidas e segundos até nova tentativa)
+    redis_socket_timeout: float = Field(default=1.0, alias="REDIS_SOCKET_TIMEOUT")
+    redis_breaker_threshold: int = Field(default=5, alias="REDIS_BREAKER_THRESHOLD")
+    redis_breaker_recovery: float = Field(default=30.0, alias="REDIS_BREAKER_RECOVERY")
     cache_ttl: int = Field(default=3600, alias="CACHE_TTL")  # 1 hora
+    # Prefixo de todas as chaves do cache (clear/invalidação não tocam outras chaves)
+    cache_key_prefix: str = Field(default="mcp", alias="CACHE_KEY_PREFIX")
+    # Compressão de valores no Redis: auto (zstd se instalado, senão zlib), zstd, zlib ou none
+    cache_compression: str = Field(default="auto", alias="CACHE_COMPRESSION")
+    cache_compress_threshold: int = Field(default=1024, alias="CACHE_COMPRESS_THRESHOLD")
+    cache_compress_level: int = Field(default=3, alias="CACHE_COMPRESS_LEVEL")
+    # Limites da camada em memória (0 desativa o limite); política lru ou slru
+    cache_max_entries: int = Field(default=10000, alias="CACHE_MAX_ENTRIES")
+    cache_max_bytes: int = Field(default=64 * 1024 * 1024, alias="CACHE_MAX_BYTES")
+    cache_eviction_policy: str = Field(default="slru", alias="CACHE_EVICTION_POLICY")
+    # Segmentos da camada em memória, cada um com seu lock (limites divididos entre eles)
+    cache_memory_shards: int = Field(default=16, alias="CACHE_MEMORY_SHARDS")
+    # Varredura ativa de entradas expiradas (0 desativa) e tamanho de cada fatia
+    cache_sweep_interval: float = Field(default=1.0, alias="CACHE_SWEEP_INTERVAL")
+    cache_sweep_batch: int = Field(default=256, alias="CACHE_SWEEP_BATCH")
+    # Camada em disco (SQLite/WAL) abaixo da memória, sem Redis; caminho vazio desativa.
+    # Escrita em segundo plano a cada flush_interval; compactação (TTL e limite) a cada compact_interval
+    cache_disk_path: Optional[str] = Field(default=None, alias="CACHE_DISK_PATH")
+    cache_disk_max_bytes: int = Field(default=256 * 1024 * 1024, alias="CACHE_DISK_MAX_BYTES")
+    cache_disk_flush_interval: float = Field(default=0.5, alias="CACHE_DISK_FLUSH_INTERVAL")
+    cache_disk_compact_interval: float = Field(default=60.0, alias="CACHE_DISK_COMPACT_INTERVAL")
+    # Snapshot para aquecer novas instâncias: carregado no startup (no máximo warmup_limit
+    # entradas, 0 = todas, as mais usadas primeiro) e gravado no shutdown
+    cache_snapshot_path: Optional[str] = Field(default=None, alias="CACHE_SNAPSHOT_PATH")
+    cache_warmup_limit: int = Field(default=0, alias="CACHE_WARMUP_LIMIT")
+    cache_snapshot_on_shutdown: bool = Field(default=True, alias="CACHE_SNAPSHOT_ON_SHUTDOWN")
+    # L1 em processo na frente do Redis, invalidado via pub/sub
+    cache_l1_enabled: bool = Field(default=False, alias="CACHE_L1_ENABLED")
+    cache_l1_ttl: float = Field(default=5.0, alias="CACHE_L1_TTL")
+    cache_l1_max_entries: int = Field(default=1000, alias="CACHE_L1_MAX_ENTRIES")
+    cache_invalidation_channel: str = Field(default="mcp:cache:invalidate", alias="CACHE_INVALIDATION_CHANNEL")
+    # Single-flight: lease do lock no Redis, espera máxima por outro worker e intervalo de consulta (s)
+    cache_singleflight: bool = Field(default=True, alias="CACHE_SINGLEFLIGHT")
+    cache_lock_lease: float = Field(default=10.0, alias="CACHE_LOCK_LEASE")
+    cache_lock_timeout: float = Field(default=5.0, alias="CACHE_LOCK_TIMEOUT")
+    cache_lock_poll_interval: float = Field(default=0.05, alias="CACHE_LOCK_POLL_INTERVAL")
+
+    # Serialização JSON: auto, orjson, msgspec ou json
+    json_codec: str = Field(default="auto", alias="JSON_CODEC")
+
+    # Métricas Prometheus
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
 
     # Logging
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
@@ -32,10 +82,47 @@ class Settings(BaseSettings):
     # Timeouts
     request_timeout: int = Field(default=30, alias="REQUEST_TIMEOUT")
     translation_timeout: int = Field(default=60, alias="TRANSLATION_TIMEOUT")
+    # Cliente HTTP compartilhado para serviços externos: HTTP/2 (requer h2), limites do pool,
+    # tempo de vida de conexões ociosas e timeout de conexão (s)
+    upstream_http2: bool = Field(default=True, alias="UPSTREAM_HTTP2")
+    upstream_max_connections: int = Field(default=100, alias="UPSTREAM_MAX_CONNECTIONS")
+    upstream_max_keepalive: int = Field(default=20, alias="UPSTREAM_MAX_KEEPALIVE")
+    upstream_keepalive_expiry: float = Field(default=30.0, alias="UPSTREAM_KEEPALIVE_EXPIRY")
+    upstream_connect_timeout: float = Field(default=5.0, alias="UPSTREAM_CONNECT_TIMEOUT")
 
     # Rate Limiting
     rate_limit_requests: int = Field(default=100, alias="RATE_LIMIT_REQUESTS")
     rate_limit_window: int = Field(default=60, alias="RATE_LIMIT_WINDOW")  # segundos
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    # Requisições por janela por papel (APIKey.role); valores <= 0 removem o limite
+    rate_limit_role_overrides: Dict[str, int] = Field(default_factory=dict, alias="RATE_LIMIT_ROLE_OVERRIDES")
+    rate_limit_trust_forwarded: bool = Field(default=False, alias="RATE_LIMIT_TRUST_FORWARDED")
+
+    # JSON-RPC batch
+    mcp_batch_concurrency: int = Field(default=8, alias="MCP_BATCH_CONCURRENCY")
+    mcp_batch_max_size: int = Field(default=100, alias="MCP_BATCH_MAX_SIZE")
+
+    # Caminho rápido ASGI para /mcp
+    mcp_fast_path: bool = Field(default=True, alias="MCP_FAST_PATH")
+
+    # Streamable HTTP (SSE e sessões)
+    mcp_session_ttl: int = Field(default=3600, alias="MCP_SESSION_TTL")  # segundos
+    mcp_max_sessions: int = Field(default=10000, alias="MCP_MAX_SESSIONS")
+    mcp_sse_queue_size: int = Field(default=64, alias="MCP_SSE_QUEUE_SIZE")
+
+    # Prazo padrão de tools/call quando o cliente não envia um (segundos; 0 = sem prazo)
+    tool_call_timeout: float = Field(default=0, alias="TOOL_CALL_TIMEOUT")
+
+    # Controle de admissão por ferramenta
+    tool_max_concurrency: int = Field(default=16, alias="TOOL_MAX_CONCURRENCY")
+    tool_concurrency_limits: Dict[str, int] = Field(default_factory=dict, alias="TOOL_CONCURRENCY_LIMITS")
+    tool_queue_size: int = Field(default=64, alias="TOOL_QUEUE_SIZE")
+    tool_queue_timeout: float = Field(default=5.0, alias="TOOL_QUEUE_TIMEOUT")  # segundos
+    tool_retry_after: int = Field(default=1, alias="TOOL_RETRY_AFTER")  # segundos
+
+    # Transporte stdio
+    mcp_stdio_concurrency: int = Field(default=32, alias="MCP_STDIO_CONCURRENCY")
+    mcp_stdio_max_line: int = Field(default=16 * 1024 * 1024, alias="MCP_STDIO_MAX_LINE")  # bytes
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,148 @@
+"""Controle de admissão por ferramenta.
+
+Cada ferramenta tem um limite de chamadas simultâneas e uma fila de espera
+limitada (FIFO) com timeout. Quando a fila está cheia ou a espera expira,
+a chamada é rejeitada imediatamente com ``Overloaded`` em vez de acumular
+latência e conexões com o backend.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.metrics import metrics
+
+
+class Overloaded(Exception):
+    """Ferramenta saturada: a chamada não foi admitida."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ToolLimiter:
+    """Semáforo com fila de espera limitada e contadores de rejeição."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """Ocupa um slot, aguardando na fila se necessário."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise Overloaded(f"Tool {self.name} is overloaded", settings.tool_retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # O slot foi repassado, mas a espera terminou: devolve-o
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, TimeoutError):
+                self.timeouts += 1
+                self.rejected += 1
+                raise Overloaded(f"Tool {self.name} queue timeout",
+                                 settings.tool_retry_after) from None
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Libera um slot, repassando-o ao próximo da fila."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.waiting,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+class AdmissionController:
+    """Limitadores por ferramenta, criados sob demanda a partir de ``Settings``."""
+
+    def __init__(self):
+        self._limiters: Dict[str, ToolLimiter] = {}
+
+    def limiter(self, name: str, max_concurrency: Optional[int] = None) -> ToolLimiter:
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            limit = settings.tool_concurrency_limits.get(
+                name, max_concurrency or settings.tool_max_concurrency
+            )
+            limiter = ToolLimiter(name, limit, settings.tool_queue_size,
+                                  settings.tool_queue_timeout)
+            self._limiters[name] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, name: str, max_concurrency: Optional[int] = None) -> AsyncIterator[None]:
+        """Contexto que mantém um slot da ferramenta durante a chamada."""
+        limiter = self.limiter(name, max_concurrency)
+        await limiter.acquire()
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Estado atual (fila, ativos, rejeições) de cada ferramenta."""
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+    def reset(self) -> None:
+        """Descarta os limitadores (recriados com a configuração atual)."""
+        self._limiters.clear()
+
+
+# Instância global do controle de admissão
+admission = AdmissionController()
+
+
+def _limiter_values(field: str):
+    return lambda: (((name,), stats[field]) for name, stats in admission.stats().items())
+
+
+metrics.callback("mcp_tool_queue_depth", "Chamadas aguardando na fila de admissão.",
+                 ("tool",), _limiter_values("queued"))
+metrics.callback("mcp_tool_admission_active", "Slots de admissão ocupados.",
+                 ("tool",), _limiter_values("active"))
+metrics.callback("mcp_tool_rejections_total", "Chamadas rejeitadas pelo controle de admissão.",
+                 ("tool",), _limiter_values("rejected"), kind="counter")
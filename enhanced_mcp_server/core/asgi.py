@@ -0,0 +1,118 @@
+"""Caminho rápido ASGI para o endpoint ``/mcp``.
+
+Atende ``POST /mcp`` diretamente no nível ASGI, sem roteamento do FastAPI
+nem ``request.json()``: o corpo é decodificado com o codec rápido e as
+respostas já serializadas pelo despacho são escritas sem recodificação.
+Demais requisições seguem para a aplicação normalmente.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.datastructures import Headers, QueryParams
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.transport import (
+    CLIENT_CLOSED_REQUEST, ClientDisconnected, McpHttpResponse, WaitDisconnect,
+    disconnect_waiter, process_post, until_disconnect
+)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+MCP_PATH = "/mcp"
+
+_JSON_HEADERS = [(b"content-type", b"application/json")]
+
+
+def route_path(scope: Scope) -> str:
+    """Caminho da requisição relativo ao ``root_path`` (como no Starlette)."""
+    path: str = scope.get("path", "")
+    root_path: str = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        if path == root_path:
+            return ""
+        if path[len(root_path)] == "/":
+            return path[len(root_path):]
+    return path
+
+
+async def read_body(receive: Receive) -> bytes:
+    """Lê o corpo completo da requisição; levanta ``ConnectionError`` se o cliente desconectar."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("Cliente desconectado")
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def send_bytes(send: Send, status: int, body: bytes,
+                     headers: list = None) -> None:
+    """Escreve uma resposta HTTP completa a partir de bytes já codificados."""
+    raw_headers = list(headers if headers is not None else _JSON_HEADERS)
+    raw_headers.append((b"content-length", str(len(body)).encode("ascii")))
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_response(send: Send, response: McpHttpResponse,
+                        wait_disconnect: Optional[WaitDisconnect] = None) -> None:
+    """Escreve um ``McpHttpResponse`` (corpo único ou stream SSE).
+
+    Streams são interrompidos (e o trabalho cancelado) se o cliente desconectar.
+    """
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()]
+    if response.stream is None:
+        await send_bytes(send, response.status, response.body, headers)
+        return
+
+    async def stream_body() -> None:
+        async for chunk in response.stream:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    await send({"type": "http.response.start", "status": response.status, "headers": headers})
+    try:
+        await until_disconnect(stream_body(), wait_disconnect)
+    except ClientDisconnected:
+        return
+    finally:
+        await response.stream.aclose()
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def handle_mcp(scope: Scope, receive: Receive, send: Send) -> None:
+    """Handler enxuto de ``POST /mcp`` equivalente ao endpoint FastAPI."""
+    try:
+        body = await read_body(receive)
+    except ConnectionError:
+        return
+    wait_disconnect = disconnect_waiter(receive)
+    response = await process_post(
+        body, QueryParams(scope.get("query_string", b"")), Headers(scope=scope),
+        wait_disconnect
+    )
+    if response.status == CLIENT_CLOSED_REQUEST:
+        return
+    await send_response(send, response, wait_disconnect)
+
+
+class McpFastPathMiddleware:
+    """Middleware ASGI que intercepta ``POST /mcp`` antes do roteamento."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and settings.mcp_fast_path
+            and route_path(scope) == MCP_PATH
+        ):
+            await handle_mcp(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
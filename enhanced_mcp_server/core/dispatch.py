@@ -0,0 +1,230 @@
+"""Despacho JSON-RPC compartilhado pelos transportes MCP.
+
+As respostas são produzidas já serializadas (``bytes``) para que os
+transportes possam escrevê-las diretamente, sem recodificação.
+"""
+
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from enhanced_mcp_server import tools  # noqa: F401  (registra as ferramentas)
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.inflight import CallCancelled, CallTimeout, inflight, resolve_timeout
+from enhanced_mcp_server.core.admission import Overloaded, admission
+from enhanced_mcp_server.core.registry import Tool, registry
+from enhanced_mcp_server.core.session import SESSION_CONFIG_SCHEMA
+from enhanced_mcp_server.core.streaming import call_context
+from enhanced_mcp_server.metrics import (
+    MCP_IN_FLIGHT, MCP_REQUEST_DURATION, MCP_REQUESTS, TOOL_CALLS, TOOL_DURATION, TOOL_IN_FLIGHT
+)
+from enhanced_mcp_server.utils.codec import dumps
+from enhanced_mcp_server.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_REQUEST = -32600
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_INVALID_PARAMS = -32602
+JSONRPC_INTERNAL_ERROR = -32603
+JSONRPC_REQUEST_TIMEOUT = -32001
+JSONRPC_SERVER_OVERLOADED = -32002
+JSONRPC_REQUEST_CANCELLED = -32800
+
+PROTOCOL_VERSION = "2025-06-18"
+
+
+class JSONRPCError(Exception):
+    """Erro JSON-RPC com código, mensagem e status HTTP equivalente."""
+
+    def __init__(self, code: int, message: str, http_status: int = 400,
+                 data: Optional[Dict[str, Any]] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.http_status = http_status
+        self.data = data
+        self.headers = headers or {}
+
+
+def encode_result(request_id: Any, result: bytes) -> bytes:
+    """Monta uma resposta JSON-RPC a partir de um resultado já serializado."""
+    return b'{"jsonrpc":"2.0","id":' + dumps(request_id) + b',"result":' + result + b'}'
+
+
+def encode_error(request_id: Any, code: int, message: str,
+                 data: Optional[Dict[str, Any]] = None) -> bytes:
+    """Monta uma resposta de erro JSON-RPC."""
+    error: Dict[str, Any] = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return dumps({
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": error
+    })
+
+
+def _initialize_result() -> dict:
+    return {
+        "protocolVersion": PROTOCOL_VERSION,
+        "capabilities": {
+            "tools": {
+                "listChanged": True
+            },
+            "sessionConfigSchema": SESSION_CONFIG_SCHEMA
+        },
+        "serverInfo": {
+            "name": "MCPserve",
+            "version": "0.1.0"
+        }
+    }
+
+
+async def _initialize(payload: dict, session_config: dict) -> bytes:
+    return registry.serialized("initialize", _initialize_result)
+
+
+async def _tools_list(payload: dict, session_config: dict) -> bytes:
+    return registry.serialized("tools/list", lambda: {"tools": registry.list_tools()})
+
+
+async def _tools_call(payload: dict, session_config: dict) -> bytes:
+    params = payload.get("params") or {}
+    tool_name = params.get("name")
+    tool = registry.get(tool_name)
+    if tool is None:
+        raise JSONRPCError(JSONRPC_INVALID_PARAMS, f"Unknown tool: {tool_name}")
+    meta = params.get("_meta")
+    status = "error"
+    start = time.perf_counter()
+    with call_context(meta), TOOL_IN_FLIGHT.track(tool.name):
+        try:
+            result = await inflight.run(payload.get("id"),
+                                        _admitted_call(tool, params.get("arguments") or {}),
+                                        timeout=resolve_timeout(meta))
+            status = "ok"
+        except Overloaded as e:
+            status = "rejected"
+            raise JSONRPCError(JSONRPC_SERVER_OVERLOADED, str(e), http_status=503,
+                               data={"retryAfter": e.retry_after},
+                               headers={"retry-after": str(e.retry_after)})
+        except CallTimeout as e:
+            status = "timeout"
+            raise JSONRPCError(JSONRPC_REQUEST_TIMEOUT, str(e), http_status=504)
+        except CallCancelled as e:
+            status = "cancelled"
+            raise JSONRPCError(JSONRPC_REQUEST_CANCELLED, str(e), http_status=499)
+        finally:
+            TOOL_DURATION.labels(tool.name).observe(time.perf_counter() - start)
+            TOOL_CALLS.labels(tool.name, status).inc()
+    return dumps(result)
+
+
+async def _admitted_call(tool: Tool, arguments: dict) -> dict:
+    async with admission.slot(tool.name, tool.max_concurrency):
+        return await tool.call(arguments)
+
+
+async def _cancelled(payload: dict, session_config: dict) -> bytes:
+    params = payload.get("params") or {}
+    cancelled = inflight.cancel(params.get("requestId"))
+    logger.debug("Cancelamento recebido", request_id=params.get("requestId"),
+                 cancelled=cancelled, reason=params.get("reason"))
+    return b"null"
+
+
+async def _ping(payload: dict, session_config: dict) -> bytes:
+    return b'{"pong":true}'
+
+
+MethodHandler = Callable[[dict, dict], Awaitable[bytes]]
+
+METHODS: Dict[str, MethodHandler] = {
+    "initialize": _initialize,
+    "tools/list": _tools_list,
+    "tools/call": _tools_call,
+    "ping": _ping,
+    "heartbeat/ping": _ping,
+    "notifications/cancelled": _cancelled,
+}
+
+
+async def handle_message(payload: dict, session_config: dict) -> bytes:
+    """Processa uma única mensagem JSON-RPC e retorna a resposta serializada.
+
+    Levanta ``JSONRPCError`` para métodos ou ferramentas desconhecidos.
+    """
+    method = payload.get("method")
+    logger.debug("MCP request recebido", method=method)
+
+    handler = METHODS.get(method)
+    if handler is None:
+        # Métodos desconhecidos são agregados para não explodir a cardinalidade
+        MCP_REQUESTS.labels("unknown", "error").inc()
+        raise JSONRPCError(JSONRPC_METHOD_NOT_FOUND, "Method not supported")
+
+    status = "error"
+    start = time.perf_counter()
+    in_flight = MCP_IN_FLIGHT.labels(method)
+    in_flight.inc()
+    try:
+        result = await handler(payload, session_config)
+        status = "ok"
+    finally:
+        in_flight.dec()
+        MCP_REQUEST_DURATION.labels(method).observe(time.perf_counter() - start)
+        MCP_REQUESTS.labels(method, status).inc()
+    return encode_result(payload.get("id"), result)
+
+
+async def _handle_batch_entry(entry: Any, session_config: dict, semaphore: asyncio.Semaphore,
+                              tool_slots: Optional[asyncio.Semaphore]) -> Optional[bytes]:
+    """Processa uma entrada de batch; notificações não geram resposta."""
+    if not isinstance(entry, dict):
+        return encode_error(None, JSONRPC_INVALID_REQUEST, "Invalid Request")
+
+    slot = tool_slots if tool_slots is not None and entry.get("method") == "tools/call" \
+        else nullcontext()
+    async with semaphore, slot:
+        try:
+            response = await handle_message(entry, session_config)
+        except JSONRPCError as e:
+            response = encode_error(entry.get("id"), e.code, e.message, e.data)
+        except Exception as e:
+            logger.error("Erro ao processar entrada do batch",
+                         method=entry.get("method"), error=str(e))
+            response = encode_error(entry.get("id"), JSONRPC_INTERNAL_ERROR, str(e))
+
+    if "id" not in entry:
+        return None
+    return response
+
+
+async def handle_batch(batch: list, session_config: dict,
+                       tool_slots: Optional[asyncio.Semaphore] = None) -> Optional[bytes]:
+    """Despacha um batch JSON-RPC concorrentemente, preservando a ordem.
+
+    Se ``tool_slots`` for informado, cada ``tools/call`` do batch ocupa uma
+    vaga dele (limite de concorrência do transporte, como no stdio).
+    Retorna ``None`` quando o batch contém apenas notificações.
+    """
+    if not batch:
+        return encode_error(None, JSONRPC_INVALID_REQUEST, "Invalid Request")
+    if len(batch) > settings.mcp_batch_max_size:
+        return encode_error(
+            None, JSONRPC_INVALID_REQUEST,
+            f"Batch excede o limite de {settings.mcp_batch_max_size} mensagens"
+        )
+
+    semaphore = asyncio.Semaphore(max(1, settings.mcp_batch_concurrency))
+    results = await asyncio.gather(
+        *(_handle_batch_entry(entry, session_config, semaphore, tool_slots) for entry in batch)
+    )
+    responses = [r for r in results if r is not None]
+    if not responses:
+        return None
+    return b"[" + b",".join(responses) + b"]"
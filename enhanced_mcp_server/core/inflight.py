@@ -0,0 +1,122 @@
+"""Rastreamento de chamadas em andamento: cancelamento e prazos.
+
+Cada ``tools/call`` em andamento é registrado sob ``(escopo, id)``, onde
+o escopo identifica o cliente (sessão HTTP ou conexão stdio).
+``notifications/cancelled`` cancela a chamada correspondente; o prazo vem de
+``params._meta.timeoutMs``, do cabeçalho ``X-Request-Timeout`` (segundos) ou
+de ``TOOL_CALL_TIMEOUT``, que por padrão é 0 (sem prazo): as ferramentas já
+limitam as próprias chamadas externas (ex.: ``TRANSLATION_TIMEOUT``).
+"""
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Hashable, Iterator, Optional, Tuple
+
+from enhanced_mcp_server.config import settings
+
+_scope: ContextVar[Hashable] = ContextVar("mcp_request_scope", default=None)
+_timeout: ContextVar[Optional[float]] = ContextVar("mcp_request_timeout", default=None)
+
+
+class CallCancelled(Exception):
+    """A chamada foi cancelada pelo cliente."""
+
+
+class CallTimeout(Exception):
+    """A chamada excedeu o prazo."""
+
+
+@contextmanager
+def request_scope(scope: Hashable = None, timeout: Optional[float] = None) -> Iterator[None]:
+    """Define o escopo de cancelamento e o prazo padrão das chamadas do contexto."""
+    scope_token = _scope.set(scope)
+    timeout_token = _timeout.set(timeout)
+    try:
+        yield
+    finally:
+        _scope.reset(scope_token)
+        _timeout.reset(timeout_token)
+
+
+def parse_timeout(value: Optional[str]) -> Optional[float]:
+    """Converte o cabeçalho de prazo (segundos) em float; valores inválidos são ignorados."""
+    if not value:
+        return None
+    try:
+        timeout = float(value)
+    except ValueError:
+        return None
+    return timeout if timeout > 0 else None
+
+
+def resolve_timeout(meta: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Prazo efetivo de uma chamada (params > cabeçalho > configuração)."""
+    if meta and isinstance(meta.get("timeoutMs"), (int, float)) and meta["timeoutMs"] > 0:
+        return meta["timeoutMs"] / 1000
+    timeout = _timeout.get()
+    if timeout is not None:
+        return timeout
+    return settings.tool_call_timeout or None
+
+
+class _Call:
+    __slots__ = ("task", "cancelled")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.cancelled = False
+
+
+class InFlightCalls:
+    """Chamadas em andamento indexadas por (escopo, id).
+
+    A chamada executa na própria task corrente (sem task extra); o
+    cancelamento usa ``Task.cancel``/``Task.uncancel`` da mesma forma que
+    ``asyncio.timeout``, sem afetar cancelamentos vindos de fora.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[Hashable, Any], _Call] = {}
+
+    async def run(self, request_id: Any, coro: Awaitable[Any],
+                  timeout: Optional[float] = None) -> Any:
+        """Aguarda ``coro`` permitindo cancelamento pelo cliente e respeitando o prazo."""
+        call = _Call(asyncio.current_task())
+        key = (_scope.get(), request_id) if request_id is not None else None
+        if key is not None:
+            self._calls[key] = call
+        deadline = asyncio.timeout(timeout)
+        try:
+            async with deadline:
+                return await coro
+        except TimeoutError:
+            # Só o prazo da chamada vira CallTimeout; TimeoutError da própria
+            # ferramenta (ex.: timeout do httpx) segue como erro dela
+            if deadline.expired():
+                raise CallTimeout(f"Request timed out after {timeout:g}s")
+            raise
+        except asyncio.CancelledError:
+            if call.cancelled and call.task.uncancel() == 0:
+                raise CallCancelled("Request cancelled")
+            raise
+        finally:
+            if key is not None and self._calls.get(key) is call:
+                del self._calls[key]
+
+    def cancel(self, request_id: Any, scope: Hashable = None) -> bool:
+        """Cancela a chamada ``request_id`` do escopo atual (ou do informado)."""
+        key = (scope if scope is not None else _scope.get(), request_id)
+        call = self._calls.get(key)
+        if call is None or call.cancelled:
+            return False
+        call.cancelled = True
+        call.task.cancel()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+# Instância global das chamadas em andamento
+inflight = InFlightCalls()
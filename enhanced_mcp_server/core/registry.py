@@ -0,0 +1,147 @@
+"""Registro de ferramentas MCP com despacho O(1) e payloads pré-serializados."""
+
+import inspect
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from enhanced_mcp_server.core.streaming import emit_chunk
+from enhanced_mcp_server.utils.codec import dumps
+
+ToolHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+_EMPTY_SCHEMA = {"type": "object", "properties": {}}
+
+
+def _content_block(chunk: Any) -> Dict[str, Any]:
+    if isinstance(chunk, str):
+        return {"type": "text", "text": chunk}
+    return chunk
+
+
+class Tool:
+    """Ferramenta registrada: metadados declarados junto ao handler.
+
+    O handler pode ser uma corrotina (resultado único) ou um gerador
+    assíncrono, cujos blocos são publicados à medida que são produzidos.
+    """
+
+    def __init__(self, name: str, handler: ToolHandler, description: str = "",
+                 input_schema: Optional[Dict[str, Any]] = None,
+                 annotations: Optional[Dict[str, Any]] = None,
+                 max_concurrency: Optional[int] = None):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.input_schema = input_schema or dict(_EMPTY_SCHEMA)
+        self.annotations = annotations
+        self.max_concurrency = max_concurrency
+        self.streaming = inspect.isasyncgenfunction(handler)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte para a representação usada em tools/list."""
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "description": self.description,
+            "inputSchema": self.input_schema,
+        }
+        if self.annotations is not None:
+            data["annotations"] = self.annotations
+        return data
+
+    async def call(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Executa o handler e normaliza o retorno para um resultado MCP."""
+        if self.streaming:
+            return await self._call_streaming(arguments)
+
+        result = await self.handler(arguments)
+        if isinstance(result, str):
+            return {"content": [{"type": "text", "text": result}]}
+        if isinstance(result, list):
+            return {"content": result}
+        return result
+
+    async def _call_streaming(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        content = []
+        streamed = 0
+        async for chunk in self.handler(arguments):
+            block = _content_block(chunk)
+            if await emit_chunk(block):
+                streamed += 1
+            else:
+                content.append(block)
+
+        result: Dict[str, Any] = {"content": content}
+        if streamed:
+            result["_meta"] = {"streamedChunks": streamed}
+        return result
+
+
+class ToolRegistry:
+    """Registro de ferramentas com cache de payloads serializados.
+
+    Os payloads estáticos (``tools/list``, ``initialize``) são serializados
+    uma única vez e invalidados apenas quando o registro muda.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+        self._serialized: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def register(self, tool: Tool) -> Tool:
+        """Registra (ou substitui) uma ferramenta."""
+        with self._lock:
+            self._tools[tool.name] = tool
+            self._invalidate()
+        return tool
+
+    def unregister(self, name: str) -> bool:
+        """Remove uma ferramenta; retorna False se não existir."""
+        with self._lock:
+            if self._tools.pop(name, None) is None:
+                return False
+            self._invalidate()
+        return True
+
+    def tool(self, name: str, description: str = "",
+             input_schema: Optional[Dict[str, Any]] = None,
+             annotations: Optional[Dict[str, Any]] = None,
+             max_concurrency: Optional[int] = None) -> Callable[[ToolHandler], ToolHandler]:
+        """Decorador para registrar um handler como ferramenta."""
+        def decorator(handler: ToolHandler) -> ToolHandler:
+            self.register(Tool(name, handler, description, input_schema, annotations,
+                               max_concurrency))
+            return handler
+        return decorator
+
+    def get(self, name: str) -> Optional[Tool]:
+        """Busca uma ferramenta pelo nome (lookup em dicionário)."""
+        return self._tools.get(name)
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        """Lista as ferramentas no formato de tools/list."""
+        return [tool.to_dict() for tool in self._tools.values()]
+
+    def serialized(self, key: str, builder: Callable[[], Any]) -> bytes:
+        """Retorna o payload ``key`` serializado, construindo-o se necessário."""
+        serialized = self._serialized
+        data = serialized.get(key)
+        if data is None:
+            data = dumps(builder())
+            serialized[key] = data
+        return data
+
+    def _invalidate(self) -> None:
+        self._serialized = {}
+        self.version += 1
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+
+# Instância global do registro
+registry = ToolRegistry()
@@ -1,98 +1,105 @@
 # /enhanced_mcp_server/core/server.py (FastAPI MCP básico)
+import asyncio
 import os
-from typing import Mapping
-
-from fastapi import FastAPI, HTTPException, Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from enhanced_mcp_server.tools import translate_with_deepl
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from enhanced_mcp_server.cache import cache
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.admission import admission
+from enhanced_mcp_server.core.asgi import McpFastPathMiddleware
+from enhanced_mcp_server.core.session import SESSION_CONFIG_SCHEMA
+from enhanced_mcp_server.core.transport import disconnect_waiter, process_delete, process_post
+from enhanced_mcp_server.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+from enhanced_mcp_server.ratelimit import RateLimitMiddleware
+from enhanced_mcp_server.utils.codec import CodecJSONResponse
+from enhanced_mcp_server.utils.http import upstream
 from enhanced_mcp_server.utils.logging import get_logger
 
 prefix_from_env = os.environ.get("SMITHERY_PREFIX", "").rstrip("/")
-
-app = FastAPI(title="MCPserve", root_path=prefix_from_env)
 logger = get_logger(__name__)
 
 
-class SmitheryPrefixMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        prefix = request.headers.get("x-smithery-prefix") or prefix_from_env
-        if prefix:
-            cleaned = prefix.rstrip("/")
-            scope = request.scope
-            if cleaned:
-                scope["root_path"] = cleaned
-                path: str = scope.get("path", "")
-                if path.startswith(cleaned):
-                    trimmed = path[len(cleaned):] or "/"
-                    scope["path"] = trimmed
-        return await call_next(request)
+async def _warm_up(app: FastAPI) -> None:
+    """Aquece o cache a partir do snapshot e só então marca a instância como pronta."""
+    try:
+        await cache.warm_up()
+    finally:
+        app.state.ready = True
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cliente HTTP e aquecimento do cache no startup; fechamento e snapshot no shutdown."""
+    app.state.ready = False
+    await upstream.start()
+    warmup = asyncio.create_task(_warm_up(app))
+    try:
+        yield
+    finally:
+        # Espera a carga do snapshot parar antes de exportar o novo
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+        await upstream.aclose()
+        if settings.cache_snapshot_path and settings.cache_snapshot_on_shutdown:
+            await asyncio.to_thread(cache.export_snapshot, settings.cache_snapshot_path)
+
+
+app = FastAPI(title="MCPserve", root_path=prefix_from_env, lifespan=lifespan,
+              default_response_class=CodecJSONResponse)
+
+
+class SmitheryPrefixMiddleware:
+    """Middleware ASGI puro que remove o prefixo Smithery do caminho."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            prefix = _header(scope, b"x-smithery-prefix") or prefix_from_env
+            if prefix:
+                cleaned = prefix.rstrip("/")
+                if cleaned:
+                    scope = dict(scope)
+                    scope["root_path"] = cleaned
+                    path: str = scope.get("path", "")
+                    if path.startswith(cleaned):
+                        trimmed = path[len(cleaned):] or "/"
+                        scope["path"] = trimmed
+        await self.app(scope, receive, send)
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+# A ordem importa: o último middleware adicionado é o mais externo,
+# então o prefixo é removido e o rate limit aplicado antes do caminho
+# rápido de /mcp.
+app.add_middleware(McpFastPathMiddleware)
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(SmitheryPrefixMiddleware)
 
 
-SESSION_CONFIG_SCHEMA = {
-    "$schema": "http://json-schema.org/draft-07/schema#",
-    "$id": "https://server.smithery.ai/@dronreef2/mcpserve/.well-known/mcp-config",
-    "title": "Configuração de Sessão do MCPserve",
-    "description": "Parâmetros opcionais para personalizar o comportamento do MCPserve por sessão.",
-    "x-query-style": "dot",
-    "type": "object",
-    "properties": {
-        "deeplApiKey": {
-            "type": "string",
-            "title": "DeepL API Key",
-            "description": "Chave de API para habilitar a ferramenta de tradução."
-        },
-        "redisUrl": {
-            "type": "string",
-            "title": "Redis URL",
-            "description": "Endpoint Redis para cache compartilhado (opcional)."
-        },
-        "logLevel": {
-            "type": "string",
-            "title": "Log Level",
-            "description": "Nível de log desejado para a sessão.",
-            "default": "INFO",
-            "enum": ["DEBUG", "INFO", "WARNING", "ERROR"]
-        },
-        "enableAuth": {
-            "type": "boolean",
-            "title": "Ativar autenticação",
-            "description": "Indica se endpoints sensíveis exigem autenticação.",
-            "default": False
-        }
-    },
-    "required": [],
-    "additionalProperties": False
-}
-
-
-def _parse_bool(value: str) -> bool:
-    return value.lower() in {"1", "true", "t", "yes", "y"}
-
-
-def _parse_session_config(query_params: Mapping[str, str]) -> dict:
-    """Converte parâmetros da query string em configuração de sessão."""
-    config: dict[str, object] = {}
-
-    if "deeplApiKey" in query_params:
-        config["deepl_api_key"] = query_params["deeplApiKey"]
-    if "redisUrl" in query_params:
-        config["redis_url"] = query_params["redisUrl"]
-    if "logLevel" in query_params:
-        config["log_level"] = query_params["logLevel"]
-    if "enableAuth" in query_params:
-        config["enable_auth"] = _parse_bool(query_params["enableAuth"])
-
-    return config
-
-
 @app.get("/health")
 async def health() -> dict:
     """Endpoint simples para healthchecks (útil para Smithery e probes)."""
     return {"status": "ok"}
 
+
+@app.get("/ready")
+async def ready() -> Response:
+    """Readiness probe: 503 enquanto o cache é aquecido no startup."""
+    if not getattr(app.state, "ready", True):
+        return CodecJSONResponse({"status": "warming_up"}, status_code=503)
+    return CodecJSONResponse({"status": "ready"})
+
+
 @app.get("/.well-known/mcp-config")
 async def well_known_mcp_config() -> dict:
     """Retorna metadados MCP para auto-descoberta e configuração."""
@@ -112,84 +119,37 @@ async def well_known_mcp_config() -> dict:
     }
 
 
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Métricas no formato de texto do Prometheus."""
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    return Response(content=metrics.expose(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/admission/stats")
+async def admission_stats() -> dict:
+    """Fila, chamadas ativas e rejeições por ferramenta."""
+    return {"tools": admission.stats()}
+
+
 @app.post("/mcp")
 async def mcp_endpoint(request: Request):
-    """Endpoint MCP HTTP básico."""
-    try:
-        payload = await request.json()
-        method = payload.get("method")
-        session_config = _parse_session_config(request.query_params)
-        logger.debug("MCP request recebido", method=method)
-
-        if method == "initialize":
-            return {
-                "jsonrpc": "2.0",
-                "id": payload.get("id"),
-                "result": {
-                    "protocolVersion": "2025-06-18",
-                    "capabilities": {
-                        "tools": {
-                            "listChanged": True
-                        },
-                        "sessionConfigSchema": SESSION_CONFIG_SCHEMA
-                    },
-                    "serverInfo": {
-                        "name": "MCPserve",
-                        "version": "0.1.0"
-                    }
-                }
-            }
-        elif method == "tools/list":
-            return {
-                "jsonrpc": "2.0",
-                "id": payload.get("id"),
-                "result": {
-                    "tools": [
-                        {
-                            "name": "ping",
-                            "description": "Responde com pong.",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {}
-                            },
-                            "annotations": {
-                                "readOnlyHint": True,
-                                "destructiveHint": False,
-                                "idempotentHint": True
-                            }
-                        }
-                    ]
-                }
-            }
-        elif method == "tools/call":
-            params = payload.get("params", {})
-            tool_name = params.get("name")
-            tool_args = params.get("arguments", {})
-
-            if tool_name == "ping":
-                return {
-                    "jsonrpc": "2.0",
-                    "id": payload.get("id"),
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "pong"
-                            }
-                        ]
-                    }
-                }
-        elif method in {"ping", "heartbeat/ping"}:
-            return {
-                "jsonrpc": "2.0",
-                "id": payload.get("id"),
-                "result": {"pong": True}
-            }
-        raise HTTPException(status_code=400, detail="Method not supported")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Endpoint MCP Streamable HTTP (mensagens únicas, batches e SSE)."""
+    result = await process_post(await request.body(), request.query_params, request.headers,
+                                disconnect_waiter(request.receive))
+    if result.stream is not None:
+        return StreamingResponse(result.stream, status_code=result.status,
+                                 headers=result.headers)
+    return Response(content=result.body, status_code=result.status, headers=result.headers)
+
+
+@app.delete("/mcp")
+async def mcp_delete_session(request: Request):
+    """Encerra uma sessão MCP (cabeçalho Mcp-Session-Id)."""
+    result = process_delete(request.headers)
+    return Response(content=result.body, status_code=result.status, headers=result.headers)
+
 
 def create_server():
     """Retorna o app FastAPI para Smithery."""
@@ -0,0 +1,60 @@
+"""Configuração de sessão MCP (schema e parsing da query string)."""
+
+from typing import Mapping
+
+
+SESSION_CONFIG_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "$id": "https://server.smithery.ai/@dronreef2/mcpserve/.well-known/mcp-config",
+    "title": "Configuração de Sessão do MCPserve",
+    "description": "Parâmetros opcionais para personalizar o comportamento do MCPserve por sessão.",
+    "x-query-style": "dot",
+    "type": "object",
+    "properties": {
+        "deeplApiKey": {
+            "type": "string",
+            "title": "DeepL API Key",
+            "description": "Chave de API para habilitar a ferramenta de tradução."
+        },
+        "redisUrl": {
+            "type": "string",
+            "title": "Redis URL",
+            "description": "Endpoint Redis para cache compartilhado (opcional)."
+        },
+        "logLevel": {
+            "type": "string",
+            "title": "Log Level",
+            "description": "Nível de log desejado para a sessão.",
+            "default": "INFO",
+            "enum": ["DEBUG", "INFO", "WARNING", "ERROR"]
+        },
+        "enableAuth": {
+            "type": "boolean",
+            "title": "Ativar autenticação",
+            "description": "Indica se endpoints sensíveis exigem autenticação.",
+            "default": False
+        }
+    },
+    "required": [],
+    "additionalProperties": False
+}
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in {"1", "true", "t", "yes", "y"}
+
+
+def parse_session_config(query_params: Mapping[str, str]) -> dict:
+    """Converte parâmetros da query string em configuração de sessão."""
+    config: dict[str, object] = {}
+
+    if "deeplApiKey" in query_params:
+        config["deepl_api_key"] = query_params["deeplApiKey"]
+    if "redisUrl" in query_params:
+        config["redis_url"] = query_params["redisUrl"]
+    if "logLevel" in query_params:
+        config["log_level"] = query_params["logLevel"]
+    if "enableAuth" in query_params:
+        config["enable_auth"] = _parse_bool(query_params["enableAuth"])
+
+    return config
@@ -0,0 +1,71 @@
+"""Sessões MCP identificadas pelo cabeçalho ``Mcp-Session-Id``."""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from enhanced_mcp_server.config import settings
+
+
+class Session:
+    """Sessão criada em ``initialize``."""
+
+    def __init__(self, session_id: str, config: Dict[str, Any]):
+        self.id = session_id
+        self.config = config
+        self.last_seen = time.monotonic()
+
+
+class SessionStore:
+    """Armazena sessões em memória com TTL por inatividade e limite de tamanho."""
+
+    def __init__(self, ttl: Optional[float] = None, max_sessions: Optional[int] = None):
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._max_sessions = max_sessions
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl if self._ttl is not None else settings.mcp_session_ttl
+
+    @property
+    def max_sessions(self) -> int:
+        return self._max_sessions if self._max_sessions is not None else settings.mcp_max_sessions
+
+    def create(self, config: Optional[Dict[str, Any]] = None) -> str:
+        """Cria uma sessão e retorna seu ID."""
+        session = Session(secrets.token_urlsafe(24), config or {})
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session.id
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Retorna a sessão ativa (renovando o TTL) ou None."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """Encerra uma sessão."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Instância global das sessões
+sessions = SessionStore()
@@ -0,0 +1,228 @@
+"""Transporte stdio do MCP (JSON-RPC delimitado por linhas).
+
+Cada linha recebida é despachada em sua própria task, de modo que várias
+requisições ficam em andamento ao mesmo tempo. As respostas são escritas
+à medida que cada requisição termina, por um único escritor serializado,
+e podem chegar fora da ordem de envio (o cliente correlaciona pelo ``id``).
+
+Só ``tools/call`` ocupa uma das ``MCP_STDIO_CONCURRENCY`` vagas (uma por
+chamada, inclusive dentro de batches); ``ping``, notificações (inclusive
+``notifications/cancelled``) e demais métodos são despachados direto, então
+um cancelamento chega mesmo com as vagas cheias.
+"""
+
+import asyncio
+import os
+import stat
+import sys
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.dispatch import (
+    JSONRPC_INTERNAL_ERROR, JSONRPC_INVALID_REQUEST, JSONRPC_PARSE_ERROR,
+    JSONRPC_REQUEST_CANCELLED, JSONRPCError, encode_error, handle_batch, handle_message
+)
+from enhanced_mcp_server.core.inflight import request_scope
+from enhanced_mcp_server.core.streaming import bind_notifier
+from enhanced_mcp_server.utils.codec import dumps, loads
+from enhanced_mcp_server.utils.http import upstream
+from enhanced_mcp_server.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+Write = Callable[[bytes], Awaitable[None]]
+
+_EOF = object()
+
+
+def _is_tool_call(payload: Any) -> bool:
+    """Indica se a mensagem é um ``tools/call`` (batches reservam vagas por entrada)."""
+    return isinstance(payload, dict) and payload.get("method") == "tools/call"
+
+
+class StdioServer:
+    """Servidor JSON-RPC sobre um par leitor/escritor de streams."""
+
+    def __init__(self, reader: asyncio.StreamReader, write: Write,
+                 concurrency: Optional[int] = None):
+        self._reader = reader
+        self._write = write
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(max(1, concurrency or settings.mcp_stdio_concurrency))
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def serve(self) -> None:
+        """Lê mensagens até EOF e aguarda as requisições em andamento."""
+        writer = asyncio.create_task(self._writer())
+        try:
+            while True:
+                line = await self._readline()
+                if line is None:
+                    logger.warning("Mensagem stdio excede o tamanho máximo")
+                    await self._outbox.put(
+                        encode_error(None, JSONRPC_INVALID_REQUEST, "Message too large")
+                    )
+                    continue
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                task = asyncio.create_task(self._handle_line(line))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await self._outbox.put(_EOF)
+            await writer
+
+    async def _readline(self) -> Optional[bytes]:
+        """Lê uma linha; retorna None se ela passar de MCP_STDIO_MAX_LINE.
+
+        A linha grande é descartada por inteiro, até o próximo ``\\n``, mesmo
+        que o restante ainda não tenha chegado; assim o que sobra dela não é
+        interpretado como novas mensagens.
+        """
+        try:
+            return await self._reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        while True:
+            await self._reader.readexactly(consumed)
+            try:
+                await self._reader.readuntil(b"\n")
+                return None
+            except asyncio.IncompleteReadError:
+                return None
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+
+    async def _writer(self) -> None:
+        """Único escritor: serializa as respostas na saída."""
+        while True:
+            data = await self._outbox.get()
+            if data is _EOF:
+                break
+            try:
+                await self._write(data + b"\n")
+            except (ConnectionError, BrokenPipeError) as e:
+                logger.warning(f"Saída stdio encerrada: {e}")
+                break
+
+    async def _notify(self, message: Dict[str, Any]) -> None:
+        await self._outbox.put(dumps(message))
+
+    async def _handle_line(self, line: bytes) -> None:
+        try:
+            payload = loads(line)
+        except Exception:
+            await self._outbox.put(encode_error(None, JSONRPC_PARSE_ERROR, "Parse error"))
+            return
+
+        if _is_tool_call(payload):
+            async with self._semaphore:
+                response = await self._run(payload)
+        else:
+            response = await self._run(payload)
+        if response is not None:
+            await self._outbox.put(response)
+
+    async def _run(self, payload: Any) -> Optional[bytes]:
+        with request_scope(self), bind_notifier(self._notify):
+            return await self._dispatch(payload)
+
+    async def _dispatch(self, payload: Any) -> Optional[bytes]:
+        if isinstance(payload, list):
+            return await handle_batch(payload, {}, tool_slots=self._semaphore)
+        if not isinstance(payload, dict):
+            return encode_error(None, JSONRPC_INVALID_REQUEST, "Invalid Request")
+
+        request_id = payload.get("id")
+        try:
+            response = await handle_message(payload, {})
+        except JSONRPCError as e:
+            if e.code == JSONRPC_REQUEST_CANCELLED:
+                # Requisições canceladas pelo cliente não recebem resposta
+                return None
+            response = encode_error(request_id, e.code, e.message, e.data)
+        except Exception as e:
+            logger.error("Erro ao processar mensagem stdio", error=str(e))
+            response = encode_error(request_id, JSONRPC_INTERNAL_ERROR, str(e))
+
+        if "id" not in payload:
+            # Notificações não recebem resposta
+            return None
+        return response
+
+
+def _is_pipe(stream) -> bool:
+    """Indica se ``stream`` aceita os transportes de pipe do asyncio (pipe, socket ou tty)."""
+    try:
+        mode = os.fstat(stream.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode) or stat.S_ISCHR(mode)
+
+
+async def _pump(reader: asyncio.StreamReader, stream) -> None:
+    """Alimenta ``reader`` a partir de um arquivo comum, lendo em uma thread."""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(stream.read1, 64 * 1024)
+            if not chunk:
+                break
+            reader.feed_data(chunk)
+    finally:
+        reader.feed_eof()
+
+
+async def serve_stdio() -> None:
+    """Executa o servidor MCP sobre stdin/stdout do processo.
+
+    Pipes, sockets e terminais usam os transportes do event loop; arquivos
+    comuns (``< entrada.jsonl``, ``> saida.jsonl``) não são aceitos por eles e
+    são lidos/escritos em threads.
+    """
+    loop = asyncio.get_running_loop()
+
+    reader = asyncio.StreamReader(limit=settings.mcp_stdio_max_line)
+    pump: Optional[asyncio.Task] = None
+    if _is_pipe(sys.stdin):
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    else:
+        pump = asyncio.create_task(_pump(reader, sys.stdin.buffer))
+
+    writer: Optional[asyncio.StreamWriter] = None
+    if _is_pipe(sys.stdout):
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, sys.stdout
+        )
+        writer = asyncio.StreamWriter(transport, protocol, None, loop)
+
+        async def write(data: bytes) -> None:
+            writer.write(data)
+            await writer.drain()
+    else:
+        out = sys.stdout.buffer
+
+        def write_sync(data: bytes) -> None:
+            out.write(data)
+            out.flush()
+
+        async def write(data: bytes) -> None:
+            await asyncio.to_thread(write_sync, data)
+
+    try:
+        await StdioServer(reader, write).serve()
+    finally:
+        await upstream.aclose()
+        if pump is not None:
+            pump.cancel()
+        if writer is not None:
+            writer.close()
@@ -0,0 +1,96 @@
+"""Notificações de progresso e saída incremental de ferramentas.
+
+O transporte ativo registra um *notifier* (via ``bind_notifier``) capaz de
+enviar mensagens JSON-RPC ao cliente antes da resposta final. As
+ferramentas usam ``report_progress`` e ``emit_chunk`` sem conhecer o
+transporte; sem notifier ou sem ``progressToken`` as chamadas são no-ops.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+Notifier = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class CallContext:
+    """Estado de progresso de uma chamada ``tools/call``."""
+
+    def __init__(self, progress_token: Any = None, stream_content: bool = False):
+        self.progress_token = progress_token
+        self.stream_content = stream_content
+        self.progress = 0
+
+
+_notifier: ContextVar[Optional[Notifier]] = ContextVar("mcp_notifier", default=None)
+_call: ContextVar[Optional[CallContext]] = ContextVar("mcp_call", default=None)
+
+
+@contextmanager
+def bind_notifier(notify: Notifier) -> Iterator[None]:
+    """Associa um notifier ao contexto atual (uma requisição de transporte)."""
+    token = _notifier.set(notify)
+    try:
+        yield
+    finally:
+        _notifier.reset(token)
+
+
+@contextmanager
+def call_context(meta: Optional[Dict[str, Any]]) -> Iterator[CallContext]:
+    """Cria o contexto de progresso de uma chamada a partir de ``params._meta``."""
+    meta = meta or {}
+    ctx = CallContext(meta.get("progressToken"), bool(meta.get("streamContent")))
+    token = _call.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _call.reset(token)
+
+
+async def notify(message: Dict[str, Any]) -> bool:
+    """Envia uma notificação ao cliente, se o transporte suportar."""
+    notifier = _notifier.get()
+    if notifier is None:
+        return False
+    await notifier(message)
+    return True
+
+
+async def report_progress(progress: float, total: Optional[float] = None,
+                          message: Optional[str] = None) -> bool:
+    """Envia ``notifications/progress`` para a chamada em andamento."""
+    ctx = _call.get()
+    if ctx is None or ctx.progress_token is None:
+        return False
+
+    params: Dict[str, Any] = {"progressToken": ctx.progress_token, "progress": progress}
+    if total is not None:
+        params["total"] = total
+    if message is not None:
+        params["message"] = message
+    return await notify({
+        "jsonrpc": "2.0",
+        "method": "notifications/progress",
+        "params": params
+    })
+
+
+async def emit_chunk(block: Dict[str, Any]) -> bool:
+    """Publica um bloco de saída de uma ferramenta incremental.
+
+    Cada bloco gera uma notificação de progresso. Se o cliente pediu
+    ``_meta.streamContent``, blocos de texto seguem no campo ``message`` e
+    não são acumulados no resultado final (retorna True nesse caso).
+    """
+    ctx = _call.get()
+    if ctx is None or ctx.progress_token is None or _notifier.get() is None:
+        return False
+
+    ctx.progress += 1
+    text = block.get("text") if block.get("type") == "text" else None
+    if ctx.stream_content and text is not None:
+        await report_progress(ctx.progress, message=text)
+        return True
+    await report_progress(ctx.progress)
+    return False
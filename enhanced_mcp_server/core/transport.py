@@ -0,0 +1,232 @@
+"""Transporte Streamable HTTP do MCP.
+
+Processa ``POST /mcp`` e ``DELETE /mcp`` de forma independente do
+framework: o endpoint FastAPI e o caminho rápido ASGI convertem o
+``McpHttpResponse`` resultante em sua própria resposta. Quando o cliente
+aceita ``text/event-stream``, a resposta é um stream SSE com as
+notificações de progresso seguidas da resposta final.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Mapping, Optional
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.dispatch import (
+    JSONRPC_INTERNAL_ERROR, JSONRPCError, encode_error, handle_batch, handle_message
+)
+from enhanced_mcp_server.core.inflight import parse_timeout, request_scope
+from enhanced_mcp_server.core.session import parse_session_config
+from enhanced_mcp_server.core.sessions import sessions
+from enhanced_mcp_server.core.streaming import bind_notifier
+from enhanced_mcp_server.utils.codec import dumps, loads
+from enhanced_mcp_server.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_HEADER = "mcp-session-id"
+TIMEOUT_HEADER = "x-request-timeout"
+JSON_CONTENT_TYPE = "application/json"
+SSE_CONTENT_TYPE = "text/event-stream"
+
+# Status (convenção do nginx) para requisições abandonadas pelo cliente
+CLIENT_CLOSED_REQUEST = 499
+
+_DONE = object()
+
+WaitDisconnect = Callable[[], Awaitable[None]]
+
+
+class ClientDisconnected(Exception):
+    """O cliente HTTP desconectou antes da resposta."""
+
+
+class McpHttpResponse:
+    """Resposta HTTP do transporte: corpo em bytes ou stream de eventos SSE."""
+
+    def __init__(self, status: int, body: bytes = b"",
+                 headers: Optional[Dict[str, str]] = None,
+                 stream: Optional[AsyncIterator[bytes]] = None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.stream = stream
+
+
+def _detail(status: int, detail: str,
+            headers: Optional[Dict[str, str]] = None) -> McpHttpResponse:
+    response_headers = {"content-type": JSON_CONTENT_TYPE}
+    if headers:
+        response_headers.update(headers)
+    return McpHttpResponse(status, dumps({"detail": detail}), response_headers)
+
+
+def _wants_sse(headers: Mapping[str, str]) -> bool:
+    return SSE_CONTENT_TYPE in headers.get("accept", "")
+
+
+def _has_request(payload: Any) -> bool:
+    """Indica se há ao menos uma requisição (mensagem com ``id``)."""
+    if isinstance(payload, dict):
+        return "id" in payload
+    if isinstance(payload, list):
+        return any(isinstance(entry, dict) and "id" in entry for entry in payload)
+    return False
+
+
+def _has_tool_call(payload: Any) -> bool:
+    """Indica se o payload contém ``tools/call`` (único trabalho potencialmente longo)."""
+    if isinstance(payload, dict):
+        return payload.get("method") == "tools/call"
+    if isinstance(payload, list):
+        return any(isinstance(entry, dict) and entry.get("method") == "tools/call"
+                   for entry in payload)
+    return False
+
+
+def sse_event(data: bytes) -> bytes:
+    """Codifica uma mensagem JSON-RPC como evento SSE."""
+    return b"event: message\ndata: " + data + b"\n\n"
+
+
+async def _dispatch(payload: Any, session_config: dict) -> Optional[bytes]:
+    """Despacha o payload; retorna None quando não há resposta a enviar."""
+    if isinstance(payload, list):
+        return await handle_batch(payload, session_config)
+    if isinstance(payload, dict) and "id" not in payload:
+        # Notificação: processada, mas sem resposta
+        try:
+            await handle_message(payload, session_config)
+        except JSONRPCError:
+            pass
+        return None
+    return await handle_message(payload, session_config)
+
+
+def disconnect_waiter(receive: Callable[[], Awaitable[Dict[str, Any]]]) -> WaitDisconnect:
+    """Cria uma corrotina que termina quando o ASGI ``receive`` sinaliza desconexão."""
+    async def wait() -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+    return wait
+
+
+async def until_disconnect(coro: Awaitable[Any],
+                           wait_disconnect: Optional[WaitDisconnect]) -> Any:
+    """Aguarda ``coro``, cancelando-a se o cliente HTTP desconectar antes."""
+    if wait_disconnect is None:
+        return await coro
+
+    current = asyncio.current_task()
+    disconnected = False
+
+    def on_disconnect(watcher: asyncio.Future) -> None:
+        nonlocal disconnected
+        if not watcher.cancelled():
+            disconnected = True
+            current.cancel()
+
+    watcher = asyncio.ensure_future(wait_disconnect())
+    watcher.add_done_callback(on_disconnect)
+    try:
+        return await coro
+    except asyncio.CancelledError:
+        if disconnected and current.uncancel() == 0:
+            raise ClientDisconnected()
+        raise
+    finally:
+        watcher.cancel()
+
+
+async def _sse_stream(payload: Any, session_config: dict, scope: Hashable,
+                      timeout: Optional[float]) -> AsyncIterator[bytes]:
+    """Executa o despacho em uma task, emitindo notificações e a resposta final."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.mcp_sse_queue_size))
+
+    async def notify(message: Dict[str, Any]) -> None:
+        await queue.put(sse_event(dumps(message)))
+
+    async def run() -> None:
+        try:
+            with request_scope(scope, timeout), bind_notifier(notify):
+                body = await _dispatch(payload, session_config)
+        except JSONRPCError as e:
+            body = encode_error(payload.get("id"), e.code, e.message, e.data)
+        except Exception as e:
+            logger.error("Erro no stream SSE", error=str(e))
+            body = encode_error(payload.get("id") if isinstance(payload, dict) else None,
+                                JSONRPC_INTERNAL_ERROR, str(e))
+        if body is not None:
+            await queue.put(sse_event(body))
+        await queue.put(_DONE)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def process_post(body: bytes, query_params: Mapping[str, str],
+                       headers: Mapping[str, str],
+                       wait_disconnect: Optional[WaitDisconnect] = None) -> McpHttpResponse:
+    """Processa ``POST /mcp`` (mensagem única ou batch).
+
+    ``wait_disconnect`` é uma corrotina que termina quando o cliente
+    desconecta; nesse caso o trabalho em andamento é cancelado.
+    """
+    session_id = headers.get(SESSION_HEADER)
+    if session_id and sessions.get(session_id) is None:
+        return _detail(404, "Session not found")
+    timeout = parse_timeout(headers.get(TIMEOUT_HEADER))
+    # Cancelamentos só valem dentro da mesma sessão; sem sessão, cada POST é
+    # um escopo próprio e nenhum cliente cancela chamadas de outro.
+    scope = session_id or object()
+
+    response_headers: Dict[str, str] = {}
+    try:
+        payload = loads(body)
+        session_config = parse_session_config(query_params)
+
+        if isinstance(payload, dict) and payload.get("method") == "initialize":
+            response_headers[SESSION_HEADER] = sessions.create(session_config)
+
+        if _wants_sse(headers) and _has_request(payload):
+            response_headers["content-type"] = SSE_CONTENT_TYPE
+            response_headers["cache-control"] = "no-cache"
+            stream = _sse_stream(payload, session_config, scope, timeout)
+            return McpHttpResponse(200, headers=response_headers, stream=stream)
+
+        # Só vale a pena vigiar desconexões de chamadas de ferramentas;
+        # métodos de descoberta respondem imediatamente.
+        watcher = wait_disconnect if _has_tool_call(payload) else None
+        with request_scope(scope, timeout):
+            result = await until_disconnect(_dispatch(payload, session_config), watcher)
+        if result is None:
+            return McpHttpResponse(202, headers=response_headers)
+    except ClientDisconnected:
+        logger.debug("Cliente desconectou; requisição cancelada")
+        return McpHttpResponse(CLIENT_CLOSED_REQUEST)
+    except JSONRPCError as e:
+        return _detail(e.http_status, e.message, e.headers)
+    except Exception as e:
+        return _detail(500, str(e))
+
+    response_headers["content-type"] = JSON_CONTENT_TYPE
+    return McpHttpResponse(200, result, response_headers)
+
+
+def process_delete(headers: Mapping[str, str]) -> McpHttpResponse:
+    """Processa ``DELETE /mcp``: encerra a sessão indicada no cabeçalho."""
+    session_id = headers.get(SESSION_HEADER)
+    if not session_id:
+        return _detail(400, "Missing Mcp-Session-Id header")
+    if not sessions.delete(session_id):
+        return _detail(404, "Session not found")
+    return McpHttpResponse(204)
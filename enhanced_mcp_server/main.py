@@ -54,12 +54,15 @@ def main():
         logger.info("Starting HTTP server", host=settings.web_host, port=settings.web_port)
         uvicorn.run(app, host=settings.web_host, port=settings.web_port)
     else:
-        # Modo stdio para MCP (padrão)
+        # Modo stdio para MCP (padrão): stdout é reservado ao protocolo,
+        # logs seguem para stderr
+        import asyncio
+        from enhanced_mcp_server.core.stdio import serve_stdio
         logger.info("Starting MCP server in stdio mode")
-        print("MCP Server running in stdio mode. Use --http for HTTP mode.", flush=True)
-        # Para stdio mode, o servidor FastAPI é exposto via create_server() para Smithery
-        # Em modo local, mostramos apenas uma mensagem
-        print("For Smithery deployment, the server is exposed via create_server().", flush=True)
+        try:
+            asyncio.run(serve_stdio())
+        except KeyboardInterrupt:
+            pass
 
 
 if __name__ == "__main__":
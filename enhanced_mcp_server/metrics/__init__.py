@@ -0,0 +1,299 @@
+"""Métricas no formato de texto do Prometheus.
+
+Implementação enxuta sem dependências externas. O registro é lock-light:
+cada série mantém um shard de contadores por thread, escrito apenas pela
+própria thread, e a exposição soma os shards. Só a criação de séries e
+shards usa lock, então o caminho de gravação não disputa locks.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_get_ident = threading.get_ident
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Series:
+    """Série com um shard (lista de floats) por thread."""
+
+    __slots__ = ("_shards", "_size", "_lock")
+
+    def __init__(self, size: int):
+        self._shards: Dict[int, List[float]] = {}
+        self._size = size
+        self._lock = threading.Lock()
+
+    def shard(self) -> List[float]:
+        shard = self._shards.get(_get_ident())
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(_get_ident(), [0.0] * self._size)
+        return shard
+
+    def totals(self) -> List[float]:
+        totals = [0.0] * self._size
+        for shard in list(self._shards.values()):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Retorna a série filha para os valores de label."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self._children.items()):
+            yield from self._expose_child(values, child)
+
+    def _expose_child(self, values, child) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("_series",)
+
+    def __init__(self):
+        self._series = _Series(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._series.shard()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._series.totals()[0]
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _expose_child(self, values, child) -> Iterable[str]:
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._series.shard()[0] -= amount
+
+
+class Gauge(Counter):
+    """Gauge incrementado/decrementado (por exemplo, requisições em andamento)."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    @contextmanager
+    def track(self, *values: str) -> Iterator[None]:
+        child = self.labels(*values)
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+
+class _HistogramChild:
+    __slots__ = ("_series", "_bounds")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # Contagem por bucket (não cumulativa) + soma + contagem total
+        self._series = _Series(len(bounds) + 3)
+
+    def observe(self, value: float) -> None:
+        shard = self._series.shard()
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+
+class Histogram(_Metric):
+    """Histograma com buckets cumulativos na exposição."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    @contextmanager
+    def time(self, *values: str) -> Iterator[None]:
+        child = self.labels(*values)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    def _expose_child(self, values, child) -> Iterable[str]:
+        totals = child._series.totals()
+        cumulative = 0.0
+        for bound, count in zip(self.bounds + (float("inf"),), totals):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, ("le", _format_value(bound)))
+            yield f"{self.name}_bucket{labels} {_format_value(cumulative)}"
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}_sum{labels} {_format_value(totals[-2])}"
+        yield f"{self.name}_count{labels} {_format_value(totals[-1])}"
+
+
+class CallbackMetric(_Metric):
+    """Métrica calculada no momento da coleta a partir de um callback.
+
+    Útil para estados que já são mantidos em outro lugar (filas, contadores
+    de outros componentes), sem custo algum no caminho de gravação.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+                 kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+        self.kind = kind
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, value in self._collect():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Conjunto de métricas expostas em ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+                 kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, collect, kind))
+
+    def expose(self) -> bytes:
+        """Gera o texto de exposição do Prometheus."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.expose())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# Registro global de métricas
+metrics = MetricsRegistry()
+
+
+# Métricas do servidor MCP
+MCP_REQUESTS = metrics.counter(
+    "mcp_requests_total", "Mensagens JSON-RPC processadas.", ("method", "status"))
+MCP_REQUEST_DURATION = metrics.histogram(
+    "mcp_request_duration_seconds", "Latência por método JSON-RPC.", ("method",))
+MCP_IN_FLIGHT = metrics.gauge(
+    "mcp_requests_in_flight", "Mensagens JSON-RPC em processamento.", ("method",))
+TOOL_CALLS = metrics.counter(
+    "mcp_tool_calls_total", "Chamadas de ferramentas.", ("tool", "status"))
+TOOL_DURATION = metrics.histogram(
+    "mcp_tool_duration_seconds", "Latência por ferramenta.", ("tool",))
+TOOL_IN_FLIGHT = metrics.gauge(
+    "mcp_tool_calls_in_flight", "Chamadas de ferramentas em andamento.", ("tool",))
+
+# Chamadas HTTP a serviços externos
+UPSTREAM_DURATION = metrics.histogram(
+    "upstream_request_duration_seconds", "Latência de chamadas HTTP externas.",
+    ("upstream", "outcome"))
+
+# Cache
+CACHE_REQUESTS = metrics.counter(
+    "cache_requests_total", "Leituras do cache por camada e resultado.", ("tier", "result"))
+CACHE_EVICTIONS = metrics.counter(
+    "cache_evictions_total", "Entradas removidas do cache.", ("tier", "reason"))
+CACHE_ENCODED_BYTES = metrics.counter(
+    "cache_encoded_bytes_total",
+    "Bytes de valores codificados por destino (redis, disk, snapshot), antes (raw) e depois (stored) da compressão.",
+    ("tier", "kind"))
+REDIS_DURATION = metrics.histogram(
+    "cache_redis_duration_seconds", "Tempo de ida e volta de comandos Redis.", ("command",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 2.5))
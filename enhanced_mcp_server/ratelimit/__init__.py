@@ -0,0 +1,214 @@
+"""Rate limiting por token bucket (Redis ou em processo).
+
+O Redis fica atrás de um circuit breaker e de ``REDIS_SOCKET_TIMEOUT``: um
+Redis lento ou fora do ar não trava as requisições, e com o circuito aberto
+os limites passam direto para o bucket local, sem tentar conectar.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from enhanced_mcp_server.auth import auth_manager
+from enhanced_mcp_server.cache.breaker import CircuitBreaker
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Token bucket atômico: refill proporcional ao tempo decorrido (relógio do
+# Redis, comum a todos os workers) e consumo de um token por requisição.
+# Retorna {permitido, segundos até o próximo token}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+EXEMPT_PATHS = frozenset({"/health", "/ready", "/metrics"})
+
+
+class LocalTokenBucket:
+    """Token buckets em memória do processo, sem locks.
+
+    Cada bucket é uma lista ``[tokens, timestamp]`` atualizada no loop de
+    eventos; buckets já reabastecidos são descartados quando o número de
+    chaves passa de ``max_keys``.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets: Dict[str, List[float]] = {}
+        self.max_keys = max_keys
+
+    def hit(self, key: str, capacity: float, rate: float,
+            now: Optional[float] = None) -> float:
+        """Consome um token; retorna 0 se permitido ou o tempo de espera em segundos."""
+        if now is None:
+            now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now, capacity, rate)
+            self._buckets[key] = [capacity - 1.0, now]
+            return 0.0
+
+        tokens = bucket[0] + (now - bucket[1]) * rate
+        if tokens > capacity:
+            tokens = capacity
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / rate
+
+    def _prune(self, now: float, capacity: float, rate: float) -> None:
+        refill_time = capacity / rate
+        idle = [k for k, (_, ts) in self._buckets.items() if now - ts >= refill_time]
+        for k in idle:
+            del self._buckets[k]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Aplica os limites de ``Settings`` usando Redis quando configurado."""
+
+    def __init__(self):
+        self.local = LocalTokenBucket()
+        self._redis: Optional[aioredis.Redis] = None
+        self._script = None
+        self.breaker = CircuitBreaker(settings.redis_breaker_threshold,
+                                      settings.redis_breaker_recovery)
+
+    def _get_script(self):
+        if self._script is None and settings.redis_url:
+            self._redis = aioredis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=settings.redis_socket_timeout,
+                socket_timeout=settings.redis_socket_timeout,
+            )
+            self._script = self._redis.register_script(TOKEN_BUCKET_LUA)
+        return self._script
+
+    @staticmethod
+    def limits_for(role: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Capacidade e taxa (tokens/s) para o papel; None significa sem limite."""
+        requests = settings.rate_limit_requests
+        if role is not None:
+            requests = settings.rate_limit_role_overrides.get(role, requests)
+        if requests <= 0 or settings.rate_limit_window <= 0:
+            return None
+        return float(requests), requests / settings.rate_limit_window
+
+    async def check(self, key: str, role: Optional[str] = None) -> float:
+        """Consome um token de ``key``; retorna 0 se permitido ou o Retry-After."""
+        limits = self.limits_for(role)
+        if limits is None:
+            return 0.0
+        capacity, rate = limits
+
+        script = self._get_script()
+        if script is not None and self.breaker.allow():
+            try:
+                allowed, retry_after = await script(keys=[f"ratelimit:{key}"],
+                                                    args=[capacity, rate])
+            except (redis.exceptions.RedisError, OSError) as e:
+                if self.breaker.record_failure():
+                    logger.warning(
+                        f"Rate limit no Redis indisponível: {e}. Usando bucket local por "
+                        f"{self.breaker.recovery_timeout}s."
+                    )
+            else:
+                self.breaker.record_success()
+                return 0.0 if int(allowed) else float(retry_after)
+        return self.local.hit(key, capacity, rate)
+
+    def reset(self) -> None:
+        """Esvazia os buckets locais."""
+        self.local.reset()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def identify(scope) -> Tuple[str, Optional[str]]:
+    """Identifica o cliente: hash da API key válida (com papel) ou IP."""
+    api_key = _header(scope, settings.api_key_header.lower().encode("latin-1"))
+    if api_key:
+        record = auth_manager.validate_api_key(api_key)
+        if record is not None:
+            return f"key:{record.key_hash}", record.role
+
+    if settings.rate_limit_trust_forwarded:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return f"ip:{forwarded.split(',', 1)[0].strip()}", None
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}", None
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que responde 429 quando o bucket do cliente esvazia."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.rate_limit_enabled
+            or scope.get("path") in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key, role = identify(scope)
+        retry_after = await self.limiter.check(key, role)
+        if retry_after:
+            body = b'{"detail":"Rate limit exceeded"}'
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(max(1, int(retry_after + 0.999))).encode("ascii")),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
+
+
+# Instância global do rate limiter
+rate_limiter = RateLimiter()
@@ -1,9 +1,13 @@
 """Ferramentas MCP para busca e tradução."""
 
 import re
+import time
 from urllib.parse import urlparse
 import httpx
 from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.core.registry import registry
+from enhanced_mcp_server.metrics import UPSTREAM_DURATION
+from enhanced_mcp_server.utils.http import upstream
 from enhanced_mcp_server.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -53,6 +57,21 @@ def validate_language_code(code: str) -> bool:
     return code.upper() in supported_languages
 
 
+@registry.tool(
+    "ping",
+    description="Responde com pong.",
+    input_schema={"type": "object", "properties": {}},
+    annotations={
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True
+    },
+)
+async def ping(arguments: dict) -> str:
+    """Ferramenta básica de verificação."""
+    return "pong"
+
+
 async def translate_with_deepl(content: str, source_lang: str, target_lang: str) -> str:
     """Traduz texto usando DeepL."""
     if not settings.deepl_api_key:
@@ -64,20 +83,27 @@ async def translate_with_deepl(content: str, source_lang: str, target_lang: str)
     if not validate_language_code(target_lang):
         raise ValidationError(f"Idioma de destino inválido: {target_lang}")
 
+    outcome = "error"
+    start = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=settings.translation_timeout) as client:
-            response = await client.post(
-                "https://nav.programnotes.cn/translate",
-                json={
-                    "text": content,
-                    "source_lang": source_lang.upper(),
-                    "target_lang": target_lang.upper()
-                }
-            )
-            response.raise_for_status()
-            return response.json().get("translated_text", response.text)
+        response = await upstream.get().post(
+            "https://nav.programnotes.cn/translate",
+            json={
+                "text": content,
+                "source_lang": source_lang.upper(),
+                "target_lang": target_lang.upper()
+            },
+            timeout=settings.translation_timeout,
+        )
+        response.raise_for_status()
+        translated = response.json().get("translated_text", response.text)
+        outcome = "ok"
+        return translated
     except httpx.TimeoutException:
+        outcome = "timeout"
         raise ValidationError("Timeout na tradução")
     except Exception as e:
         logger.error(f"Erro na tradução com DeepL: {e}")
         raise ValidationError(f"Erro na tradução: {str(e)}")
+    finally:
+        UPSTREAM_DURATION.labels("deepl", outcome).observe(time.perf_counter() - start)
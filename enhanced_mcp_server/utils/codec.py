@@ -0,0 +1,116 @@
+"""Camada de codec JSON com backends rápidos opcionais.
+
+Usa orjson ou msgspec quando instalados e recorre à biblioteca padrão caso
+contrário. O backend é escolhido pela configuração ``JSON_CODEC``
+(``auto``, ``orjson``, ``msgspec`` ou ``json``). Todos os backends produzem
+JSON compacto em UTF-8 (``bytes``).
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+from starlette.responses import JSONResponse
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.utils.logging import get_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgspec = None
+
+logger = get_logger(__name__)
+
+
+class JSONCodec:
+    """Par de funções ``dumps``/``loads`` de um backend JSON."""
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes],
+                 loads: Callable[[Union[bytes, str]], Any]):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+
+def _stdlib_codec() -> JSONCodec:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return JSONCodec("json", dumps, json.loads)
+
+
+def _orjson_codec() -> Optional[JSONCodec]:
+    if orjson is None:
+        return None
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    return JSONCodec("orjson", dumps, orjson.loads)
+
+
+def _msgspec_codec() -> Optional[JSONCodec]:
+    if msgspec is None:
+        return None
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+    return JSONCodec("msgspec", encoder.encode, decoder.decode)
+
+
+_BACKENDS = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "json": _stdlib_codec,
+}
+
+_codec: Optional[JSONCodec] = None
+_codec_setting: Optional[str] = None
+
+
+def _resolve(name: str) -> JSONCodec:
+    name = name.lower()
+    if name == "auto":
+        return _orjson_codec() or _msgspec_codec() or _stdlib_codec()
+
+    factory = _BACKENDS.get(name)
+    if factory is None:
+        logger.warning(f"Codec JSON desconhecido: {name}. Usando stdlib json.")
+        return _stdlib_codec()
+
+    codec = factory()
+    if codec is None:
+        logger.warning(f"Codec JSON {name} não instalado. Usando stdlib json.")
+        return _stdlib_codec()
+    return codec
+
+
+def get_codec() -> JSONCodec:
+    """Retorna o codec configurado (resolvido novamente se a configuração mudar)."""
+    global _codec, _codec_setting
+    if _codec is None or _codec_setting != settings.json_codec:
+        _codec = _resolve(settings.json_codec)
+        _codec_setting = settings.json_codec
+        logger.debug("Codec JSON selecionado", codec=_codec.name)
+    return _codec
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa ``obj`` para JSON compacto em bytes."""
+    return get_codec().dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decodifica JSON a partir de bytes ou str."""
+    return get_codec().loads(data)
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSONResponse que serializa com o codec configurado."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,98 @@
+"""Cliente HTTP compartilhado para chamadas a serviços externos.
+
+Um único ``httpx.AsyncClient`` por processo reaproveita conexões
+(keep-alive) entre chamadas, evitando um handshake TCP/TLS por requisição.
+HTTP/2 é usado quando ``UPSTREAM_HTTP2`` está ativo e o pacote ``h2`` está
+instalado (``pip install httpx[http2]``); caso contrário, HTTP/1.1.
+
+O servidor e a interface web abrem e fecham o cliente no lifespan do
+FastAPI; fora dele (stdio, testes), o cliente é criado no primeiro uso. Um
+cliente substituído por troca de event loop é fechado, não abandonado.
+"""
+
+import asyncio
+from typing import Optional, Set
+
+import httpx
+
+from enhanced_mcp_server.config import settings
+from enhanced_mcp_server.utils.logging import get_logger
+
+try:
+    import h2
+except ImportError:  # pragma: no cover - depende do ambiente
+    h2 = None
+
+logger = get_logger(__name__)
+
+
+class UpstreamClient:
+    """``httpx.AsyncClient`` com pool limitado, vinculado a um event loop."""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def http2_enabled() -> bool:
+        return settings.upstream_http2 and h2 is not None
+
+    def get(self) -> httpx.AsyncClient:
+        """Retorna o cliente do event loop atual, criando-o se preciso.
+
+        Conexões pertencem a um único loop, então um novo cliente é criado
+        se o loop mudar; o anterior é fechado em segundo plano.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._client
+        if client is None or client.is_closed or self._loop is not loop:
+            if client is not None and not client.is_closed:
+                self._retire(client, self._loop)
+            client = self._client = httpx.AsyncClient(
+                http2=self.http2_enabled(),
+                limits=httpx.Limits(
+                    max_connections=settings.upstream_max_connections,
+                    max_keepalive_connections=settings.upstream_max_keepalive,
+                    keepalive_expiry=settings.upstream_keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(settings.request_timeout,
+                                      connect=settings.upstream_connect_timeout),
+            )
+            self._loop = loop
+        return client
+
+    def _retire(self, client: httpx.AsyncClient,
+                loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Fecha o pool de um cliente de outro event loop sem bloquear o atual."""
+        if loop is not None and loop.is_running():
+            # Loop ainda ativo em outra thread: fecha lá, onde vivem as conexões
+            asyncio.run_coroutine_threadsafe(self._close_quietly(client), loop)
+            return
+        task = asyncio.get_running_loop().create_task(self._close_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_quietly(client: httpx.AsyncClient) -> None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug(f"Erro ao fechar cliente HTTP antigo: {e}")
+
+    async def start(self) -> None:
+        """Cria o cliente antecipadamente (chamado no startup)."""
+        self.get()
+        if settings.upstream_http2 and h2 is None:
+            logger.info("UPSTREAM_HTTP2 ativo, mas o pacote h2 não está instalado; usando HTTP/1.1")
+
+    async def aclose(self) -> None:
+        """Fecha as conexões do pool."""
+        client, self._client = self._client, None
+        self._loop = None
+        if client is not None:
+            await client.aclose()
+
+
+# Instância global
+upstream = UpstreamClient()
@@ -1,8 +1,9 @@
 """Aplicação web FastAPI para interface das ferramentas MCP."""
 
 import os
+from contextlib import asynccontextmanager
 from typing import Optional
-from fastapi import FastAPI, Request, Form
+from fastapi import FastAPI, Request, Form, Response
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -11,18 +12,34 @@ from enhanced_mcp_server.config import settings
 from enhanced_mcp_server.tools import (
     ValidationError
 )
+from enhanced_mcp_server.utils.codec import CodecJSONResponse
+from enhanced_mcp_server.utils.http import upstream
 from enhanced_mcp_server.utils.logging import setup_logging, get_logger
 from enhanced_mcp_server.cache import cache
+from enhanced_mcp_server.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
 
 # Configura logging
 setup_logging()
 logger = get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Abre o cliente HTTP compartilhado no startup e fecha o pool no shutdown."""
+    await upstream.start()
+    try:
+        yield
+    finally:
+        await upstream.aclose()
+
+
 # Cria aplicação FastAPI
 app = FastAPI(
     title="Enhanced AI Tools",
     description="Interface web para ferramentas de IA avançadas",
-    version="0.2.0"
+    version="0.2.0",
+    lifespan=lifespan,
+    default_response_class=CodecJSONResponse
 )
 
 # Configura templates e arquivos estáticos
@@ -138,13 +155,16 @@ async def health_check():
 
 @app.get("/cache/stats")
 async def cache_stats():
-    """Estatísticas do cache."""
-    # Esta é uma implementação simplificada
-    # Em produção, você poderia expor métricas mais detalhadas
-    return {
-        "cache_type": "redis" if settings.redis_url else "memory",
-        "configured": bool(settings.redis_url or cache._memory_cache)
-    }
+    """Estatísticas do cache: camadas, circuit breaker e acertos por função."""
+    return cache.stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas no formato de texto do Prometheus."""
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    return Response(content=metrics.expose(), media_type=METRICS_CONTENT_TYPE)
 
 
 def main():
@@ -0,0 +1,12 @@
+"""Fixtures compartilhadas dos testes."""
+
+import pytest
+
+from enhanced_mcp_server.ratelimit import rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiter():
+    """Cada teste começa com os buckets de rate limit cheios."""
+    rate_limiter.reset()
+    yield
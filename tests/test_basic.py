@@ -63,6 +63,903 @@ class TestCache:
 
         assert cache.get("expire_key") is None
 
+    def test_memory_store_lru_eviction(self):
+        """LRU despeja a entrada menos usada ao passar do limite."""
+        from enhanced_mcp_server.cache.memory import MemoryStore
+
+        store = MemoryStore(max_entries=2, policy="lru")
+        store.set("a", 1, size=1)
+        store.set("b", 2, size=1)
+        store.get("a")
+        store.set("c", 3, size=1)
+        assert "b" not in store
+        assert store.get("a") == 1 and store.get("c") == 3
+        assert store.evictions == 1
+
+    def test_memory_store_slru_scan_resistance(self):
+        """SLRU preserva entradas lidas duas vezes durante uma varredura."""
+        from enhanced_mcp_server.cache.memory import MemoryStore
+
+        store = MemoryStore(max_entries=10, policy="slru")
+        for key in ("hot1", "hot2"):
+            store.set(key, key, size=1)
+            store.get(key)
+        for i in range(100):
+            store.set(f"scan{i}", i, size=1)
+        assert "hot1" in store and "hot2" in store
+        assert len(store) == 10
+
+    def test_memory_store_slru_with_byte_limit_only(self):
+        """Com só max_bytes, SLRU ainda protege as entradas quentes de uma varredura."""
+        from enhanced_mcp_server.cache.memory import MemoryStore
+
+        store = MemoryStore(max_bytes=100, policy="slru")
+        for key in ("hot1", "hot2"):
+            store.set(key, key, size=10)
+            store.get(key)
+        for i in range(100):
+            store.set(f"scan{i}", i, size=10)
+        assert "hot1" in store and "hot2" in store
+        assert store.bytes <= 100
+        assert store.stats()["protected"] == 2
+
+    def test_memory_store_byte_limit(self):
+        """O limite de bytes é respeitado e valores grandes demais são recusados."""
+        from enhanced_mcp_server.cache.memory import MemoryStore
+
+        store = MemoryStore(max_bytes=100)
+        for i in range(10):
+            store.set(f"k{i}", i, size=30)
+        assert store.bytes <= 100 and len(store) == 3
+        assert store.set("huge", "x", size=101) is False
+        assert "huge" not in store
+
+    def test_memory_store_expire_in_slices(self):
+        """A roda de tempo remove só entradas vencidas, em fatias limitadas."""
+        from enhanced_mcp_server.cache.memory import MemoryStore
+
+        store = MemoryStore()
+        for i in range(10):
+            store.set(f"old{i}", i, size=1, expires_at=100.0)
+        store.set("live", 1, size=1, expires_at=500.0)
+        store.set("forever", 1, size=1)
+        store.set("old0", 0, size=1, expires_at=500.0)  # renovada
+        assert store.expire(now=200.0, limit=4) == 4
+        assert store.expire(now=200.0, limit=100) == 5
+        assert len(store) == 3 and store.bytes == 3
+        assert store.expire(now=200.0, limit=100) == 0
+
+    def test_sharded_store_under_threads(self):
+        """Segmentos dividem o limite total e aguentam acesso concorrente."""
+        import threading
+        from enhanced_mcp_server.cache.memory import ShardedMemoryStore
+
+        store = ShardedMemoryStore(shards=4, max_entries=10)
+        assert sum(shard.max_entries for shard, _ in store._shards) == 10
+
+        store = ShardedMemoryStore(shards=8)
+
+        def worker(n):
+            for i in range(2000):
+                store.set(f"t{n}:{i % 50}", i, size=1)
+                store.get(f"t{(n + 1) % 4}:{i % 50}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(store) == 200 and store.bytes == 200
+        assert len(store.get_many([f"t0:{i}" for i in range(60)])) == 50
+        value = store.peek("t1:0")
+        assert store.discard("t1:0", object()) is False
+        assert store.discard("t1:0", value) is True
+        assert store.pop_many(["t2:0", "t2:1", "absent"]) == 2
+
+    def test_cache_sweep(self):
+        """Cache.sweep remove chaves escritas uma vez e nunca lidas."""
+        import time
+
+        cache._memory_cache.clear()
+        cache.set("write_once", "value", ttl=1)
+        cache.set("kept", "value", ttl=600)
+        assert cache.sweep(now=time.time() + 5) == 1
+        assert "write_once" not in cache._memory_cache
+        assert cache.get("kept") == "value"
+
+    def test_async_api_memory(self):
+        """aget/aset/adelete funcionam sem Redis configurado."""
+        import asyncio
+
+        async def scenario():
+            await cache.aset("async_key", {"a": 1}, ttl=60)
+            first = await cache.aget("async_key")
+            await cache.adelete("async_key")
+            return first, await cache.aget("async_key")
+
+        with patch.object(settings, "redis_url", None):
+            assert asyncio.run(scenario()) == ({"a": 1}, None)
+
+    def test_async_redis_unavailable_falls_back(self):
+        """Com Redis inacessível, a API assíncrona usa a memória."""
+        import asyncio
+        from enhanced_mcp_server.cache import Cache
+
+        instance = Cache()
+
+        async def scenario():
+            await instance.aset("k", "v", ttl=60)
+            value = await instance.aget("k")
+            pool = instance._async_redis.client.connection_pool
+            await instance.aclose()
+            return value, pool.max_connections
+
+        with patch.object(settings, "redis_url", "redis://127.0.0.1:1/0"), \
+                patch.object(settings, "redis_max_connections", 7):
+            assert asyncio.run(scenario()) == ("v", 7)
+
+
+class TestSingleFlight:
+    """Testes da coalescência de misses no @cached."""
+
+    def test_concurrent_misses_compute_once(self):
+        """Chamadas concorrentes pela mesma chave executam a função uma vez."""
+        import asyncio
+        from enhanced_mcp_server.cache import cached
+
+        calls = []
+
+        @cached(ttl=60)
+        async def slow_translate(text):
+            calls.append(text)
+            await asyncio.sleep(0.05)
+            return text.upper()
+
+        async def scenario():
+            return await asyncio.gather(*(slow_translate("stampede") for _ in range(20)))
+
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            assert asyncio.run(scenario()) == ["STAMPEDE"] * 20
+        assert calls == ["stampede"]
+
+    def test_errors_reach_waiters_and_are_not_cached(self):
+        """Falhas do líder propagam aos que esperam e não ficam no cache."""
+        import asyncio
+        from enhanced_mcp_server.cache.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        attempts = []
+
+        async def failing():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream")
+
+        async def scenario():
+            results = await asyncio.gather(*(flight.do("k", failing) for _ in range(5)),
+                                           return_exceptions=True)
+            return results, flight._calls
+
+        results, pending = asyncio.run(scenario())
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert attempts == [1] and pending == {}
+
+    def test_cancelled_leader_hands_over(self):
+        """Se o líder é cancelado, quem esperava executa no lugar dele."""
+        import asyncio
+        from enhanced_mcp_server.cache.singleflight import SingleFlight
+
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        async def scenario():
+            leader = asyncio.create_task(flight.do("k", compute))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.do("k", compute))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(scenario()) == "ok"
+
+    def test_sync_threads_compute_once(self):
+        """O caminho síncrono também agrupa chamadas de várias threads."""
+        import threading
+        import time
+        from enhanced_mcp_server.cache.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 42
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do_sync("k", compute)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [42] * 8 and calls == [1]
+
+
+class TestStaleWhileRevalidate:
+    """Testes de stale-while-revalidate e renovação antecipada."""
+
+    def test_needs_refresh(self):
+        """Entradas vencidas sempre renovam; XFetch antecipa perto do fim."""
+        from enhanced_mcp_server.cache import needs_refresh
+
+        stale = {"value": 1, "created_at": 0, "fresh_until": 10, "expires_at": 70}
+        assert needs_refresh(stale, now=11)
+        fresh = {"value": 1, "created_at": 0, "expires_at": 10, "delta": 5.0}
+        assert not needs_refresh(fresh, now=1)
+        # Custo alto e perto do vencimento: renovação praticamente certa
+        assert needs_refresh(fresh, early_refresh=100.0, now=9.99)
+        # Custo desprezível e longe do vencimento: nunca renova
+        cheap = dict(fresh, delta=1e-9)
+        assert not any(needs_refresh(cheap, early_refresh=1.0, now=1) for _ in range(100))
+
+    def test_serves_stale_while_refreshing(self):
+        """Após vencer, o valor antigo é servido e renovado em segundo plano."""
+        import asyncio
+        from enhanced_mcp_server.cache import cached
+
+        calls = []
+
+        @cached(ttl=0.05, stale_ttl=60)
+        async def rate(currency):
+            calls.append(currency)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def scenario():
+            first = await rate("BRL")
+            await asyncio.sleep(0.1)
+            stale = await rate("BRL")
+            await asyncio.sleep(0.05)
+            return first, stale, await rate("BRL")
+
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            assert asyncio.run(scenario()) == (1, 1, 2)
+        assert calls == ["BRL", "BRL"]
+
+
+class TestCacheKeys:
+    """Testes do esquema de chaves, namespaces e invalidação."""
+
+    def test_keys_are_compact_and_stable(self):
+        """Textos longos geram chaves de tamanho fixo e independentes da ordem de kwargs."""
+        from enhanced_mcp_server.cache.keys import make_key
+
+        long_text = "palavra " * 2000
+        key = make_key("tools.translate", (long_text,), {"target": "EN", "source": "PT"})
+        assert len(key) < 80
+        assert key.startswith(f"{settings.cache_key_prefix}:tools.translate:1:")
+        assert key == make_key("tools.translate", (long_text,), {"source": "PT", "target": "EN"})
+        assert key != make_key("tools.translate", (long_text,), {"target": "EN", "source": "PT"},
+                               version="2")
+
+    def test_unstable_arguments_are_rejected(self):
+        """Objetos com repr padrão não geram chave; o decorador executa sem cache."""
+        from enhanced_mcp_server.cache import cached
+        from enhanced_mcp_server.cache.keys import make_key
+
+        class Opaque:
+            pass
+
+        with pytest.raises(TypeError):
+            make_key("ns", (Opaque(),))
+
+        calls = []
+
+        @cached(ttl=60)
+        def describe(obj):
+            calls.append(obj)
+            return "ok"
+
+        with patch.object(settings, "redis_url", None):
+            assert describe(Opaque()) == "ok"
+            assert describe(Opaque()) == "ok"
+        assert len(calls) == 2
+
+    def test_invalidate_namespace_and_tags(self):
+        """Invalidação por namespace e por tag remove só as chaves certas."""
+        from enhanced_mcp_server.cache.keys import make_key
+
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            a = make_key("ns.a", ("x",))
+            b = make_key("ns.b", ("x",))
+            cache.set(a, 1, ttl=60, tags=["user:1"])
+            cache.set(b, 2, ttl=60, tags=["user:2"])
+            cache.set("unrelated", 3, ttl=60)
+            assert cache.invalidate_tags("user:1") == 1
+            assert cache.get(a) is None and cache.get(b) == 2
+            assert cache.invalidate_namespace("ns.b") == 1
+            assert cache.get(b) is None
+            assert cache.get("unrelated") == 3
+
+    def test_clear_does_not_flush_redis(self):
+        """clear remove apenas chaves com o prefixo do cache e os conjuntos de tags."""
+        from unittest.mock import MagicMock
+
+        prefix = settings.cache_key_prefix
+        scanned = {f"{prefix}:*": [b"mcp:a", b"mcp:b"], f"{prefix}#tag:*": [b"mcp#tag:t"]}
+        client = MagicMock()
+        client.scan_iter.side_effect = lambda match, count: iter(scanned[match])
+        client.unlink.return_value = 2
+        with patch.object(cache, "get_redis_client", return_value=client):
+            cache.clear()
+        client.flushdb.assert_not_called()
+        assert [call.args for call in client.unlink.call_args_list] == [
+            (b"mcp:a", b"mcp:b"), (b"mcp#tag:t",)]
+
+    def test_tag_sets_outside_namespaces(self):
+        """Nenhum namespace (nem "tag") casa com os conjuntos de tags."""
+        import fnmatch
+        from enhanced_mcp_server.cache.keys import namespace_pattern, tag_key
+
+        for namespace in ("tag", "tag:user", ""):
+            assert not fnmatch.fnmatchcase(tag_key("user"), namespace_pattern(namespace))
+
+
+class TestCachedDecorator:
+    """Testes do @cached como camada de memoização."""
+
+    def test_caches_in_memory_mode(self):
+        """Sem Redis e com a memória vazia, a segunda chamada já é um acerto."""
+        import asyncio
+        from enhanced_mcp_server.cache import cached
+
+        calls = []
+
+        @cached(ttl=60)
+        async def lookup(term, limit=10):
+            calls.append(term)
+            return f"{term}:{limit}"
+
+        async def scenario():
+            return [await lookup("mcp"), await lookup("mcp", limit=10), await lookup(term="mcp")]
+
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            assert asyncio.run(scenario()) == ["mcp:10"] * 3
+        assert calls == ["mcp"]
+        stats = lookup.cache_stats.as_dict()
+        assert stats["hits"] == 2 and stats["misses"] == 1 and stats["computations"] == 1
+
+    def test_disabled_setting_bypasses_cache(self):
+        """CACHE_ENABLED=false executa sempre a função."""
+        from enhanced_mcp_server.cache import cached
+
+        calls = []
+
+        @cached(ttl=60)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        with patch.object(settings, "redis_url", None), \
+                patch.object(settings, "cache_enabled", False):
+            square(3)
+            square(3)
+        assert calls == [3, 3]
+
+    def test_key_hook_ignore_and_typed(self):
+        """key, ignore e typed controlam o que entra na chave."""
+        from enhanced_mcp_server.cache import cached
+
+        calls = []
+
+        @cached(ttl=60, ignore=["client"])
+        def fetch(url, client=None):
+            calls.append(url)
+            return url
+
+        @cached(ttl=60, key=lambda text, options: text.lower())
+        def normalize(text, options):
+            calls.append(text)
+            return text.lower()
+
+        @cached(ttl=60, typed=True)
+        def describe(value):
+            calls.append(value)
+            return repr(value)
+
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            fetch("https://a.example", client=object())
+            fetch("https://a.example", client=object())
+            normalize("Olá", {"x": object()})
+            normalize("OLÁ", {"y": object()})
+            assert describe(1) == "1" and describe(1.0) == "1.0"
+        assert calls == ["https://a.example", "Olá", 1, 1.0]
+
+    def test_cache_stats_endpoint(self):
+        """/cache/stats traz camadas e estatísticas por função."""
+        from enhanced_mcp_server.cache import cached
+        from enhanced_mcp_server.web.app import app as web_app
+
+        @cached(ttl=60, namespace="tests.stats_endpoint")
+        def double(x):
+            return x * 2
+
+        with patch.object(settings, "redis_url", None):
+            double(2)
+            double(2)
+        data = TestClient(web_app).get("/cache/stats").json()
+        assert data["cache_type"] == "memory"
+        assert data["memory"]["entries"] >= 1
+        assert data["functions"]["tests.stats_endpoint"]["hits"] == 1
+        assert set(data["bytes_saved"]) == {"redis", "disk", "snapshot"}
+
+
+class TestBulkCache:
+    """Testes das operações em lote."""
+
+    def test_memory_bulk_operations(self):
+        """get_many/set_many/delete_many na camada em memória."""
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            cache.set_many({f"seg{i}": f"segmento {i}" for i in range(50)}, ttl=60)
+            found = cache.get_many([f"seg{i}" for i in range(60)])
+            assert len(found) == 50 and found["seg7"] == "segmento 7"
+            assert cache.delete_many(["seg1", "seg2", "absent"]) == 2
+            assert set(cache.get_many(["seg1", "seg3"])) == {"seg3"}
+
+    def test_redis_bulk_uses_one_round_trip(self):
+        """No Redis, leituras usam um MGET e escritas um único pipeline."""
+        from unittest.mock import MagicMock
+        from enhanced_mcp_server.cache import envelope
+
+        stored = {}
+        pipe = MagicMock()
+        pipe.setex.side_effect = lambda key, ttl, value: stored.__setitem__(key, value)
+        pipe.execute.return_value = [2]
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        client.mget.side_effect = lambda keys: [stored.get(key) for key in keys]
+
+        with patch.object(cache, "get_redis_client", return_value=client):
+            cache.set_many({"a": 1, "b": {"x": 2}}, ttl=60)
+            assert pipe.execute.call_count == 1
+            assert envelope.decode(stored["b"])["value"] == {"x": 2}
+            assert cache.get_many(["a", "b", "c"]) == {"a": 1, "b": {"x": 2}}
+            client.mget.assert_called_once_with(["a", "b", "c"])
+            assert cache.delete_many(["a", "b"]) == 2
+            pipe.unlink.assert_called_once_with("a", "b")
+        client.get.assert_not_called()
+
+    def test_async_bulk_operations(self):
+        """Versões assíncronas em memória."""
+        import asyncio
+
+        async def scenario():
+            await cache.aset_many({"x": 1, "y": 2}, ttl=60)
+            found = await cache.aget_many(["x", "y", "z"])
+            removed = await cache.adelete_many(["x"])
+            return found, removed, await cache.aget_many(["x", "y"])
+
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            assert asyncio.run(scenario()) == ({"x": 1, "y": 2}, 1, {"y": 2})
+
+
+class TestDiskCache:
+    """Testes da camada em disco (SQLite)."""
+
+    def test_survives_restart(self, tmp_path):
+        """Entradas gravadas em disco voltam após reabrir e limpar a memória."""
+        path = str(tmp_path / "cache.db")
+        with patch.object(settings, "redis_url", None), \
+                patch.object(settings, "cache_disk_path", path):
+            cache.set("disk:a", {"texto": "olá"}, ttl=60, tags=["docs"])
+            cache.set("disk:b", "segundo", ttl=60)
+            cache.close_disk()  # grava a fila pendente, como na saída do processo
+            cache._memory_cache.clear()
+
+            assert cache.get("disk:a") == {"texto": "olá"}
+            assert cache._memory_cache.peek("disk:a") is not None  # promovida
+            assert cache.get_many(["disk:b", "disk:c"]) == {"disk:b": "segundo"}
+
+            cache._memory_cache.clear()
+            cache.invalidate_tags("docs")
+            cache.get_disk().flush(timeout=5)
+            assert cache.get("disk:a") is None
+            cache.close_disk()
+
+    def test_tags_with_commas_round_trip(self, tmp_path):
+        """Tags com vírgula ou "%" voltam intactas do disco e invalidam só as suas chaves."""
+        import time
+        from enhanced_mcp_server.cache.disk import DiskStore
+
+        store = DiskStore(str(tmp_path / "cache.db"))
+        now = time.time()
+        tags = ["a,b", "50%", "%2C", ""]
+        store.put("k1", {"value": 1, "created_at": now, "expires_at": now + 60, "tags": tags})
+        store.put("k2", {"value": 2, "created_at": now, "expires_at": now + 60, "tags": ["a"]})
+        assert store.flush(timeout=5)
+        assert store.get("k1")["tags"] == tags
+
+        store.delete_tags(["a"])
+        assert store.flush(timeout=5)
+        assert store.get("k1") is not None and store.get("k2") is None
+        store.delete_tags(["a,b"])
+        assert store.flush(timeout=5)
+        assert store.get("k1") is None
+        store.close()
+
+    def test_pending_invalidations_hide_disk_rows(self, tmp_path):
+        """delete/clear ainda na fila de escrita não deixam a linha antiga voltar."""
+        import threading
+
+        path = str(tmp_path / "cache.db")
+        with patch.object(settings, "redis_url", None), \
+                patch.object(settings, "cache_disk_path", path):
+            cache.set("disk:d", "velho", ttl=60, tags=["grupo"])
+            cache.set("disk:e", "velho", ttl=60)
+            disk = cache.get_disk()
+            assert disk.flush(timeout=5)
+
+            # Segura a thread de escrita: as invalidações ficam só na fila
+            release = threading.Event()
+            apply = disk._apply
+
+            def slow_apply(conn, batch):
+                release.wait(5)
+                apply(conn, batch)
+
+            with patch.object(disk, "_apply", side_effect=slow_apply):
+                cache.delete("disk:d")
+                assert cache.get("disk:d") is None
+                assert cache.get_many(["disk:d"]) == {}
+
+                cache.clear()
+                assert cache.get("disk:e") is None
+                cache.set("disk:e", "novo", ttl=60)
+                assert cache.get("disk:e") == "novo"
+                release.set()
+                assert disk.flush(timeout=5)
+
+            cache._memory_cache.clear()
+            assert cache.get("disk:d") is None
+            assert cache.get("disk:e") == "novo"
+            assert not disk._tombstones and not disk._pending_bulk
+            cache.close_disk()
+
+    def test_ttl_and_size_cap(self, tmp_path):
+        """Entradas vencidas não são lidas e a compactação respeita o limite."""
+        import time
+        from enhanced_mcp_server.cache.disk import DiskStore
+
+        store = DiskStore(str(tmp_path / "c.db"), max_bytes=20000, compact_interval=3600)
+        now = time.time()
+        store.put("old", {"value": "x", "created_at": now - 10, "expires_at": now - 1})
+        for i in range(100):
+            store.put(f"k{i}", {"value": "v" * 500, "created_at": now,
+                                "expires_at": now + 60 + i})
+        assert store.flush(timeout=5)
+        assert store.get("old") is None
+        assert store.compact() > 1
+        stats = store.stats()
+        assert 0 < stats["bytes"] <= 20000
+        # Sai primeiro o que venceria antes
+        assert store.get("k0") is None and store.get("k99") is not None
+        store.close()
+
+
+class TestSnapshot:
+    """Testes de snapshot e aquecimento do cache."""
+
+    def test_roundtrip_hottest_first(self, tmp_path):
+        """Exporta da mais para a menos usada; importar N traz as N mais quentes."""
+        path = str(tmp_path / "cache.snap")
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            for i in range(10):
+                cache.set(f"snap:{i}", {"n": i}, ttl=60, tags=["t"] if i == 3 else ())
+            cache.get("snap:3")
+            cache.get("snap:7")
+            assert cache.export_snapshot(path) == 10
+
+            cache._memory_cache.clear()
+            assert cache.import_snapshot(path, limit=2) == 2
+            assert sorted(key for key, _ in cache._memory_cache.items()) == ["snap:3", "snap:7"]
+            assert cache.invalidate_tags("t") == 1
+
+            cache._memory_cache.clear()
+            assert cache.import_snapshot(path) == 10
+            assert cache.get("snap:5") == {"n": 5}
+            assert cache.import_snapshot(str(tmp_path / "missing.snap")) == 0
+
+    def test_import_into_redis_does_not_overwrite(self, tmp_path):
+        """No Redis, o snapshot é carregado com SET NX e o TTL restante."""
+        from unittest.mock import MagicMock
+
+        path = str(tmp_path / "cache.snap")
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            cache.set("snap:r", "valor", ttl=60)
+            cache.export_snapshot(path)
+
+        pipe = MagicMock()
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        with patch.object(cache, "get_redis_client", return_value=client):
+            assert cache.import_snapshot(path) == 1
+        key, data = pipe.set.call_args.args
+        assert key == "snap:r" and pipe.set.call_args.kwargs["nx"] is True
+        assert 0 < pipe.set.call_args.kwargs["px"] <= 60000
+        pipe.execute.assert_called_once()
+
+    def test_ready_after_warm_up(self, tmp_path):
+        """O readiness probe só responde 200 após carregar o snapshot."""
+        import time
+
+        path = str(tmp_path / "cache.snap")
+        cache._memory_cache.clear()
+        with patch.object(settings, "redis_url", None):
+            cache.set("snap:w", "quente", ttl=60)
+            cache.export_snapshot(path)
+            cache._memory_cache.clear()
+            with patch.object(settings, "cache_snapshot_path", path), \
+                    patch.object(settings, "cache_snapshot_on_shutdown", False):
+                app.state.ready = False
+                assert TestClient(app).get("/ready").status_code == 503
+                with TestClient(app) as client:
+                    for _ in range(100):
+                        if client.get("/ready").status_code == 200:
+                            break
+                        time.sleep(0.01)
+                    assert client.get("/ready").json() == {"status": "ready"}
+                assert cache.get("snap:w") == "quente"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_warm_up_stops_import(self, tmp_path):
+        """Cancelar o aquecimento espera a thread de importação parar."""
+        import asyncio
+        import time
+        from enhanced_mcp_server.cache import SCAN_BATCH
+
+        imported = []
+
+        def slow_import(batch):
+            time.sleep(0.05)
+            imported.append(len(batch))
+            return len(batch)
+
+        records = [(f"snap:{i}", (), b"") for i in range(SCAN_BATCH * 20)]
+        with patch.object(settings, "cache_snapshot_path", str(tmp_path / "cache.snap")), \
+                patch.object(settings, "redis_url", None), \
+                patch("enhanced_mcp_server.cache.snapshot.read", return_value=iter(records)), \
+                patch.object(cache, "_import_memory", side_effect=slow_import):
+            task = asyncio.ensure_future(cache.warm_up())
+            await asyncio.sleep(0.02)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            batches = len(imported)
+            await asyncio.sleep(0.15)
+        assert len(imported) == batches < 20
+
+
+class TestRedisBreaker:
+    """Testes do circuit breaker do Redis."""
+
+    def test_state_machine(self):
+        """closed -> open após o limite; half-open libera uma única sonda."""
+        import time
+        from enhanced_mcp_server.cache.breaker import CircuitBreaker
+
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+        assert breaker.allow()
+        assert not breaker.record_failure()
+        assert breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+        time.sleep(0.06)
+        assert breaker.allow() and breaker.state == "half_open"
+        assert not breaker.allow()  # só uma sonda
+        breaker.record_failure()
+        assert breaker.state == "open" and breaker.trips == 2
+        time.sleep(0.06)
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed" and breaker.stats()["failures"] == 0
+
+    def test_open_breaker_falls_back_to_memory(self):
+        """Com o circuito aberto, o cache usa a memória sem tocar no Redis."""
+        import redis
+        import time
+        from unittest.mock import MagicMock
+        from enhanced_mcp_server.cache import Cache
+
+        client = MagicMock()
+        client.get.side_effect = redis.exceptions.ConnectionError("down")
+        client.setex.side_effect = redis.exceptions.ConnectionError("down")
+        with patch.object(settings, "redis_breaker_threshold", 3), \
+                patch.object(settings, "redis_breaker_recovery", 0.05):
+            instance = Cache()
+        instance._redis_client = client
+
+        for _ in range(5):
+            assert instance.get("k") is None
+        assert client.get.call_count == 3
+        assert instance.breaker.state == "open"
+
+        instance.set("k", "local", ttl=60)
+        assert instance.get("k") == "local"
+        client.setex.assert_not_called()
+
+        # Recuperação: a sonda vai ao Redis e fecha o circuito
+        client.get.side_effect = None
+        client.get.return_value = None
+        time.sleep(0.06)
+        assert instance.get("other") is None
+        assert instance.breaker.state == "closed"
+        assert client.get.call_count == 4
+
+    def test_breaker_in_cache_stats(self):
+        """O estado do breaker aparece em /cache/stats."""
+        from enhanced_mcp_server.web.app import app as web_app
+
+        data = TestClient(web_app).get("/cache/stats").json()
+        assert data["redis_breaker"]["state"] == "closed"
+
+
+class TestL1Cache:
+    """Testes do L1 em processo na frente do Redis."""
+
+    def _cache_with_redis(self, stored):
+        from unittest.mock import MagicMock
+        from enhanced_mcp_server.cache import Cache
+        from enhanced_mcp_server.utils import codec
+
+        client = MagicMock()
+        client.get.side_effect = lambda key: codec.dumps(stored[key]) if key in stored else None
+        instance = Cache()
+        instance._redis_client = client
+        instance._redis_checked = True
+        return instance, client
+
+    def test_l1_hit_skips_redis(self):
+        """Leituras repetidas de uma chave quente não vão à rede."""
+        import time
+
+        stored = {"hot": {"value": "v", "expires_at": time.time() + 60}}
+        instance, client = self._cache_with_redis(stored)
+        with patch.object(settings, "cache_l1_enabled", True):
+            for _ in range(5):
+                assert instance.get("hot") == "v"
+        assert client.get.call_count == 1
+
+    def test_remote_invalidation_drops_l1(self):
+        """Invalidações publicadas por outro worker removem a cópia local."""
+        import time
+
+        stored = {"hot": {"value": "old", "expires_at": time.time() + 60}}
+        instance, client = self._cache_with_redis(stored)
+        with patch.object(settings, "cache_l1_enabled", True):
+            assert instance.get("hot") == "old"
+            stored["hot"] = {"value": "new", "expires_at": time.time() + 60}
+            instance._on_invalidation(b"other-worker:hot")
+            assert instance.get("hot") == "new"
+            # Mensagens do próprio worker são ignoradas
+            instance._on_invalidation(f"{instance._instance_id}:hot".encode())
+            assert instance.get("hot") == "new"
+        assert client.get.call_count == 2
+
+    def test_l1_reads_skip_global_lock(self):
+        """Leituras do L1 não disputam o lock global do cache."""
+        import time
+
+        stored = {"hot": {"value": "v", "expires_at": time.time() + 60}}
+        instance, client = self._cache_with_redis(stored)
+        with patch.object(settings, "cache_l1_enabled", True):
+            assert instance.get("hot") == "v"
+            with instance._lock:
+                assert instance.get("hot") == "v"
+                assert instance.get_many(["hot"]) == {"hot": "v"}
+        assert client.get.call_count == 1
+
+    def test_l1_fill_dropped_after_invalidation(self):
+        """Uma leitura do Redis que cruzou uma invalidação não vai para o L1."""
+        import time
+
+        instance, _ = self._cache_with_redis({})
+        cached = {"value": "old", "expires_at": time.time() + 60}
+        with patch.object(settings, "cache_l1_enabled", True):
+            _, generation = instance._l1_lookup("hot")
+            instance._invalidate_l1("hot")
+            instance._fill_l1("hot", cached, generation)
+            assert instance._l1.peek("hot") is None
+
+    def test_writes_publish_invalidation(self):
+        """set e delete publicam a chave no canal de invalidação."""
+        instance, client = self._cache_with_redis({})
+        with patch.object(settings, "cache_l1_enabled", True):
+            instance.set("k", "v", ttl=60)
+            instance.delete("k")
+        channel = settings.cache_invalidation_channel
+        messages = [call.args for call in client.publish.call_args_list]
+        assert messages == [(channel, f"{instance._instance_id}:k")] * 2
+
+
+class TestUpstreamClient:
+    """Testes do cliente HTTP compartilhado."""
+
+    def test_translation_reuses_pooled_client(self):
+        """Chamadas seguidas usam o mesmo cliente e o fechamento libera o pool."""
+        import asyncio
+        import httpx
+        from enhanced_mcp_server.utils.http import upstream
+
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"translated_text": "hello"})
+
+        async def scenario():
+            client = upstream.get()
+            assert upstream.get() is client
+            # Mesmo pool, com transporte simulado no lugar da rede
+            client._transport = httpx.MockTransport(handler)
+            with patch.object(settings, "deepl_api_key", "key"):
+                for _ in range(3):
+                    assert await translate_with_deepl("olá", "PT-BR", "EN") == "hello"
+            assert upstream.get() is client and not client.is_closed
+            await upstream.aclose()
+            assert client.is_closed
+            return client
+
+        first = asyncio.run(scenario())
+        assert len(requests) == 3
+        assert requests[0].extensions["timeout"]["read"] == settings.translation_timeout
+
+        async def other_loop():
+            client = upstream.get()
+            await upstream.aclose()
+            return client
+
+        assert asyncio.run(other_loop()) is not first
+
+    def test_loop_change_closes_old_client(self):
+        """Trocar de event loop fecha o pool do cliente anterior."""
+        import asyncio
+        from enhanced_mcp_server.utils.http import upstream
+
+        async def open_client():
+            return upstream.get()
+
+        async def replace():
+            client = upstream.get()
+            await asyncio.sleep(0.01)
+            await upstream.aclose()
+            return client
+
+        old = asyncio.run(open_client())
+        assert asyncio.run(replace()) is not old
+        assert old.is_closed
+
+    def test_web_app_closes_client_on_shutdown(self):
+        """A interface web abre e fecha o cliente compartilhado no lifespan."""
+        from enhanced_mcp_server.utils.http import upstream
+        from enhanced_mcp_server.web.app import app as web_app
+
+        with TestClient(web_app):
+            client = upstream._client
+            assert client is not None and not client.is_closed
+        assert client.is_closed
+
 
 class TestConfig:
     """Testes de configuração."""
@@ -97,4 +994,768 @@ class TestServer:
         """Testa função factory create_server."""
         from enhanced_mcp_server.core.server import create_server
         server_app = create_server()
-        assert server_app is app  # Deve retornar a mesma instância
\ No newline at end of file
+        assert server_app is app  # Deve retornar a mesma instância
+
+
+class TestBatch:
+    """Testes de batches JSON-RPC no endpoint /mcp."""
+
+    def test_batch_preserves_order(self):
+        """Respostas seguem a ordem das requisições."""
+        client = TestClient(app)
+        batch = [
+            {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+             "params": {"name": "ping", "arguments": {}}}
+            for i in range(5)
+        ]
+        response = client.post("/mcp", json=batch)
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data] == list(range(5))
+        assert data[0]["result"]["content"][0]["text"] == "pong"
+
+    def test_batch_notifications_and_errors(self):
+        """Notificações não geram resposta; métodos inválidos viram erros."""
+        client = TestClient(app)
+        batch = [
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            {"jsonrpc": "2.0", "id": "a", "method": "unknown"},
+            {"jsonrpc": "2.0", "id": "b", "method": "ping"},
+        ]
+        data = client.post("/mcp", json=batch).json()
+        assert [item["id"] for item in data] == ["a", "b"]
+        assert data[0]["error"]["code"] == -32601
+        assert data[1]["result"] == {"pong": True}
+
+    def test_batch_only_notifications(self):
+        """Batch só com notificações retorna 202 sem corpo."""
+        client = TestClient(app)
+        response = client.post("/mcp", json=[{"jsonrpc": "2.0", "method": "ping"}])
+        assert response.status_code == 202
+        assert response.content == b""
+
+    def test_empty_batch(self):
+        """Batch vazio é uma requisição inválida."""
+        client = TestClient(app)
+        data = client.post("/mcp", json=[]).json()
+        assert data["error"]["code"] == -32600
+
+
+class TestToolRegistry:
+    """Testes do registro de ferramentas."""
+
+    def test_decorator_registration_and_dispatch(self):
+        """Ferramentas registradas via decorador são chamáveis por tools/call."""
+        from enhanced_mcp_server.core.registry import registry
+
+        @registry.tool("echo_test", description="Eco.",
+                       input_schema={"type": "object",
+                                     "properties": {"text": {"type": "string"}}})
+        async def echo_test(arguments: dict) -> str:
+            return arguments["text"]
+
+        try:
+            client = TestClient(app)
+            data = client.post("/mcp", json={
+                "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                "params": {"name": "echo_test", "arguments": {"text": "olá"}}
+            }).json()
+            assert data["result"]["content"][0]["text"] == "olá"
+        finally:
+            registry.unregister("echo_test")
+
+    def test_tools_list_cached_and_invalidated(self):
+        """tools/list é serializado uma vez e invalidado quando o registro muda."""
+        from enhanced_mcp_server.core.registry import Tool, registry
+
+        builder_calls = []
+
+        def builder():
+            builder_calls.append(1)
+            return {"tools": registry.list_tools()}
+
+        first = registry.serialized("test/list", builder)
+        assert registry.serialized("test/list", builder) is first
+        assert len(builder_calls) == 1
+
+        async def noop(arguments: dict) -> str:
+            return ""
+
+        registry.register(Tool("noop_test", noop))
+        try:
+            assert b"noop_test" in registry.serialized("test/list", builder)
+            assert len(builder_calls) == 2
+        finally:
+            registry.unregister("noop_test")
+
+    def test_tools_list_endpoint(self):
+        """tools/list expõe a ferramenta ping com suas anotações."""
+        client = TestClient(app)
+        data = client.post("/mcp", json={"jsonrpc": "2.0", "id": 7, "method": "tools/list"}).json()
+        assert data["id"] == 7
+        ping = next(t for t in data["result"]["tools"] if t["name"] == "ping")
+        assert ping["annotations"]["readOnlyHint"] is True
+
+    def test_unknown_tool(self):
+        """Ferramenta inexistente retorna 400."""
+        client = TestClient(app)
+        response = client.post("/mcp", json={
+            "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+            "params": {"name": "missing"}
+        })
+        assert response.status_code == 400
+
+
+class TestFastPath:
+    """Paridade entre o caminho rápido ASGI e o endpoint FastAPI."""
+
+    REQUESTS = [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize"},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {"name": "ping"}},
+        {"jsonrpc": "2.0", "id": 4, "method": "unknown"},
+        [{"jsonrpc": "2.0", "id": 5, "method": "ping"}, {"jsonrpc": "2.0", "method": "ping"}],
+        [{"jsonrpc": "2.0", "method": "ping"}],
+    ]
+
+    def _collect(self):
+        client = TestClient(app)
+        results = [
+            (r.status_code, r.content)
+            for r in (client.post("/mcp", json=payload) for payload in self.REQUESTS)
+        ]
+        prefixed = client.post("/smithery/mcp", json=self.REQUESTS[0],
+                               headers={"x-smithery-prefix": "/smithery"})
+        results.append((prefixed.status_code, prefixed.content))
+        return results
+
+    def test_fast_path_matches_fastapi(self):
+        """Ambos os caminhos produzem o mesmo status e corpo."""
+        with patch.object(settings, "mcp_fast_path", True):
+            fast = self._collect()
+        with patch.object(settings, "mcp_fast_path", False):
+            slow = self._collect()
+        assert fast == slow
+        assert fast[-1][0] == 200
+
+    def test_fast_path_invalid_json(self):
+        """JSON inválido retorna 500 com detalhe."""
+        client = TestClient(app)
+        response = client.post("/mcp", content=b"{not json",
+                               headers={"content-type": "application/json"})
+        assert response.status_code == 500
+        assert "detail" in response.json()
+
+    def test_get_mcp_not_intercepted(self):
+        """Métodos diferentes de POST seguem para o roteamento do FastAPI."""
+        client = TestClient(app)
+        assert client.get("/mcp").status_code == 405
+
+
+class TestCodec:
+    """Testes da camada de codec JSON."""
+
+    @pytest.mark.parametrize("backend", ["auto", "orjson", "msgspec", "json"])
+    def test_roundtrip(self, backend):
+        """Todos os backends (ou o fallback) fazem roundtrip e geram JSON compacto."""
+        from enhanced_mcp_server.utils import codec
+
+        data = {"texto": "tradução", "n": [1, 2.5, None, True]}
+        with patch.object(settings, "json_codec", backend):
+            encoded = codec.dumps(data)
+            assert isinstance(encoded, bytes)
+            assert b": " not in encoded
+            assert codec.loads(encoded) == data
+
+    def test_unknown_backend_falls_back(self):
+        """Backend desconhecido usa a biblioteca padrão."""
+        from enhanced_mcp_server.utils import codec
+
+        with patch.object(settings, "json_codec", "nope"):
+            assert codec.get_codec().name == "json"
+
+    def test_cache_uses_codec_with_redis(self):
+        """Cache.set/get usam o envelope binário no caminho Redis."""
+        from unittest.mock import MagicMock
+        from enhanced_mcp_server.cache import envelope
+
+        store = {}
+        client = MagicMock()
+        client.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+        client.get.side_effect = store.get
+        with patch.object(cache, "get_redis_client", return_value=client):
+            cache.set("codec_key", {"a": 1}, ttl=60)
+            assert isinstance(store["codec_key"], bytes)
+            assert store["codec_key"][0] == envelope.MAGIC
+            assert envelope.decode(store["codec_key"])["value"] == {"a": 1}
+            assert cache.get("codec_key") == {"a": 1}
+
+    def test_envelope_compresses_large_values(self):
+        """Valores acima do limite são comprimidos; pequenos ficam como estão."""
+        import time
+        from enhanced_mcp_server.cache import envelope
+        from enhanced_mcp_server.utils import codec
+
+        now = time.time()
+        large = {"value": "tradução repetida " * 500, "created_at": now, "expires_at": now + 60}
+        saved_before = envelope.bytes_saved()
+        encoded = envelope.encode(large)
+        assert len(encoded) < len(codec.dumps(large)) / 5
+        assert envelope.decode(encoded)["value"] == large["value"]
+        assert envelope.bytes_saved() > saved_before
+
+        # Codificações do disco e de snapshots contam no próprio tier, não no Redis
+        saved_before = envelope.bytes_saved()
+        envelope.encode(large, tier="disk")
+        envelope.encode(large, tier="snapshot")
+        assert envelope.bytes_saved() == saved_before
+        assert envelope.bytes_saved("disk") > 0
+
+        small = {"value": "oi", "created_at": now, "expires_at": now + 60, "delta": 0.5}
+        decoded = envelope.decode(envelope.encode(small))
+        assert decoded["value"] == "oi" and "fresh_until" not in decoded
+        assert abs(decoded["delta"] - 0.5) < 1e-6
+
+    def test_envelope_reads_legacy_json(self):
+        """Entradas antigas (envelope JSON) continuam legíveis."""
+        from enhanced_mcp_server.cache import envelope
+        from enhanced_mcp_server.utils import codec
+
+        legacy = codec.dumps({"value": [1, 2], "expires_at": 10.0, "created_at": 1.0})
+        assert envelope.decode(legacy)["value"] == [1, 2]
+
+
+class TestStreamableHTTP:
+    """Testes do transporte Streamable HTTP (SSE e sessões)."""
+
+    @staticmethod
+    def _events(response):
+        import json
+        return [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+
+    @pytest.mark.parametrize("fast_path", [True, False])
+    def test_sse_progress_and_chunks(self, fast_path):
+        """Blocos de ferramentas incrementais chegam como notificações de progresso."""
+        from enhanced_mcp_server.core.registry import registry
+
+        @registry.tool("chunks_test")
+        async def chunks_test(arguments: dict):
+            for part in ("a", "b", "c"):
+                yield part
+
+        try:
+            client = TestClient(app)
+            with patch.object(settings, "mcp_fast_path", fast_path):
+                response = client.post(
+                    "/mcp",
+                    json={"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                          "params": {"name": "chunks_test",
+                                     "_meta": {"progressToken": "t1", "streamContent": True}}},
+                    headers={"accept": "application/json, text/event-stream"},
+                )
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = self._events(response)
+            progress = [e for e in events if e.get("method") == "notifications/progress"]
+            assert [e["params"]["message"] for e in progress] == ["a", "b", "c"]
+            assert events[-1]["id"] == 1
+            assert events[-1]["result"]["content"] == []
+            assert events[-1]["result"]["_meta"]["streamedChunks"] == 3
+        finally:
+            registry.unregister("chunks_test")
+
+    def test_chunks_aggregated_without_streaming(self):
+        """Sem SSE os blocos são agregados na resposta JSON."""
+        from enhanced_mcp_server.core.registry import registry
+
+        @registry.tool("chunks_json_test")
+        async def chunks_json_test(arguments: dict):
+            yield "a"
+            yield "b"
+
+        try:
+            client = TestClient(app)
+            data = client.post("/mcp", json={
+                "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                "params": {"name": "chunks_json_test", "_meta": {"progressToken": "t"}}
+            }).json()
+            assert [c["text"] for c in data["result"]["content"]] == ["a", "b"]
+        finally:
+            registry.unregister("chunks_json_test")
+
+    def test_session_lifecycle(self):
+        """initialize cria a sessão; DELETE a encerra; IDs desconhecidos retornam 404."""
+        client = TestClient(app)
+        response = client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "initialize"})
+        session_id = response.headers["mcp-session-id"]
+
+        headers = {"mcp-session-id": session_id}
+        ok = client.post("/mcp", json={"jsonrpc": "2.0", "id": 2, "method": "ping"}, headers=headers)
+        assert ok.status_code == 200
+
+        assert client.delete("/mcp", headers=headers).status_code == 204
+        gone = client.post("/mcp", json={"jsonrpc": "2.0", "id": 3, "method": "ping"}, headers=headers)
+        assert gone.status_code == 404
+
+
+class TestStdio:
+    """Testes do transporte stdio."""
+
+    @staticmethod
+    async def _run(lines):
+        import asyncio
+        import json
+        from enhanced_mcp_server.core.stdio import StdioServer
+
+        reader = asyncio.StreamReader()
+        for line in lines:
+            reader.feed_data(json.dumps(line).encode() + b"\n" if not isinstance(line, bytes) else line)
+        reader.feed_eof()
+
+        output = []
+
+        async def write(data: bytes) -> None:
+            output.append(json.loads(data))
+
+        await StdioServer(reader, write).serve()
+        return output
+
+    @pytest.mark.asyncio
+    async def test_pipelined_requests(self):
+        """Uma ferramenta lenta não bloqueia as demais requisições."""
+        import asyncio
+        from enhanced_mcp_server.core.registry import registry
+
+        @registry.tool("slow_test")
+        async def slow_test(arguments: dict) -> str:
+            await asyncio.sleep(0.2)
+            return "slow"
+
+        try:
+            output = await self._run([
+                {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": "slow_test"}},
+                {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+                {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            ])
+        finally:
+            registry.unregister("slow_test")
+
+        assert [item["id"] for item in output] == [2, 1]
+
+    @pytest.mark.asyncio
+    async def test_serve_stdio_with_regular_files(self, tmp_path):
+        """stdin/stdout redirecionados para arquivos comuns funcionam (sem pipe)."""
+        import json
+        import sys
+        from enhanced_mcp_server.core.stdio import serve_stdio
+
+        source = tmp_path / "in.jsonl"
+        source.write_text(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "ping"}) + "\n")
+        target = tmp_path / "out.jsonl"
+        with open(source) as stdin, open(target, "w") as stdout, \
+                patch.object(sys, "stdin", stdin), patch.object(sys, "stdout", stdout):
+            await serve_stdio()
+        assert json.loads(target.read_text())["id"] == 1
+
+    @pytest.mark.asyncio
+    async def test_oversized_line_is_skipped_whole(self):
+        """Uma linha grande que chega em partes gera um único erro, sem lixo depois."""
+        import asyncio
+        import json
+        from enhanced_mcp_server.core.stdio import StdioServer
+
+        reader = asyncio.StreamReader(limit=64)
+        output = []
+
+        async def write(data: bytes) -> None:
+            output.append(json.loads(data))
+
+        async def feed():
+            for _ in range(4):
+                reader.feed_data(b'{"jsonrpc":"2.0","id":1,"method":"ping","x":"' + b"a" * 100)
+                await asyncio.sleep(0.01)
+            reader.feed_data(b'"}\n' + json.dumps({"jsonrpc": "2.0", "id": 2, "method": "ping"}).encode()
+                             + b"\n")
+            reader.feed_eof()
+
+        await asyncio.wait_for(asyncio.gather(StdioServer(reader, write).serve(), feed()), 1)
+        assert [item.get("error", {}).get("message") for item in output] == ["Message too large", None]
+        assert output[1]["id"] == 2
+
+    @pytest.mark.asyncio
+    async def test_errors(self):
+        """Linhas inválidas e métodos desconhecidos geram erros JSON-RPC."""
+        output = await self._run([b"not json\n", {"jsonrpc": "2.0", "id": 9, "method": "nope"}])
+        codes = sorted(item["error"]["code"] for item in output)
+        assert codes == [-32700, -32601]
+
+
+class TestCancellation:
+    """Testes de cancelamento e prazos de tools/call."""
+
+    @pytest.fixture
+    def sleepy_tool(self):
+        import asyncio
+        from enhanced_mcp_server.core.registry import registry
+
+        state = {"cancelled": False}
+
+        @registry.tool("sleepy_test")
+        async def sleepy_test(arguments: dict) -> str:
+            try:
+                await asyncio.sleep(arguments.get("seconds", 5))
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+            return "done"
+
+        yield state
+        registry.unregister("sleepy_test")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_notification_over_stdio(self, sleepy_tool):
+        """notifications/cancelled interrompe a chamada, que fica sem resposta."""
+        import asyncio
+        import json
+        from enhanced_mcp_server.core.stdio import StdioServer
+
+        reader = asyncio.StreamReader()
+        output = []
+
+        async def write(data: bytes) -> None:
+            output.append(json.loads(data))
+
+        async def feed():
+            reader.feed_data(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                         "params": {"name": "sleepy_test"}}).encode() + b"\n")
+            await asyncio.sleep(0.05)
+            reader.feed_data(json.dumps({"jsonrpc": "2.0", "method": "notifications/cancelled",
+                                         "params": {"requestId": 1}}).encode() + b"\n")
+            reader.feed_data(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "ping"}).encode() + b"\n")
+            reader.feed_eof()
+
+        await asyncio.wait_for(asyncio.gather(StdioServer(reader, write).serve(), feed()), 2)
+        assert [item["id"] for item in output] == [2]
+        assert sleepy_tool["cancelled"]
+
+    @pytest.mark.asyncio
+    async def test_cancel_reaches_stdio_when_slots_are_full(self, sleepy_tool):
+        """Com todas as vagas ocupadas, cancelamento e ping não ficam na fila."""
+        import asyncio
+        import json
+        from enhanced_mcp_server.core.stdio import StdioServer
+
+        reader = asyncio.StreamReader()
+        output = []
+
+        async def write(data: bytes) -> None:
+            output.append(json.loads(data))
+
+        async def feed():
+            reader.feed_data(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                         "params": {"name": "sleepy_test"}}).encode() + b"\n")
+            await asyncio.sleep(0.05)
+            reader.feed_data(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "ping"}).encode() + b"\n")
+            await asyncio.sleep(0.05)
+            assert [item["id"] for item in output] == [2]
+            reader.feed_data(json.dumps({"jsonrpc": "2.0", "method": "notifications/cancelled",
+                                         "params": {"requestId": 1}}).encode() + b"\n")
+            reader.feed_eof()
+
+        await asyncio.wait_for(
+            asyncio.gather(StdioServer(reader, write, concurrency=1).serve(), feed()), 1)
+        assert sleepy_tool["cancelled"]
+
+    @pytest.mark.asyncio
+    async def test_stdio_batch_calls_take_one_slot_each(self):
+        """Cada tools/call de um batch ocupa uma vaga de MCP_STDIO_CONCURRENCY."""
+        import asyncio
+        import json
+        from enhanced_mcp_server.core.registry import registry
+        from enhanced_mcp_server.core.stdio import StdioServer
+
+        state = {"running": 0, "peak": 0}
+
+        @registry.tool("counting_test")
+        async def counting_test(arguments: dict) -> str:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.02)
+            state["running"] -= 1
+            return "ok"
+
+        reader = asyncio.StreamReader()
+        reader.feed_data(json.dumps([
+            {"jsonrpc": "2.0", "id": i, "method": "tools/call", "params": {"name": "counting_test"}}
+            for i in range(4)
+        ]).encode() + b"\n")
+        reader.feed_eof()
+        output = []
+
+        async def write(data: bytes) -> None:
+            output.append(json.loads(data))
+
+        try:
+            await StdioServer(reader, write, concurrency=2).serve()
+        finally:
+            registry.unregister("counting_test")
+        assert len(output[0]) == 4
+        assert state["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_http_cancel_requires_same_session(self, sleepy_tool):
+        """Sem sessão, um cliente não cancela a chamada de outro com o mesmo id."""
+        import asyncio
+        from enhanced_mcp_server.core.sessions import sessions
+        from enhanced_mcp_server.core.transport import process_post
+
+        call = b'{"jsonrpc":"2.0","id":1,"method":"tools/call",' \
+               b'"params":{"name":"sleepy_test","arguments":{"seconds":0.2}}}'
+        cancel = b'{"jsonrpc":"2.0","method":"notifications/cancelled","params":{"requestId":1}}'
+
+        victim = asyncio.ensure_future(process_post(call, {}, {}))
+        await asyncio.sleep(0.05)
+        await process_post(cancel, {}, {})
+        assert (await asyncio.wait_for(victim, 2)).status == 200
+        assert not sleepy_tool["cancelled"]
+
+        headers = {"mcp-session-id": sessions.create()}
+        own = asyncio.ensure_future(process_post(call, {}, headers))
+        await asyncio.sleep(0.05)
+        await process_post(cancel, {}, headers)
+        assert (await asyncio.wait_for(own, 2)).status == 499
+        assert sleepy_tool["cancelled"]
+
+    def test_no_default_deadline(self):
+        """Sem prazo do cliente nem TOOL_CALL_TIMEOUT, a chamada não tem limite."""
+        from enhanced_mcp_server.core.inflight import request_scope, resolve_timeout
+
+        assert resolve_timeout(None) is None
+        with request_scope(None, 2.0):
+            assert resolve_timeout(None) == 2.0
+        with patch.object(settings, "tool_call_timeout", 90):
+            assert resolve_timeout(None) == 90
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("timeout", [None, 100.0])
+    async def test_tool_timeout_is_not_the_deadline(self, timeout):
+        """TimeoutError da própria ferramenta não vira CallTimeout (com ou sem prazo)."""
+        from enhanced_mcp_server.core.inflight import inflight
+
+        async def tool():
+            raise TimeoutError("upstream")
+
+        with pytest.raises(TimeoutError, match="upstream"):
+            await inflight.run(1, tool(), timeout)
+
+    def test_deadline_from_params(self, sleepy_tool):
+        """_meta.timeoutMs limita a duração da chamada."""
+        client = TestClient(app)
+        response = client.post("/mcp", json={
+            "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+            "params": {"name": "sleepy_test", "_meta": {"timeoutMs": 50}}
+        })
+        assert response.status_code == 504
+        assert sleepy_tool["cancelled"]
+
+    def test_deadline_from_header_in_batch(self, sleepy_tool):
+        """O cabeçalho X-Request-Timeout vale para as entradas do batch."""
+        client = TestClient(app)
+        data = client.post("/mcp", json=[
+            {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": "sleepy_test"}},
+            {"jsonrpc": "2.0", "id": 2, "method": "ping"},
+        ], headers={"x-request-timeout": "0.05"}).json()
+        assert data[0]["error"]["code"] == -32001
+        assert data[1]["result"] == {"pong": True}
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_cancels_work(self, sleepy_tool):
+        """A desconexão do cliente cancela a chamada em andamento."""
+        import asyncio
+        from enhanced_mcp_server.core.transport import CLIENT_CLOSED_REQUEST, process_post
+
+        async def wait_disconnect():
+            await asyncio.sleep(0.05)
+
+        body = b'{"jsonrpc":"2.0","id":1,"method":"tools/call","params":{"name":"sleepy_test"}}'
+        response = await asyncio.wait_for(process_post(body, {}, {}, wait_disconnect), 2)
+        assert response.status == CLIENT_CLOSED_REQUEST
+        assert sleepy_tool["cancelled"]
+
+
+class TestAdmission:
+    """Testes do controle de admissão por ferramenta."""
+
+    @pytest.mark.asyncio
+    async def test_limiter_queue_and_rejection(self):
+        """Excedentes aguardam na fila; com a fila cheia são rejeitados."""
+        import asyncio
+        from enhanced_mcp_server.core.admission import Overloaded, ToolLimiter
+
+        limiter = ToolLimiter("t", limit=1, queue_size=1, queue_timeout=1)
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+
+        limiter.release()
+        await queued
+        assert limiter.active == 1 and limiter.waiting == 0
+        assert limiter.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_limiter_queue_timeout(self):
+        """A espera na fila é limitada pelo timeout."""
+        from enhanced_mcp_server.core.admission import Overloaded, ToolLimiter
+
+        limiter = ToolLimiter("t", limit=1, queue_size=4, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        assert limiter.waiting == 0
+        assert limiter.stats()["timeouts"] == 1
+
+    def test_overloaded_tool_over_http(self):
+        """Ferramenta saturada responde rápido com erro e Retry-After."""
+        import asyncio
+        from enhanced_mcp_server.core.admission import admission
+        from enhanced_mcp_server.core.registry import registry
+
+        @registry.tool("busy_test", max_concurrency=1)
+        async def busy_test(arguments: dict) -> str:
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        client = TestClient(app)
+        call = {"jsonrpc": "2.0", "method": "tools/call", "params": {"name": "busy_test"}}
+        try:
+            with patch.object(settings, "tool_queue_size", 0):
+                admission.reset()
+                data = client.post("/mcp", json=[dict(call, id=1), dict(call, id=2)]).json()
+            assert "result" in data[0]
+            assert data[1]["error"]["code"] == -32002
+            assert data[1]["error"]["data"]["retryAfter"] == settings.tool_retry_after
+
+            stats = client.get("/admission/stats").json()
+            assert stats["tools"]["busy_test"]["rejected"] == 1
+        finally:
+            registry.unregister("busy_test")
+            admission.reset()
+
+
+class TestRateLimit:
+    """Testes do rate limiting."""
+
+    def test_local_token_bucket(self):
+        """O bucket esvazia após a capacidade e reabastece com o tempo."""
+        from enhanced_mcp_server.ratelimit import LocalTokenBucket
+
+        bucket = LocalTokenBucket()
+        assert all(bucket.hit("k", 3, 1.0, now=0.0) == 0 for _ in range(3))
+        assert bucket.hit("k", 3, 1.0, now=0.0) == pytest.approx(1.0)
+        assert bucket.hit("k", 3, 1.0, now=1.0) == 0
+
+    def test_middleware_returns_429(self):
+        """Requisições além do limite recebem 429 com Retry-After."""
+        client = TestClient(app)
+        ping = {"jsonrpc": "2.0", "id": 1, "method": "ping"}
+        with patch.object(settings, "rate_limit_requests", 2), \
+                patch.object(settings, "rate_limit_window", 60):
+            assert client.post("/mcp", json=ping).status_code == 200
+            assert client.post("/mcp", json=ping).status_code == 200
+            response = client.post("/mcp", json=ping)
+            assert response.status_code == 429
+            assert int(response.headers["retry-after"]) >= 1
+            # Health checks não são limitados
+            assert client.get("/health").status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_redis_breaker_falls_back_to_local(self):
+        """Falhas seguidas abrem o circuito e o Redis deixa de ser consultado."""
+        import redis
+        from unittest.mock import MagicMock
+        from enhanced_mcp_server.ratelimit import RateLimiter
+
+        script = AsyncMock(side_effect=redis.exceptions.TimeoutError("sem resposta"))
+        client = MagicMock()
+        client.register_script.return_value = script
+        with patch.object(settings, "redis_url", "redis://127.0.0.1:1/0"), \
+                patch.object(settings, "redis_breaker_threshold", 2), \
+                patch("redis.asyncio.from_url", return_value=client) as from_url:
+            limiter = RateLimiter()
+            for _ in range(5):
+                assert await limiter.check("ip:1") == 0
+        assert from_url.call_args.kwargs["socket_timeout"] == settings.redis_socket_timeout
+        assert script.await_count == 2
+        assert limiter.breaker.state == "open"
+
+    def test_role_override(self):
+        """APIKey.role pode ampliar ou remover o limite."""
+        from unittest.mock import MagicMock
+        from enhanced_mcp_server import ratelimit
+
+        record = MagicMock(key_hash="abc", role="admin")
+        client = TestClient(app)
+        ping = {"jsonrpc": "2.0", "id": 1, "method": "ping"}
+        with patch.object(settings, "rate_limit_requests", 1), \
+                patch.object(settings, "rate_limit_role_overrides", {"admin": 0}), \
+                patch.object(ratelimit.auth_manager, "validate_api_key", return_value=record):
+            for _ in range(3):
+                response = client.post("/mcp", json=ping, headers={"X-API-Key": "secret"})
+                assert response.status_code == 200
+
+
+class TestMetrics:
+    """Testes do endpoint /metrics."""
+
+    def test_histogram_exposition(self):
+        """Buckets são cumulativos e terminam em +Inf."""
+        from enhanced_mcp_server.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        histogram = registry.histogram("demo_seconds", "Demo.", ("op",), buckets=(0.1, 1.0))
+        histogram.labels("a").observe(0.05)
+        histogram.labels("a").observe(0.5)
+        histogram.labels("a").observe(5)
+        text = registry.expose().decode()
+        assert "# TYPE demo_seconds histogram" in text
+        assert 'demo_seconds_bucket{op="a",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{op="a",le="1"} 2' in text
+        assert 'demo_seconds_bucket{op="a",le="+Inf"} 3' in text
+        assert 'demo_seconds_count{op="a"} 3' in text
+
+    def test_counter_sums_thread_shards(self):
+        """Incrementos de várias threads são somados na exposição."""
+        import threading
+        from enhanced_mcp_server.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        counter = registry.counter("demo_total", "Demo.")
+        threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(1000)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert "demo_total 4000" in registry.expose().decode()
+
+    def test_metrics_endpoint(self):
+        """Chamadas MCP aparecem em /metrics."""
+        client = TestClient(app)
+        client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                  "params": {"name": "ping", "arguments": {}}})
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'mcp_requests_total{method="tools/call",status="ok"}' in response.text
+        assert 'mcp_tool_duration_seconds_count{tool="ping"}' in response.text
+        assert "mcp_tool_queue_depth" in response.text
+
+        with patch.object(settings, "metrics_enabled", False):
+            assert client.get("/metrics").status_code == 404